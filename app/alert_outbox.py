@@ -0,0 +1,371 @@
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import config
+
+
+class TokenBucket:
+    """
+    TokenBucket class to limit the rate of deliveries on a channel.
+    The bucket holds up to capacity tokens and refills at rate tokens per second; every delivery
+    takes one token, so bursts of up to capacity messages go out at once and the rest at the rate.
+
+    Attributes:
+    - rate (float): The number of tokens added per second
+    - capacity (float): The maximum number of tokens
+    - tokens (float): The number of tokens available
+    - updated (float): The time the tokens were last refilled
+
+    Methods:
+    - try_acquire(self): Takes a token if one is available
+    - wait_time(self): Gets the number of seconds until a token is available
+    """
+
+    def __init__(self, rate, capacity):
+        """
+        Initializes a full TokenBucket with the given rate and capacity
+
+        @param rate (float): The number of tokens added per second
+        @param capacity (float): The maximum number of tokens
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available
+
+        @return (bool): True if a token was taken, False if the bucket is empty
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """
+        Gets the number of seconds until a token is available
+
+        @return (float): The number of seconds to wait (0 if a token is available)
+        """
+        if self.rate <= 0:
+            return float("inf")
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class AlertOutbox:
+    """
+    AlertOutbox class to deliver alerts reliably in the background.
+    Alerts are written to a local SQLite outbox and the caller returns at once. A worker thread
+    takes the alerts that are due and hands them to the sender of their channel on a thread pool.
+    A failed delivery is retried with exponential backoff and jitter, up to max_attempts, and each
+    channel is rate limited with a token bucket. Alerts survive restarts: pending alerts, and alerts
+    that were being sent when the application stopped, are delivered on the next start.
+
+    Alert statuses:
+    - pending: Waiting for its next attempt
+    - sending: Handed to a sender
+    - sent: Delivered
+    - failed: Gave up after max_attempts
+
+    Attributes:
+    - db_path (str): The path of the SQLite database file
+    - senders (dict): The send function per channel, called with (recipients, subject, content) and returning True on success
+    - buckets (dict): The rate limit of each channel
+    - max_attempts (int): The number of attempts before an alert fails
+    - backoff_base (float): The delay before the first retry, in seconds, doubled on every retry
+    - backoff_max (float): The maximum delay between two attempts, in seconds
+    - poll_seconds (float): The maximum time the worker sleeps before looking for due alerts
+    - retention_days (float): The number of days to keep sent and failed alerts for
+    - executor (ThreadPoolExecutor): The thread pool that runs the senders
+    - connection (sqlite3.Connection): The database connection, shared by all threads
+    - lock (threading.Lock): The lock to serialize the use of the connection
+    - wake_event (threading.Event): The event to wake the worker when an alert is enqueued
+    - stop_event (threading.Event): The event to stop the worker
+    - thread (threading.Thread): The worker thread
+
+    Methods:
+    - enqueue(self, channel, recipients, subject, content): Adds an alert to the outbox
+    - start(self): Removes the old delivered alerts and starts the worker thread
+    - close(self): Stops the worker and waits for the deliveries in progress
+    - get_metrics(self, window_seconds): Gets the queue depth and the delivery latency of the outbox
+    - _run(self): Hands the due alerts to the senders, within the rate limits of their channels
+    - _deliver(self, alert_id): Sends an alert and records the result
+    """
+
+    def __init__(
+        self,
+        senders,
+        db_path=config.ALERT_OUTBOX_PATH,
+        rate_limits=None,
+        max_attempts=config.ALERT_MAX_ATTEMPTS,
+        backoff_base=config.ALERT_BACKOFF_BASE,
+        backoff_max=config.ALERT_BACKOFF_MAX,
+        poll_seconds=config.ALERT_POLL_SECONDS,
+        retention_days=config.ALERT_RETENTION_DAYS,
+        workers=config.NOTIFICATION_WORKERS,
+    ):
+        """
+        Initializes the AlertOutbox and creates the database if needed
+
+        @param senders (dict): The send function per channel, called with (recipients, subject, content) and returning True on success
+        @param db_path (str): The path of the SQLite database file
+        @param rate_limits (dict): The (rate per second, burst) of each channel (configured limits if None)
+        @param max_attempts (int): The number of attempts before an alert fails
+        @param backoff_base (float): The delay before the first retry, in seconds
+        @param backoff_max (float): The maximum delay between two attempts, in seconds
+        @param poll_seconds (float): The maximum time the worker sleeps before looking for due alerts
+        @param retention_days (float): The number of days to keep sent and failed alerts for
+        @param workers (int): The number of concurrent deliveries
+        """
+        rate_limits = rate_limits or {
+            "email": (config.ALERT_EMAIL_RATE, config.ALERT_EMAIL_BURST),
+            "sms": (config.ALERT_SMS_RATE, config.ALERT_SMS_BURST),
+        }
+        self.db_path = db_path
+        self.senders = senders
+        self.buckets = {
+            channel: TokenBucket(rate, burst)
+            for channel, (rate, burst) in rate_limits.items()
+        }
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_seconds = poll_seconds
+        self.retention_days = retention_days
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.wake_event = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY,
+                    channel TEXT NOT NULL,
+                    recipients TEXT NOT NULL,
+                    subject TEXT,
+                    content TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    next_attempt_at REAL NOT NULL,
+                    sent_at REAL,
+                    last_error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS alerts_due ON alerts(status, next_attempt_at);
+                CREATE INDEX IF NOT EXISTS alerts_channel_due
+                    ON alerts(channel, status, next_attempt_at);
+                CREATE INDEX IF NOT EXISTS alerts_sent ON alerts(status, sent_at);
+                """)
+            # Alerts that were being sent when the application stopped are sent again
+            self.connection.execute(
+                "UPDATE alerts SET status = 'pending' WHERE status = 'sending'"
+            )
+
+    def enqueue(self, channel, recipients, subject, content):
+        """
+        Adds an alert to the outbox and wakes the worker. Returns without waiting for the delivery.
+
+        @param channel (str): The channel of the alert (email or sms)
+        @param recipients (list): The recipients of the alert
+        @param subject (str): The subject of the alert
+        @param content (str): The content of the alert
+        @return (int): The ID of the alert
+        """
+        if channel not in self.senders:
+            raise ValueError(f"Invalid alert channel: {channel}")
+        now = time.time()
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO alerts (channel, recipients, subject, content, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (channel, json.dumps(list(recipients)), subject, content, now, now),
+            )
+        self.wake_event.set()
+        return cursor.lastrowid
+
+    def start(self):
+        """
+        Removes the sent and failed alerts older than retention_days and starts the worker thread
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM alerts WHERE status IN ('sent', 'failed') AND created_at < ?",
+                (time.time() - self.retention_days * 86400,),
+            )
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def close(self):
+        """
+        Stops the worker and waits for the deliveries in progress.
+        Pending alerts stay in the outbox and are delivered on the next start.
+        """
+        self.stop_event.set()
+        self.wake_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.executor.shutdown(wait=True)
+        with self.lock:
+            self.connection.close()
+
+    def get_metrics(self, window_seconds=3600):
+        """
+        Gets the queue depth and the delivery latency of the outbox.
+        The latency of an alert is the time from enqueue to delivery, retries included.
+
+        @param window_seconds (float): The period to compute the latency over, in seconds
+        @return (dict): The number of alerts per status, the age of the oldest pending alert,
+            the number of retries, and the latency count, mean, p50, p95, and max of the alerts sent in the window
+        """
+        now = time.time()
+        with self.lock:
+            counts = dict(
+                self.connection.execute(
+                    "SELECT status, COUNT(*) FROM alerts GROUP BY status"
+                ).fetchall()
+            )
+            oldest_pending = self.connection.execute(
+                "SELECT MIN(created_at) FROM alerts WHERE status IN ('pending', 'sending')"
+            ).fetchone()[0]
+            retries = self.connection.execute(
+                "SELECT COALESCE(SUM(attempts - 1), 0) FROM alerts WHERE attempts > 1"
+            ).fetchone()[0]
+            latencies = [
+                row[0]
+                for row in self.connection.execute(
+                    "SELECT sent_at - created_at FROM alerts "
+                    "WHERE status = 'sent' AND sent_at >= ? ORDER BY 1",
+                    (now - window_seconds,),
+                )
+            ]
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+        return {
+            **{
+                status: counts.get(status, 0)
+                for status in ("pending", "sending", "sent", "failed")
+            },
+            "oldest_pending_seconds": (
+                now - oldest_pending if oldest_pending is not None else 0.0
+            ),
+            "retries": retries,
+            "latency": {
+                "count": len(latencies),
+                "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                "p50": percentile(0.5) if latencies else 0.0,
+                "p95": percentile(0.95) if latencies else 0.0,
+                "max": latencies[-1] if latencies else 0.0,
+            },
+        }
+
+    def _run(self):
+        """
+        Hands the due alerts to the senders, oldest first, as long as their channel has a token.
+        The due alerts are selected per channel, so alerts piling up on a rate limited channel
+        stay pending without holding up the other channels.
+        """
+        while not self.stop_event.is_set():
+            wait = self.poll_seconds
+            try:
+                for channel in self.senders:
+                    with self.lock:
+                        due = self.connection.execute(
+                            "SELECT id FROM alerts WHERE channel = ? AND status = 'pending' "
+                            "AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT 100",
+                            (channel, time.time()),
+                        ).fetchall()
+                    bucket = self.buckets.get(channel)
+                    for (alert_id,) in due:
+                        if bucket is not None and not bucket.try_acquire():
+                            wait = min(wait, bucket.wait_time())
+                            break
+                        with self.lock, self.connection:
+                            self.connection.execute(
+                                "UPDATE alerts SET status = 'sending' WHERE id = ?",
+                                (alert_id,),
+                            )
+                        self.executor.submit(self._deliver, alert_id)
+                        if self.stop_event.is_set():
+                            return
+                    else:
+                        if len(due) == 100:  # More alerts may be due on this channel
+                            wait = 0
+            except Exception as e:
+                print(f"Error dispatching alerts: {str(e)}")
+            self.wake_event.wait(wait)
+            self.wake_event.clear()
+
+    def _deliver(self, alert_id):
+        """
+        Sends an alert and records the result.
+        A failed alert is retried after backoff_base * 2^(attempts - 1) seconds, capped at backoff_max
+        and shortened by a random jitter so failed alerts do not retry in lockstep.
+
+        @param alert_id (int): The ID of the alert
+        """
+        with self.lock:
+            channel, recipients, subject, content, created_at, attempts = (
+                self.connection.execute(
+                    "SELECT channel, recipients, subject, content, created_at, attempts "
+                    "FROM alerts WHERE id = ?",
+                    (alert_id,),
+                ).fetchone()
+            )
+        attempts += 1
+        error = None
+        try:
+            if not self.senders[channel](json.loads(recipients), subject, content):
+                error = "Send failed"
+        except Exception as e:
+            error = str(e)
+
+        now = time.time()
+        with self.lock, self.connection:
+            if error is None:
+                self.connection.execute(
+                    "UPDATE alerts SET status = 'sent', attempts = ?, sent_at = ?, "
+                    "last_error = NULL WHERE id = ?",
+                    (attempts, now, alert_id),
+                )
+            elif attempts >= self.max_attempts:
+                self.connection.execute(
+                    "UPDATE alerts SET status = 'failed', attempts = ?, last_error = ? WHERE id = ?",
+                    (attempts, error, alert_id),
+                )
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+                self.connection.execute(
+                    "UPDATE alerts SET status = 'pending', attempts = ?, next_attempt_at = ?, "
+                    "last_error = ? WHERE id = ?",
+                    (attempts, now + delay * random.uniform(0.5, 1.0), error, alert_id),
+                )
+
+        if error is None:
+            print(
+                f"Alert {alert_id} sent via {channel} in {now - created_at:.2f}s "
+                f"(attempt {attempts})"
+            )
+        elif attempts >= self.max_attempts:
+            print(f"Alert {alert_id} failed after {attempts} attempts: {error}")
+        else:
+            print(f"Error sending alert {alert_id} (attempt {attempts}): {error}")
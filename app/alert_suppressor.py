@@ -0,0 +1,121 @@
+import heapq
+import itertools
+import threading
+import time
+import config
+
+
+class AlertSuppressor:
+    """
+    AlertSuppressor class to stop the same object from triggering an alert on every frame.
+    The first detection of a key (camera, label, and track ID if per_track) opens a cooldown window
+    and is alerted; the detections of the same key until the window closes are suppressed and only
+    counted. When a window with suppressed detections closes, it becomes a digest entry, so the
+    staff still learn how long the object stayed in frame without getting one alert per frame.
+
+    The state is one small list per open window and one heap entry per window, ordered by the
+    end of the window. Closed windows are removed as soon as they expire, so the memory used
+    stays proportional to the number of keys seen in the last cooldown, and checking a detection
+    is a dictionary lookup.
+
+    Attributes:
+    - cooldown_seconds (float): The default length of a cooldown window, in seconds
+    - label_cooldowns (dict): The length of the cooldown window of specific labels, in seconds
+    - per_track (bool): Whether every tracked object has its own window
+    - windows (dict): The open windows (key -> [window_end, suppressed, first_suppressed, last_suppressed])
+    - expiry (list): The heap of the open windows, as (window_end, sequence, key) tuples
+    - sequence (itertools.count): The counter to order windows that end at the same time
+    - digests (list): The digest entries of the closed windows not yet popped
+    - lock (threading.Lock): The lock to share the suppressor between camera threads
+
+    Methods:
+    - check(self, camera_id, label, track_id, now): Checks whether a detection should be alerted
+    - pop_digests(self, now): Gets the digest entries of the windows closed so far and forgets them
+    - _expire(self, now): Closes the windows that have ended
+    """
+
+    def __init__(
+        self,
+        cooldown_seconds=config.ALERT_COOLDOWN_SECONDS,
+        label_cooldowns=config.ALERT_LABEL_COOLDOWNS,
+        per_track=config.ALERT_PER_TRACK,
+    ):
+        """
+        Initializes the AlertSuppressor with the given cooldowns
+
+        @param cooldown_seconds (float): The default length of a cooldown window, in seconds
+        @param label_cooldowns (dict): The length of the cooldown window of specific labels, in seconds
+        @param per_track (bool): Whether every tracked object has its own window
+        """
+        self.cooldown_seconds = cooldown_seconds
+        self.label_cooldowns = label_cooldowns or {}
+        self.per_track = per_track
+        self.windows = {}
+        self.expiry = []
+        self.sequence = itertools.count()
+        self.digests = []
+        self.lock = threading.Lock()
+
+    def check(self, camera_id, label, track_id=None, now=None):
+        """
+        Checks whether a detection should be alerted, and opens a cooldown window for its key if so.
+        A detection whose key has an open window is suppressed and counted for the digest.
+
+        @param camera_id (str): The camera ID
+        @param label (str): The label of the detection
+        @param track_id (int): The track ID of the detection, or None if not tracked
+        @param now (float): The time of the detection (current time if None)
+        @return (bool): True if the detection should be alerted, False if it is suppressed
+        """
+        now = time.time() if now is None else now
+        key = (camera_id, label, track_id if self.per_track else None)
+        with self.lock:
+            self._expire(now)
+            window = self.windows.get(key)
+            if window is not None:
+                window[1] += 1
+                if window[2] is None:
+                    window[2] = now
+                window[3] = now
+                return False
+            window_end = now + self.label_cooldowns.get(label, self.cooldown_seconds)
+            self.windows[key] = [window_end, 0, None, None]
+            heapq.heappush(self.expiry, (window_end, next(self.sequence), key))
+            return True
+
+    def pop_digests(self, now=None):
+        """
+        Gets the digest entries of the windows closed so far and forgets them
+
+        @param now (float): The current time (current time if None)
+        @return (list): A list of dictionaries with the camera_id, label, track_id, the number
+            of suppressed detections, and the first_seen and last_seen times of the suppressed detections
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            self._expire(now)
+            digests, self.digests = self.digests, []
+        return digests
+
+    def _expire(self, now):
+        """
+        Closes the windows that have ended, and keeps a digest entry for each window with
+        suppressed detections. The caller holds the lock.
+
+        @param now (float): The current time
+        """
+        while self.expiry and self.expiry[0][0] <= now:
+            _, _, key = heapq.heappop(self.expiry)
+            _, suppressed, first_suppressed, last_suppressed = self.windows.pop(key)
+            if suppressed:
+                camera_id, label, track_id = key
+                self.digests.append(
+                    {
+                        "camera_id": camera_id,
+                        "label": label,
+                        "track_id": track_id,
+                        "suppressed": suppressed,
+                        "first_seen": first_suppressed,
+                        "last_seen": last_suppressed,
+                    }
+                )
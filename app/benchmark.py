@@ -0,0 +1,106 @@
+import argparse
+import os
+import time
+from itertools import islice
+from input_processor import InputProcessor
+from object_detector import ObjectDetector
+from prediction_cache import PredictionCache
+
+SMALL_OBJECT_AREA = 32 * 32  # Boxes under 32x32 pixels count as small objects
+
+
+def load_frames(input_path, max_frames):
+    """
+    Loads the frames to benchmark from an image, a video, or a directory
+
+    @param input_path (str): The path of the image, video, or directory
+    @param max_frames (int): The maximum number of frames to load
+    @return (list): A list of frames
+    """
+    if os.path.isdir(input_path):
+        input_data = InputProcessor.iter_directory(input_path)
+    elif input_path.lower().endswith((".jpg", ".jpeg", ".png")):
+        input_data = InputProcessor.iter_image(input_path)
+    else:
+        input_data = InputProcessor.iter_video(input_path)
+    return [frame for frame, _ in islice(input_data, max_frames)]
+
+
+def run_benchmark(object_detector, frames, cached=False):
+    """
+    Detects objects in every frame and measures the detection time.
+    Detections go straight to the backend, so caching and output images are not measured,
+    unless cached is set to go through the persistent prediction cache.
+
+    @param object_detector (ObjectDetector): The object detector to benchmark
+    @param frames (list): The frames to detect objects in
+    @param cached (bool): Whether to detect through the persistent prediction cache
+    @return (dict): The total and per-frame time, and the number of detections and small objects
+    """
+    predict = (
+        object_detector._predict_cached if cached else object_detector._predict_frames
+    )
+    detections = []
+    start = time.perf_counter()
+    for frame in frames:
+        detections.extend(predict([frame])[0])
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "ms_per_frame": 1000 * elapsed / max(1, len(frames)),
+        "detections": len(detections),
+        "small_objects": sum(
+            1
+            for detection in detections
+            if detection["bbox"][2] * detection["bbox"][3] < SMALL_OBJECT_AREA
+        ),
+    }
+
+
+def main():
+    """
+    Driver function to compare full-frame and tiled inference on the same frames
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare full-frame and tiled object detection"
+    )
+    parser.add_argument("input_path", help="Image, video, or directory to benchmark")
+    parser.add_argument(
+        "--frames", type=int, default=20, help="Maximum number of frames to detect"
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Detect through the persistent prediction cache "
+        "(with PREDICTION_CACHE_REPLAY, replay cached predictions without the model)",
+    )
+    args = parser.parse_args()
+
+    frames = load_frames(args.input_path, args.frames)
+    if not frames:
+        print(f"No frames found in {args.input_path}")
+        return
+    height, width = frames[0].shape[:2]
+    print(f"Benchmarking {len(frames)} frames of {width}x{height}...")
+
+    object_detector = ObjectDetector(
+        tiled=True, prediction_cache=PredictionCache() if args.cache else None
+    )
+    modes = [("full-frame", False), ("tiled", True)]
+    print(
+        f"{'Mode':<12}{'Total (s)':>12}{'ms/frame':>12}{'Detections':>12}{'Small':>8}"
+    )
+    try:
+        for name, tiled in modes:
+            object_detector.tiled = tiled
+            result = run_benchmark(object_detector, frames, args.cache)
+            print(
+                f"{name:<12}{result['seconds']:>12.2f}{result['ms_per_frame']:>12.1f}"
+                f"{result['detections']:>12}{result['small_objects']:>8}"
+            )
+    finally:
+        object_detector.close()
+
+
+if __name__ == "__main__":
+    main()
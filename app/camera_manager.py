@@ -1,9 +1,17 @@
 import cv2
 from object_detector import ObjectDetector
 from file_processor import FileProcessor
-import queue
+from event_recorder import EventRecorder
+from object_tracker import ObjectTracker
+from motion_gate import MotionGate
+from camera_reconnector import CameraReconnector
+from frame_buffer import FrameBuffer
+from stream_grabber import StreamGrabber
 import config
+import re
 import threading
+import time
+from urllib.parse import urlsplit
 
 
 class CameraManagerFactory:
@@ -17,18 +25,19 @@ class CameraManagerFactory:
     """
 
     @staticmethod
-    def create_camera_manager(use_multithreading=True):
+    def create_camera_manager(use_multithreading=True, notification_manager=None):
         """
         Creates an instance of the CameraManager class based on the use_multithreading flag.
         Default is to use multithreading.
 
         @param use_multithreading (bool): Flag to determine whether to use multithreading
+        @param notification_manager (NotificationManager): The notification manager to alert live detections to, or None
         @return (CameraManager): An instance of the CameraManager class
         """
         if use_multithreading:
-            return MultithreadedCameraManager()
+            return MultithreadedCameraManager(notification_manager)
         else:
-            return SingleThreadedCameraManager()
+            return SingleThreadedCameraManager(notification_manager)
 
 
 class BaseCameraManager:
@@ -37,44 +46,106 @@ class BaseCameraManager:
     The CameraManager class is responsible for connecting to a camera, capturing frames, and streaming live video.
 
     Attributes:
-    - camera (cv2.VideoCapture): The camera object
-    - camera_id (str): The camera ID
+    - camera (cv2.VideoCapture): The camera object (a StreamGrabber when the grabber thread is enabled)
+    - camera_id (str): The camera ID used in output paths, reports, and messages, never containing credentials
+    - camera_source (str): The camera index, stream URL (RTSP/HTTP), or video file path the capture is opened from
+    - notification_manager (NotificationManager): The notification manager to alert live detections to, or None
 
     Methods:
-    - connect_camera(self, camera_id): Connects to the camera with the given camera ID
+    - connect_camera(self, source, camera_id): Connects to the camera at the given source
     - disconnect_camera(self): Disconnects from the camera
     - is_camera_connected(self): Checks if the camera is connected
     - get_camera_id(self): Gets the camera ID
     - capture_frame(self): Captures a frame from the camera
     - start_live_stream(self): Starts the live video stream from the camera
     - stop_live_stream(self): Stops the live video stream from the camera
+    - sanitize_camera_id(source): Gets a camera ID from a source that is safe to display and use in paths
+    - _open_capture(self, source): Opens a new capture for the camera without changing the current one
+    - _replace_capture(self, capture, source, camera_id): Replaces the current capture with a newly opened one
     """
 
-    def __init__(self):
+    def __init__(self, notification_manager=None):
         """
         Initializes the BaseCameraManager with default values for the camera and camera ID.
+
+        @param notification_manager (NotificationManager): The notification manager to alert live detections to, or None
         """
         self.camera = None
         self.camera_id = None
+        self.camera_source = None
+        self.notification_manager = notification_manager
 
-    def connect_camera(self, camera_id):
+    def connect_camera(self, source, camera_id=None):
         """
-        Connects to the camera with the given camera ID.
+        Connects to the camera at the given source.
+        The source is only used to open the capture, as stream URLs can contain credentials.
 
-        @param camera_id (str): The camera ID
+        @param source (str): The camera index, stream URL, or video file path
+        @param camera_id (str): The camera ID (derived from the source if None)
         @return (bool): True if the connection was successful, False otherwise
         """
-        try:
-            self.camera = cv2.VideoCapture(int(camera_id))
-            if not self.camera.isOpened():
-                raise Exception(f"Cannot open camera {camera_id}")
-            self.camera_id = camera_id
-            return True
-        except Exception as e:
-            print(f"Error connecting to camera: {str(e)}")
+        capture = self._open_capture(source)
+        if capture is None:
             self.camera = None
             self.camera_id = None
+            self.camera_source = None
             return False
+        self._replace_capture(capture, source, camera_id)
+        return True
+
+    @staticmethod
+    def sanitize_camera_id(source):
+        """
+        Gets a camera ID from a source that is safe to display and use in paths.
+        A configured camera source gets its position in CAMERA_SOURCES, like in the multi-camera view,
+        and any other stream URL gets its host, port, and path, without the user and password.
+
+        @param source (str): The camera index, stream URL, or video file path
+        @return (str): The camera ID
+        """
+        source = str(source)
+        if source in config.CAMERA_SOURCES:
+            return str(config.CAMERA_SOURCES.index(source) + 1)
+        if "://" not in source:
+            return source
+        url = urlsplit(source)
+        camera_id = f"{url.hostname or ''}_{url.port or ''}_{url.path}"
+        return re.sub(r"[^A-Za-z0-9.-]+", "_", camera_id).strip("_") or "camera"
+
+    def _open_capture(self, source):
+        """
+        Opens a new capture for the camera without changing the current one.
+        The capture is wrapped in a StreamGrabber if enabled, so reads always get the freshest frame.
+
+        @param source (str): The camera index, stream URL, or video file path
+        @return (cv2.VideoCapture): The opened capture, or None if the camera could not be opened
+        """
+        try:
+            capture = StreamGrabber.open_capture(source)
+            if not capture.isOpened():
+                capture.release()
+                raise Exception(f"Cannot open camera {self.sanitize_camera_id(source)}")
+            if config.CAMERA_GRABBER_THREAD:
+                return StreamGrabber(source, capture)
+            return capture
+        except Exception as e:
+            print(f"Error connecting to camera: {str(e)}")
+            return None
+
+    def _replace_capture(self, capture, source, camera_id=None):
+        """
+        Replaces the current capture with a newly opened one and releases the old one.
+
+        @param capture (cv2.VideoCapture): The newly opened capture
+        @param source (str): The camera index, stream URL, or video file path of the capture
+        @param camera_id (str): The camera ID (derived from the source if None)
+        """
+        old_capture = self.camera
+        self.camera = capture
+        self.camera_source = source
+        self.camera_id = camera_id or self.sanitize_camera_id(source)
+        if old_capture is not None:
+            old_capture.release()
 
     def disconnect_camera(self):
         """
@@ -86,6 +157,7 @@ class BaseCameraManager:
             self.camera.release()
             self.camera = None
             self.camera_id = None
+            self.camera_source = None
 
     def is_camera_connected(self):
         """
@@ -149,31 +221,64 @@ class SingleThreadedCameraManager(BaseCameraManager):
         Starts the live video stream from the camera.
         The live video stream is displayed in a window using OpenCV.
         """
+        object_detector = None
+        reconnector = None
+        event_recorder = None
+        file_processor = None
         try:
+            if self.camera_id is None:
+                raise Exception("No camera connected")
+            reconnector = CameraReconnector(self, self.camera_source, self.camera_id)
             if not self.is_camera_connected():
-                if not self.connect_camera(self.camera_id):
-                    raise Exception("Failed to connect to camera")
+                reconnector.request_reconnect()
             object_detector = ObjectDetector()
-            file_processor = FileProcessor(config.OUT_LIVE_DIR, self.camera_id)
+            if config.EVENT_CLIPS_ENABLED:
+                event_recorder = EventRecorder(self.camera_id)
+            if config.CONTINUOUS_RECORDING:
+                file_processor = FileProcessor(config.OUT_LIVE_DIR, self.camera_id)
+                file_processor.start_segmented_recording()
+            motion_gate = MotionGate() if config.MOTION_GATE_ENABLED else None
+            tracker = (
+                ObjectTracker(keep_finished=False) if config.TRACKING_ENABLED else None
+            )
             while True:  # Loop stores frames in the queue while streaming
-                ret, frame = self.camera.read()
-                if not ret:
-                    print("Lost connection to camera. Attempting to reconnect...")
-                    self.disconnect_camera()
-                    if not self.connect_camera(self.camera_id):
-                        print("Failed to reconnect to camera")
-                        break  # Exit the loop if reconnection fails
-                    continue  # Reconnection successful, continue streaming
-                detections = object_detector.detect_objects(
-                    frame, self.camera_id, config.OUT_LIVE_DIR
-                )
-                file_processor.write_frame(frame)
+                frame = reconnector.read_frame()
+                if frame is None:  # Keep the window responsive while reconnecting
+                    if cv2.waitKey(config.CAMERA_IDLE_WAIT_MS) & 0xFF == ord("q"):
+                        break
+                    continue
+                detections = []
+                if tracker is not None and not tracker.should_detect():
+                    detections = tracker.predict(time.time())  # Between detector runs
+                elif motion_gate is None or motion_gate.should_detect(frame):
+                    detections, _ = object_detector.detect_objects(
+                        frame, self.camera_id, config.OUT_LIVE_DIR
+                    )
+                    if tracker is not None:
+                        detections = tracker.update(detections, time.time())
+                object_detector.annotate_frame(frame, detections)
+                if self.notification_manager is not None and detections:
+                    self.notification_manager.send_detection_alerts(
+                        self.camera_id, detections
+                    )
+                if event_recorder is not None:
+                    event_recorder.add_frame(frame, bool(detections))
+                if file_processor is not None:
+                    file_processor.write_frame(frame)
                 cv2.imshow(f"Live Stream - Camera {self.camera_id}", frame)
                 if cv2.waitKey(1) & 0xFF == ord("q"):
                     break
         except Exception as e:
             print(f"Error during live stream: {str(e)}")
         finally:
+            if reconnector is not None:
+                reconnector.stop()
+            if object_detector is not None:
+                object_detector.close()  # Write the pending output images
+            if event_recorder is not None:
+                event_recorder.close()  # Write the clip being recorded
+            if file_processor is not None:
+                file_processor.stop_segmented_recording()  # Close the last segment
             if self.camera:
                 self.camera.release()
                 self.camera = None
@@ -194,16 +299,18 @@ class MultithreadedCameraManager(BaseCameraManager):
     However, the current implementation does not fully isolate the processes.
     """
 
-    def __init__(self):
+    def __init__(self, notification_manager=None):
         """
         Initializes the MultithreadedCameraManager with a streaming event and a frame queue.
+        The frame queue is a bounded buffer, so frames are dropped when the display falls behind.
 
+        @param notification_manager (NotificationManager): The notification manager to alert live detections to, or None
         @param streaming (threading.Event): The streaming event
-        @param frame_queue (queue.Queue): The frame queue
+        @param frame_queue (FrameBuffer): The bounded frame buffer
         """
-        super().__init__()
+        super().__init__(notification_manager)
         self.streaming = threading.Event()  # Event to control streaming
-        self.frame_queue = queue.Queue()  # Queue to store frames
+        self.frame_queue = FrameBuffer()  # Bounded buffer to store frames
 
     def start_live_stream(self):
         """
@@ -221,32 +328,64 @@ class MultithreadedCameraManager(BaseCameraManager):
         For demonstration purposes, the live video stream is displayed in a window using OpenCV.
         The current implementation does not fully isolate the frame capture and object detection processes from the live video display process.
         """
+        object_detector = None
+        reconnector = None
+        event_recorder = None
+        file_processor = None
         try:
+            if self.camera_id is None:
+                raise Exception("No camera connected")
+            reconnector = CameraReconnector(self, self.camera_source, self.camera_id)
             if not self.is_camera_connected():
-                if not self.connect_camera(self.camera_id):
-                    raise Exception("Failed to connect to camera")
+                reconnector.request_reconnect()
             object_detector = ObjectDetector()
-            file_processor = FileProcessor(config.OUT_LIVE_DIR, self.camera_id)
+            if config.EVENT_CLIPS_ENABLED:
+                event_recorder = EventRecorder(self.camera_id)
+            if config.CONTINUOUS_RECORDING:
+                file_processor = FileProcessor(config.OUT_LIVE_DIR, self.camera_id)
+                file_processor.start_segmented_recording()
+            motion_gate = MotionGate() if config.MOTION_GATE_ENABLED else None
+            tracker = (
+                ObjectTracker(keep_finished=False) if config.TRACKING_ENABLED else None
+            )
             while (
                 self.streaming.is_set()
             ):  # Loop stores frames in the queue while streaming
-                ret, frame = self.camera.read()
-                if not ret:
-                    print("Lost connection to camera. Attempting to reconnect...")
-                    self.disconnect_camera()
-                    if not self.connect_camera(self.camera_id):
-                        print("Failed to reconnect to camera")
-                        break  # Exit the loop if reconnection fails
-                    continue  # Reconnection successful, continue streaming
-                detections = object_detector.detect_objects(
-                    frame, self.camera_id, config.OUT_LIVE_DIR
-                )
-                file_processor.write_frame(frame)
+                frame = reconnector.read_frame()
+                if frame is None:  # Keep streaming while the camera reconnects
+                    time.sleep(config.CAMERA_IDLE_WAIT_MS / 1000)
+                    continue
+                detections = []
+                if tracker is not None and not tracker.should_detect():
+                    detections = tracker.predict(time.time())  # Between detector runs
+                elif motion_gate is None or motion_gate.should_detect(frame):
+                    detections, _ = object_detector.detect_objects(
+                        frame, self.camera_id, config.OUT_LIVE_DIR
+                    )
+                    if tracker is not None:
+                        detections = tracker.update(detections, time.time())
+                object_detector.annotate_frame(frame, detections)
+                if self.notification_manager is not None and detections:
+                    self.notification_manager.send_detection_alerts(
+                        self.camera_id, detections
+                    )
+                if event_recorder is not None:
+                    event_recorder.add_frame(frame, bool(detections))
+                if file_processor is not None:
+                    file_processor.write_frame(frame)
                 self.frame_queue.put(frame)
         except Exception as e:
             print(f"Error during frame loop: {str(e)}")
         finally:
             self.streaming.clear()
+            if reconnector is not None:
+                reconnector.stop()
+            if object_detector is not None:
+                object_detector.close()  # Write the pending output images
+            if event_recorder is not None:
+                event_recorder.close()  # Write the clip being recorded
+            if file_processor is not None:
+                file_processor.stop_segmented_recording()  # Close the last segment
             if self.camera:
                 self.camera.release()
                 self.camera = None
@@ -258,13 +397,18 @@ class MultithreadedCameraManager(BaseCameraManager):
         The display_frames method should be optimized for live streaming multiple cameras simultaneously.
         """
         while self.streaming.is_set():
-            if not self.frame_queue.empty():
-                frame = self.frame_queue.get()
-                if frame is not None:
-                    cv2.imshow(f"Live Stream - Camera {self.camera_id}", frame)
-                    if cv2.waitKey(1) & 0xFF == ord("q"):
-                        self.stop_live_stream()
-                        break
+            # Wait for a frame instead of polling, so the display thread does not spin
+            frame = self.frame_queue.get(timeout=config.LIVE_BUFFER_TIMEOUT)
+            if frame is not None:
+                cv2.imshow(f"Live Stream - Camera {self.camera_id}", frame)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    self.stop_live_stream()
+                    break
+        stats = self.frame_queue.stats()
+        print(
+            f"Camera {self.camera_id}: {stats['dropped']} of {stats['put']} frames dropped by the display"
+        )
+        self.frame_queue.clear()
         cv2.destroyAllWindows()
         cv2.waitKey(1)
 
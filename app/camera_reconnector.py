@@ -0,0 +1,175 @@
+import random
+import threading
+import config
+
+
+class CameraReconnector:
+    """
+    CameraReconnector class to read frames from a camera and reconnect it in the background.
+    When reads keep failing, the camera is reopened on a background thread with exponential
+    backoff and jitter, while read_frame returns None immediately so the caller's loop keeps
+    running. A flaky camera therefore never stalls the stream or the other cameras.
+
+    The health state of the camera is one of:
+    - connected: The last read succeeded
+    - degraded: Recent reads failed, but fewer than the failure threshold
+    - reconnecting: The camera is being reopened in the background
+
+    Attributes:
+    - camera_manager (BaseCameraManager): The camera connection to read from and reconnect
+    - source (str): The camera index or stream URL
+    - camera_id (str): The camera ID shown in messages, as the stream URL can contain credentials
+    - base_delay (float): The delay before the second reconnect attempt, in seconds
+    - max_delay (float): The maximum delay between reconnect attempts, in seconds
+    - jitter (float): The random fraction added to or removed from each delay (0-1)
+    - failure_threshold (int): The number of consecutive failed reads that trigger a reconnect
+    - state (str): The health state of the camera
+    - failures (int): The number of consecutive failed reads
+    - reconnect_count (int): The number of successful reconnects
+    - lock (threading.Lock): The lock to guard the state
+    - stopped (threading.Event): The event to stop the reconnect thread
+    - thread (threading.Thread): The reconnect thread
+
+    Methods:
+    - get_state(self): Gets the health state of the camera
+    - read_frame(self): Reads a frame without waiting for a pending reconnect
+    - request_reconnect(self): Starts reconnecting in the background, if not already reconnecting
+    - stop(self): Stops the reconnect thread
+    - _next_delay(self, attempt): Computes the backoff delay before the next reconnect attempt
+    - _reconnect_loop(self): Reconnect thread loop that reopens the camera with backoff
+    """
+
+    CONNECTED = "connected"
+    DEGRADED = "degraded"
+    RECONNECTING = "reconnecting"
+
+    def __init__(
+        self,
+        camera_manager,
+        source,
+        camera_id=None,
+        base_delay=config.CAMERA_RECONNECT_DELAY,
+        max_delay=config.CAMERA_RECONNECT_MAX_DELAY,
+        jitter=config.CAMERA_RECONNECT_JITTER,
+        failure_threshold=config.CAMERA_READ_FAILURE_THRESHOLD,
+    ):
+        """
+        Initializes the CameraReconnector with the given camera, source, and backoff settings
+
+        @param camera_manager (BaseCameraManager): The camera connection to read from and reconnect
+        @param source (str): The camera index or stream URL
+        @param camera_id (str): The camera ID shown in messages (derived from the source if None)
+        @param base_delay (float): The delay before the second reconnect attempt, in seconds
+        @param max_delay (float): The maximum delay between reconnect attempts, in seconds
+        @param jitter (float): The random fraction added to or removed from each delay (0-1)
+        @param failure_threshold (int): The number of consecutive failed reads that trigger a reconnect
+        """
+        self.camera_manager = camera_manager
+        self.source = source
+        self.camera_id = camera_id or camera_manager.sanitize_camera_id(source)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.failure_threshold = max(1, failure_threshold)
+        self.state = (
+            self.CONNECTED if camera_manager.is_camera_connected() else self.DEGRADED
+        )
+        self.failures = 0
+        self.reconnect_count = 0
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def get_state(self):
+        """
+        Gets the health state of the camera
+
+        @return (str): The health state (connected, degraded, or reconnecting)
+        """
+        with self.lock:
+            return self.state
+
+    def read_frame(self):
+        """
+        Reads a frame without waiting for a pending reconnect.
+        Repeated failures start a background reconnect.
+
+        @return (numpy.ndarray): The captured frame, or None if no frame is available
+        """
+        with self.lock:
+            if self.state == self.RECONNECTING:
+                return None
+
+        if self.camera_manager.is_camera_connected():
+            frame = self.camera_manager.capture_frame()
+            if frame is not None:
+                with self.lock:
+                    self.failures = 0
+                    self.state = self.CONNECTED
+                return frame
+
+        with self.lock:
+            self.failures += 1
+            failed = self.failures >= self.failure_threshold
+            if not failed:
+                self.state = self.DEGRADED
+        if failed:
+            self.request_reconnect()
+        return None
+
+    def request_reconnect(self):
+        """
+        Starts reconnecting in the background, if not already reconnecting
+        """
+        with self.lock:
+            if self.state == self.RECONNECTING or self.stopped.is_set():
+                return
+            self.state = self.RECONNECTING
+        print(f"Camera {self.camera_id}: Reconnecting in the background...")
+        self.thread = threading.Thread(target=self._reconnect_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the reconnect thread
+        """
+        self.stopped.set()
+        if self.thread is not None and self.thread != threading.current_thread():
+            self.thread.join()
+
+    def _next_delay(self, attempt):
+        """
+        Computes the backoff delay before the next reconnect attempt
+
+        @param attempt (int): The number of failed attempts so far
+        @return (float): The delay in seconds
+        """
+        delay = min(self.max_delay, self.base_delay * (2**attempt))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _reconnect_loop(self):
+        """
+        Reconnect thread loop that reopens the camera with backoff.
+        The new capture is opened before the old one is replaced, so the slow open
+        never happens on the caller's thread.
+        """
+        attempt = 0
+        while not self.stopped.is_set():
+            capture = self.camera_manager._open_capture(self.source)
+            if capture is not None:
+                self.camera_manager._replace_capture(
+                    capture, self.source, self.camera_id
+                )
+                with self.lock:
+                    self.failures = 0
+                    self.reconnect_count += 1
+                    self.state = self.CONNECTED
+                print(f"Camera {self.camera_id}: Reconnected.")
+                return
+            delay = self._next_delay(attempt)
+            attempt += 1
+            print(
+                f"Camera {self.camera_id}: Reconnect attempt {attempt} failed. "
+                f"Retrying in {delay:.1f}s..."
+            )
+            self.stopped.wait(delay)
@@ -5,7 +5,67 @@ load_dotenv()
 
 ROBOFLOW_API_KEY = os.getenv("ROBOFLOW_API_KEY")
 ROBOFLOW_PROJECT = os.getenv("ROBOFLOW_PROJECT")
-ROBOFLOW_MODEL = int(os.getenv("ROBOFLOW_MODEL"))
+ROBOFLOW_MODEL = int(os.getenv("ROBOFLOW_MODEL", "1"))
+
+DETECTOR_BACKEND = os.getenv("DETECTOR_BACKEND", "roboflow")  # roboflow or onnx
+DETECTION_CONFIDENCE = int(os.getenv("DETECTION_CONFIDENCE", "40"))
+DETECTION_OVERLAP = int(os.getenv("DETECTION_OVERLAP", "30"))
+
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "models/model.onnx")
+ONNX_LABELS_FILE = os.getenv("ONNX_LABELS_FILE", "models/labels.txt")
+ONNX_INPUT_SIZE = int(os.getenv("ONNX_INPUT_SIZE", "640"))
+# auto, yolov5 (x, y, w, h, objectness, scores), or yolov8 (x, y, w, h, scores)
+ONNX_OUTPUT_FORMAT = os.getenv("ONNX_OUTPUT_FORMAT", "auto").lower()
+
+# Tiled inference: detect in overlapping tiles of the frame, for small objects in large frames
+TILED_INFERENCE = os.getenv("TILED_INFERENCE", "false").lower() == "true"
+TILE_SIZE = int(os.getenv("TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.2"))
+TILE_BATCH_SIZE = int(os.getenv("TILE_BATCH_SIZE", "4"))
+TILE_WORKERS = int(os.getenv("TILE_WORKERS", "4"))
+TILE_FULL_FRAME = os.getenv("TILE_FULL_FRAME", "true").lower() == "true"
+
+FRAME_CACHE_ENABLED = os.getenv("FRAME_CACHE_ENABLED", "false").lower() == "true"
+FRAME_CACHE_MAX_ENTRIES = int(os.getenv("FRAME_CACHE_MAX_ENTRIES", "256"))
+FRAME_CACHE_TTL = float(os.getenv("FRAME_CACHE_TTL", "10.0"))
+FRAME_CACHE_TOLERANCE = int(os.getenv("FRAME_CACHE_TOLERANCE", "4"))
+
+# Persistent cache of scan predictions, keyed by frame content, model, and parameters
+PREDICTION_CACHE_ENABLED = (
+    os.getenv("PREDICTION_CACHE_ENABLED", "false").lower() == "true"
+)
+PREDICTION_CACHE_PATH = os.getenv("PREDICTION_CACHE_PATH", "cache/predictions.db")
+PREDICTION_CACHE_MAX_MB = float(os.getenv("PREDICTION_CACHE_MAX_MB", "512"))
+# Serve scans from the cache only, without the model (misses are errors)
+PREDICTION_CACHE_REPLAY = (
+    os.getenv("PREDICTION_CACHE_REPLAY", "false").lower() == "true"
+)
+
+FRAME_WRITER_ASYNC = os.getenv("FRAME_WRITER_ASYNC", "true").lower() == "true"
+FRAME_WRITER_QUEUE_SIZE = int(os.getenv("FRAME_WRITER_QUEUE_SIZE", "64"))
+FRAME_WRITER_THREADS = int(os.getenv("FRAME_WRITER_THREADS", "2"))
+
+MOTION_GATE_ENABLED = os.getenv("MOTION_GATE_ENABLED", "false").lower() == "true"
+MOTION_GATE_METHOD = os.getenv("MOTION_GATE_METHOD", "mog2")  # mog2 or diff
+MOTION_GATE_THRESHOLD = float(os.getenv("MOTION_GATE_THRESHOLD", "0.01"))
+MOTION_GATE_MIN_INTERVAL = float(os.getenv("MOTION_GATE_MIN_INTERVAL", "0.5"))
+MOTION_GATE_WIDTH = int(os.getenv("MOTION_GATE_WIDTH", "160"))
+
+# Frame buffer between capture and display: drop_oldest or latest_only
+LIVE_BUFFER_POLICY = os.getenv("LIVE_BUFFER_POLICY", "drop_oldest")
+LIVE_BUFFER_SIZE = int(os.getenv("LIVE_BUFFER_SIZE", "4"))
+LIVE_BUFFER_TIMEOUT = float(os.getenv("LIVE_BUFFER_TIMEOUT", "0.1"))
+
+SCAN_BATCH_SIZE = int(os.getenv("SCAN_BATCH_SIZE", "8"))
+SCAN_WORKERS = int(os.getenv("SCAN_WORKERS", "1"))
+SCAN_MAX_IN_FLIGHT = int(os.getenv("SCAN_MAX_IN_FLIGHT", "32"))
+# Sampling policy for video scans: all, nth, fps, or scene
+SCAN_SAMPLING_POLICY = os.getenv("SCAN_SAMPLING_POLICY", "all")
+SCAN_SAMPLE_EVERY_N = int(os.getenv("SCAN_SAMPLE_EVERY_N", "10"))
+SCAN_SAMPLE_FPS = float(os.getenv("SCAN_SAMPLE_FPS", "1.0"))
+SCAN_SCENE_METHOD = os.getenv("SCAN_SCENE_METHOD", "diff")  # diff or hist
+SCAN_SCENE_THRESHOLD = float(os.getenv("SCAN_SCENE_THRESHOLD", "0.1"))
+SCAN_SCENE_CHECK_EVERY = int(os.getenv("SCAN_SCENE_CHECK_EVERY", "5"))
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
 SENDER_EMAIL = os.getenv("SENDER_EMAIL")
@@ -14,6 +74,13 @@ TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
 
+# API base URLs, to send notifications to a local stand-in when testing
+SENDGRID_API_HOST = os.getenv("SENDGRID_API_HOST", "https://api.sendgrid.com")
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "https://api.twilio.com")
+# Concurrent SMS sends, at most the 10 pooled connections of the Twilio client
+NOTIFICATION_WORKERS = int(os.getenv("NOTIFICATION_WORKERS", "8"))
+NOTIFICATION_TIMEOUT = float(os.getenv("NOTIFICATION_TIMEOUT", "10.0"))
+
 RECIPIENTS_FILE = os.getenv("RECIPIENTS_FILE", "recipients.txt")
 
 IN_DIR = os.getenv("IN_DIR", "input")
@@ -27,6 +94,97 @@ OUT_MOV_DIR = os.getenv("OUT_MOV_DIR", "output/mov")
 OUT_LIVE_DIR = os.getenv("OUT_LIVE_DIR", "output/live")
 
 REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+DETECTION_DB_PATH = os.getenv(
+    "DETECTION_DB_PATH", os.path.join(REPORTS_DIR, "detections.db")
+)
+# Scan reports are written to the detection store in chunks while the scan runs
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", "500"))  # Rows per write
+REPORT_SYNC_SECONDS = float(os.getenv("REPORT_SYNC_SECONDS", "5.0"))
+# Alerts are queued in a local outbox and delivered in the background, with retries
+ALERT_OUTBOX_PATH = os.getenv(
+    "ALERT_OUTBOX_PATH", os.path.join(REPORTS_DIR, "alert_outbox.db")
+)
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "8"))
+ALERT_BACKOFF_BASE = float(os.getenv("ALERT_BACKOFF_BASE", "2.0"))  # Seconds
+ALERT_BACKOFF_MAX = float(os.getenv("ALERT_BACKOFF_MAX", "300"))
+# Rate limits per channel, in messages per second, with bursts of up to BURST messages
+ALERT_EMAIL_RATE = float(os.getenv("ALERT_EMAIL_RATE", "1.0"))
+ALERT_EMAIL_BURST = int(os.getenv("ALERT_EMAIL_BURST", "5"))
+ALERT_SMS_RATE = float(os.getenv("ALERT_SMS_RATE", "1.0"))
+ALERT_SMS_BURST = int(os.getenv("ALERT_SMS_BURST", "5"))
+ALERT_POLL_SECONDS = float(os.getenv("ALERT_POLL_SECONDS", "0.5"))
+ALERT_RETENTION_DAYS = float(os.getenv("ALERT_RETENTION_DAYS", "7"))
+# Whether live streams alert staff of their detections by email and SMS
+LIVE_ALERTS_ENABLED = os.getenv("LIVE_ALERTS_ENABLED", "false").lower() == "true"
+# Live detections alert once per camera and label (and track if ALERT_PER_TRACK) per cooldown;
+# the detections suppressed during a cooldown are sent as a digest when it ends
+ALERT_COOLDOWN_SECONDS = float(os.getenv("ALERT_COOLDOWN_SECONDS", "300"))
+# Comma-separated label:seconds pairs that override the cooldown of specific labels
+ALERT_LABEL_COOLDOWNS = {
+    label.strip(): float(seconds)
+    for label, seconds in (
+        pair.split(":", 1)
+        for pair in os.getenv("ALERT_LABEL_COOLDOWNS", "").split(",")
+        if ":" in pair
+    )
+}
+ALERT_PER_TRACK = os.getenv("ALERT_PER_TRACK", "false").lower() == "true"
 
 NETWORK_CAMERA_IP_1 = os.getenv("NETWORK_CAMERA_IP_1")
 NETWORK_CAMERA_IP_2 = os.getenv("NETWORK_CAMERA_IP_2")
+
+# Comma-separated camera indexes or stream URLs for multi-camera streaming
+CAMERA_SOURCES = [
+    source.strip()
+    for source in os.getenv(
+        "CAMERA_SOURCES",
+        ",".join(filter(None, [NETWORK_CAMERA_IP_1, NETWORK_CAMERA_IP_2])),
+    ).split(",")
+    if source.strip()
+]
+CAMERA_RECONNECT_DELAY = float(os.getenv("CAMERA_RECONNECT_DELAY", "1.0"))
+CAMERA_RECONNECT_MAX_DELAY = float(os.getenv("CAMERA_RECONNECT_MAX_DELAY", "60.0"))
+CAMERA_RECONNECT_JITTER = float(os.getenv("CAMERA_RECONNECT_JITTER", "0.5"))
+CAMERA_READ_FAILURE_THRESHOLD = int(os.getenv("CAMERA_READ_FAILURE_THRESHOLD", "3"))
+CAMERA_IDLE_WAIT_MS = int(os.getenv("CAMERA_IDLE_WAIT_MS", "10"))
+
+# Network streams: FFmpeg options ("key;value" pairs separated by "|") and timeouts
+CAMERA_FFMPEG_OPTIONS = os.getenv(
+    "CAMERA_FFMPEG_OPTIONS", "rtsp_transport;tcp|fflags;nobuffer|flags;low_delay"
+)
+CAMERA_OPEN_TIMEOUT_MS = int(os.getenv("CAMERA_OPEN_TIMEOUT_MS", "5000"))
+CAMERA_READ_TIMEOUT_MS = int(os.getenv("CAMERA_READ_TIMEOUT_MS", "5000"))
+CAMERA_GRABBER_THREAD = os.getenv("CAMERA_GRABBER_THREAD", "true").lower() == "true"
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", "2"))
+
+# Event clips: seconds of pre-roll kept in memory and recorded after the last detection
+EVENT_CLIPS_ENABLED = os.getenv("EVENT_CLIPS_ENABLED", "true").lower() == "true"
+EVENT_PRE_SECONDS = float(os.getenv("EVENT_PRE_SECONDS", "5.0"))
+EVENT_POST_SECONDS = float(os.getenv("EVENT_POST_SECONDS", "5.0"))
+EVENT_MAX_SECONDS = float(os.getenv("EVENT_MAX_SECONDS", "60.0"))
+EVENT_JPEG_QUALITY = int(os.getenv("EVENT_JPEG_QUALITY", "80"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "64"))
+EVENT_CLIP_FPS = float(os.getenv("EVENT_CLIP_FPS", "20.0"))
+
+# Continuous recording of the live streams, split into segments of at most N seconds or megabytes
+CONTINUOUS_RECORDING = os.getenv("CONTINUOUS_RECORDING", "false").lower() == "true"
+# 0 to record at the measured rate of the live loop
+RECORDING_FPS = float(os.getenv("RECORDING_FPS", "0"))
+RECORDING_SEGMENT_SECONDS = float(os.getenv("RECORDING_SEGMENT_SECONDS", "300"))
+RECORDING_SEGMENT_MAX_MB = float(os.getenv("RECORDING_SEGMENT_MAX_MB", "512"))
+RECORDING_QUEUE_SIZE = int(os.getenv("RECORDING_QUEUE_SIZE", "128"))
+
+# Object tracking: report each object once, and run the live detector on every Nth frame only
+TRACKING_ENABLED = os.getenv("TRACKING_ENABLED", "false").lower() == "true"
+TRACKING_DETECT_EVERY_N = int(os.getenv("TRACKING_DETECT_EVERY_N", "1"))
+TRACKER_IOU_THRESHOLD = float(os.getenv("TRACKER_IOU_THRESHOLD", "0.3"))
+TRACKER_MAX_DISTANCE = float(os.getenv("TRACKER_MAX_DISTANCE", "0.5"))
+TRACKER_MAX_MISSED = int(os.getenv("TRACKER_MAX_MISSED", "5"))
+TRACKER_MIN_HITS = int(os.getenv("TRACKER_MIN_HITS", "1"))
+
+# Multiprocess streaming: frames are shared between processes in fixed-size slots
+LIVE_MULTIPROCESS = os.getenv("LIVE_MULTIPROCESS", "false").lower() == "true"
+LIVE_FRAME_WIDTH = int(os.getenv("LIVE_FRAME_WIDTH", "1280"))
+LIVE_FRAME_HEIGHT = int(os.getenv("LIVE_FRAME_HEIGHT", "720"))
+LIVE_RING_SLOTS = int(os.getenv("LIVE_RING_SLOTS", "8"))
+INFERENCE_PROCESSES = int(os.getenv("INFERENCE_PROCESSES", "2"))
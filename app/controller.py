@@ -1,9 +1,12 @@
 from view import View
 from camera_manager import CameraManagerFactory
+from multi_camera_manager import MultiCameraManager
+from multiprocess_camera_manager import MultiprocessCameraManager
 from scan_manager import ScanManager
 from report_manager import ReportManager
 from notification_manager import NotificationManager
 from file_explorer import FileExplorer
+from scan_checkpoint import ScanCheckpoint
 from datetime import datetime
 import config
 
@@ -29,8 +32,11 @@ class Controller:
     - connect_camera(self): Connects to a camera based on the camera ID obtained from the view
     - run_auto_scan(self): Runs an automatic scan by capturing a frame from the connected camera
     - run_manual_scan(self): Runs a manual scan by processing the input type and path selected by the user
+    - _start_scan_report(self, input_type, input_path): Starts the report of a manual scan, offering to resume an unfinished scan
     - send_report_to_staff(self): Sends the latest report to staff members
     - view_live_stream(self): Views the live stream from the connected camera
+    - view_all_cameras(self): Views the live streams from all configured cameras concurrently
+    - _monitor_all_cameras_multiprocess(self): Monitors all configured cameras with capture and inference in separate processes
     """
 
     def __init__(self):
@@ -38,12 +44,15 @@ class Controller:
         Initializes the Controller with the required managers and services
         """
         self.view = View()
+        self.notification_manager = NotificationManager()
         self.camera_manager = CameraManagerFactory.create_camera_manager(
-            use_multithreading=True
+            use_multithreading=True,
+            notification_manager=(
+                self.notification_manager if config.LIVE_ALERTS_ENABLED else None
+            ),
         )
         self.scan_manager = ScanManager(self.camera_manager)
         self.report_manager = ReportManager()
-        self.notification_manager = NotificationManager()
         self.file_explorer = FileExplorer()
         self.new_scan = False
 
@@ -78,6 +87,9 @@ class Controller:
             elif choice == "5":
                 self.view_live_stream()
             elif choice == "6":
+                self.view_all_cameras()
+            elif choice == "7":
+                self.notification_manager.close()
                 break
             else:
                 self.view.display_invalid_choice()
@@ -100,12 +112,19 @@ class Controller:
         )  # Use camera_id itself if not in map
 
         try:
-            if self.camera_manager.connect_camera(camera_url):
-                self.view.display_camera_connected(camera_id)
+            # A URL entered directly gets an ID without its credentials
+            if self.camera_manager.connect_camera(
+                camera_url, camera_id if camera_id in camera_urls else None
+            ):
+                self.view.display_camera_connected(self.camera_manager.get_camera_id())
             else:
-                self.view.display_camera_connection_error(camera_id)
+                self.view.display_camera_connection_error(
+                    self.camera_manager.sanitize_camera_id(camera_id)
+                )
         except Exception as e:
-            self.view.display_camera_connection_error(camera_id)
+            self.view.display_camera_connection_error(
+                self.camera_manager.sanitize_camera_id(camera_id)
+            )
 
     def run_auto_scan(self):
         """
@@ -118,15 +137,14 @@ class Controller:
             return
 
         try:
-            detections, output_paths = self.scan_manager.run_auto_scan()
-            if detections:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                camera_id = self.camera_manager.get_camera_id()
-                report_path = self.report_manager.save_detections(
-                    detections, timestamp, output_paths, camera_id
-                )
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            camera_id = self.camera_manager.get_camera_id()
+            report_writer = self.report_manager.start_report(timestamp, camera_id)
+            self.scan_manager.run_auto_scan(report_writer)
+            report_path = self.report_manager.finish_report(report_writer)
+            if report_path:
                 self.notification_manager.send_notifications(report_path)
-                self.view.display_report_sent()
+                self.view.display_report_queued()
             else:
                 self.view.display_error_message("No detections made.")
         except Exception as e:
@@ -156,24 +174,47 @@ class Controller:
                 self.view.display_error_message("No input path selected.")
                 return
 
-            detections, output_paths = self.scan_manager.run_scan(
-                input_type, input_path
+            report_writer, checkpoint = self._start_scan_report(input_type, input_path)
+            self.scan_manager.run_scan(
+                input_type, input_path, report_writer, checkpoint=checkpoint
             )
+            report_path = self.report_manager.finish_report(report_writer)
 
-            if not detections:
+            if report_path is None:
                 self.view.display_error_message("No detections made.")
                 return
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            camera_id = self.camera_manager.get_camera_id()
-            report_path = self.report_manager.save_detections(
-                detections, timestamp, output_paths, camera_id=camera_id
-            )
             self.view.display_scan_complete()
             self._toggle_new_scan() if not self.new_scan else None
         except Exception as e:
             self.view.display_error_message(str(e))
 
+    def _start_scan_report(self, input_type, input_path):
+        """
+        Starts the report of a manual scan, offering to resume the unfinished scan of the same input if there is one.
+        An unfinished scan that is not resumed is discarded.
+
+        @param input_type (str): The type of input to process
+        @param input_path (str): The path of the input to process
+        @return (tuple): A tuple containing the report writer and the checkpoint to resume (None for a new scan)
+        """
+        checkpoint = ScanCheckpoint.load(
+            self.report_manager.store, input_type, input_path
+        )
+        if checkpoint is not None:
+            frame_count, _ = self.report_manager.store.count_scan_rows(
+                checkpoint.scan_id
+            )
+            if self.view.get_resume_choice(frame_count):
+                checkpoint.rewind(
+                    self.report_manager.store, restart=config.TRACKING_ENABLED
+                )
+                return self.report_manager.resume_report(checkpoint.scan_id), checkpoint
+            self.report_manager.store.delete_scan(checkpoint.scan_id)
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        camera_id = self.camera_manager.get_camera_id()
+        return self.report_manager.start_report(timestamp, camera_id), None
+
     def send_report_to_staff(self):
         """
         Sends the latest report to staff members
@@ -187,7 +228,7 @@ class Controller:
             report_path = self.report_manager.get_latest_report()
             if report_path:
                 self.notification_manager.send_notifications(report_path)
-                self.view.display_report_sent()
+                self.view.display_report_queued()
                 self._toggle_new_scan() if self.new_scan else None
             else:
                 self.view.display_no_report_available()
@@ -207,3 +248,64 @@ class Controller:
             self.camera_manager.display_frames()
         except Exception as e:
             self.view.display_error_message(str(e))
+
+    def view_all_cameras(self):
+        """
+        Views the live streams from all configured cameras concurrently
+
+        @return (None)
+        """
+        if not config.CAMERA_SOURCES:
+            self.view.display_no_cameras_configured()
+            return
+        if config.LIVE_MULTIPROCESS:
+            self._monitor_all_cameras_multiprocess()
+            return
+
+        multi_camera_manager = MultiCameraManager(
+            self.scan_manager.object_detector,
+            self.notification_manager if config.LIVE_ALERTS_ENABLED else None,
+        )
+        try:
+            for camera_id, source in enumerate(config.CAMERA_SOURCES, start=1):
+                multi_camera_manager.add_camera(str(camera_id), source)
+            multi_camera_manager.start()
+            multi_camera_manager.display_frames()
+        except Exception as e:
+            self.view.display_error_message(str(e))
+        finally:
+            multi_camera_manager.stop()
+
+    def _monitor_all_cameras_multiprocess(self):
+        """
+        Monitors all configured cameras with capture and inference in separate processes.
+        Detections are printed as they arrive. Press Ctrl+C to stop.
+
+        @return (None)
+        """
+        multiprocess_camera_manager = MultiprocessCameraManager()
+        try:
+            for camera_id, source in enumerate(config.CAMERA_SOURCES, start=1):
+                multiprocess_camera_manager.add_camera(str(camera_id), source)
+            multiprocess_camera_manager.start()
+            print("Monitoring all cameras. Press Ctrl+C to stop.")
+            while True:
+                result = multiprocess_camera_manager.get_result(timeout=1.0)
+                if result is None:
+                    continue
+                camera_id, frame_index, _, detections, output_path = result
+                if detections:
+                    labels = ", ".join(detection["label"] for detection in detections)
+                    print(
+                        f"Camera {camera_id} frame {frame_index}: {labels} ({output_path})"
+                    )
+                    if config.LIVE_ALERTS_ENABLED:
+                        self.notification_manager.send_detection_alerts(
+                            camera_id, detections
+                        )
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            self.view.display_error_message(str(e))
+        finally:
+            multiprocess_camera_manager.stop()
@@ -0,0 +1,393 @@
+import cv2
+import numpy as np
+
+
+class DetectionArray:
+    """
+    DetectionArray class to store many detections compactly in a NumPy structured array.
+    Each detection is one fixed-size row instead of a Python dict, and the labels, camera IDs,
+    and sources are stored once in string tables and referenced by index. Filtering, non-maximum
+    suppression, and per-label aggregation are vectorized over the whole array.
+
+    Rows are appended into a buffer that doubles its capacity when full, so building the array
+    one frame at a time stays cheap. Iterating over the array yields detection dicts, so code
+    written for lists of detections keeps working.
+
+    Columns:
+    - frame_index (int64): The index of the frame in its source
+    - timestamp (float64): The time of the frame in its source, in seconds
+    - bbox (float32 x 4): The bounding box (x, y, w, h), with x and y at the center
+    - label_id (int32): The index of the label in the label table
+    - confidence (float32): The confidence of the detection
+    - camera (int32): The index of the camera ID in the camera table (-1 if none)
+    - source (int32): The index of the source in the source table (-1 if none)
+    - track_id (int32): The track ID of a tracked object (-1 if not tracked)
+    - first_seen (float64): The time the tracked object was first seen, in seconds
+    - last_seen (float64): The time the tracked object was last seen, in seconds
+    - frames (int32): The number of frames the object was detected in
+
+    Attributes:
+    - rows (numpy.ndarray): The row buffer, of which the first size rows are used
+    - size (int): The number of detections
+    - labels (list): The label table
+    - cameras (list): The camera ID table
+    - sources (list): The source table
+    - _label_ids, _camera_ids, _source_ids (dict): The index of every value of each string table
+
+    Methods:
+    - from_dicts(detections, **context): Creates an array from a list of detection dicts
+    - from_columns(**columns): Creates an array from columns of values, such as database query results
+    - append(self, detections, frame_index, timestamp, camera_id, source): Appends the detections of a frame
+    - extend(self, other): Appends the detections of another array
+    - data(self): Gets the used rows of the array
+    - label_names(self): Gets the label of every detection
+    - filter(self, min_confidence, labels, camera_id): Selects the detections that match all the given conditions
+    - nms(self, overlap): Removes overlapping detections of the same label, frame, and camera
+    - aggregate(self): Computes the count and confidence statistics of every label
+    - to_dicts(self): Converts the detections to a list of dicts
+    - _reserve(self, count): Grows the row buffer to fit count more rows
+    - _table_index(table, ids, value): Gets the index of a value in a string table, adding it if needed
+    - _select(self, mask): Creates an array with the selected rows and the same string tables
+    """
+
+    DTYPE = np.dtype(
+        [
+            ("frame_index", np.int64),
+            ("timestamp", np.float64),
+            ("bbox", np.float32, (4,)),
+            ("label_id", np.int32),
+            ("confidence", np.float32),
+            ("camera", np.int32),
+            ("source", np.int32),
+            ("track_id", np.int32),
+            ("first_seen", np.float64),
+            ("last_seen", np.float64),
+            ("frames", np.int32),
+        ]
+    )
+
+    def __init__(self, capacity=64):
+        """
+        Initializes an empty DetectionArray
+
+        @param capacity (int): The initial number of rows of the buffer
+        """
+        self.rows = np.zeros(max(1, capacity), dtype=self.DTYPE)
+        self.size = 0
+        self.labels = []
+        self.cameras = []
+        self.sources = []
+        self._label_ids = {}
+        self._camera_ids = {}
+        self._source_ids = {}
+
+    @classmethod
+    def from_dicts(cls, detections, **context):
+        """
+        Creates an array from a list of detection dicts
+
+        @param detections (list): A list of dictionaries containing the detected objects
+        @param context (dict): The frame_index, timestamp, camera_id, and source shared by the detections
+        @return (DetectionArray): The new array
+        """
+        array = cls(capacity=len(detections))
+        array.append(detections, **context)
+        return array
+
+    @classmethod
+    def from_columns(cls, **columns):
+        """
+        Creates an array from columns of values, such as database query results.
+        The label, camera_id, and source columns hold strings (None if missing), the bbox column
+        holds (x, y, w, h) boxes, and the other columns are named after the array columns.
+        Missing columns get their default values.
+
+        @param columns (dict): The column values, all with the same length
+        @return (DetectionArray): The new array
+        """
+        count = len(columns["label"])
+        array = cls(capacity=count)
+        data = array.rows[:count]
+        data["track_id"] = -1
+        data["frames"] = 1
+        for name in DetectionArray.DTYPE.names:
+            if name in columns and name not in ("label_id", "camera", "source"):
+                data[name] = columns[name]
+        for name, column, table, ids in (
+            ("label_id", "label", array.labels, array._label_ids),
+            ("camera", "camera_id", array.cameras, array._camera_ids),
+            ("source", "source", array.sources, array._source_ids),
+        ):
+            data[name] = [
+                -1 if value is None else array._table_index(table, ids, str(value))
+                for value in columns.get(column, [None] * count)
+            ]
+        array.size = count
+        return array
+
+    def __len__(self):
+        """
+        Gets the number of detections
+
+        @return (int): The number of detections
+        """
+        return self.size
+
+    def __iter__(self):
+        """
+        Iterates over the detections as dicts
+
+        @return (generator): A generator of detection dicts
+        """
+        for i in range(self.size):
+            yield self[i]
+
+    def __getitem__(self, index):
+        """
+        Gets one detection as a dict
+
+        @param index (int): The index of the detection
+        @return (dict): The detection, with the track fields only if it is a tracked object
+        """
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("Detection index out of range")
+        row = self.rows[index]
+        detection = {
+            "label": self.labels[row["label_id"]],
+            "confidence": round(float(row["confidence"]), 6),  # Drop float32 noise
+            "bbox": tuple(int(round(float(v))) for v in row["bbox"]),
+            "frame_index": int(row["frame_index"]),
+            "timestamp": float(row["timestamp"]),
+            "camera_id": self.cameras[row["camera"]] if row["camera"] >= 0 else None,
+            "source": self.sources[row["source"]] if row["source"] >= 0 else None,
+        }
+        if row["track_id"] >= 0:
+            detection.update(
+                track_id=int(row["track_id"]),
+                first_seen=float(row["first_seen"]),
+                last_seen=float(row["last_seen"]),
+                frames=int(row["frames"]),
+            )
+        return detection
+
+    def append(
+        self, detections, frame_index=0, timestamp=0.0, camera_id=None, source=None
+    ):
+        """
+        Appends the detections of a frame.
+        Track fields (track_id, first_seen, last_seen, frames) are taken from the dicts if present.
+
+        @param detections (list): A list of dictionaries containing the detected objects
+        @param frame_index (int): The index of the frame in its source
+        @param timestamp (float): The time of the frame in its source, in seconds
+        @param camera_id (str): The camera ID
+        @param source (str): The source path
+        """
+        count = len(detections)
+        if count == 0:
+            return
+        self._reserve(count)
+        new_rows = self.rows[self.size : self.size + count]
+        new_rows["frame_index"] = frame_index
+        new_rows["timestamp"] = timestamp
+        new_rows["camera"] = (
+            -1
+            if camera_id is None
+            else self._table_index(self.cameras, self._camera_ids, str(camera_id))
+        )
+        new_rows["source"] = (
+            -1
+            if source is None
+            else self._table_index(self.sources, self._source_ids, source)
+        )
+        new_rows["bbox"] = [detection["bbox"] for detection in detections]
+        new_rows["confidence"] = [detection["confidence"] for detection in detections]
+        new_rows["label_id"] = [
+            self._table_index(self.labels, self._label_ids, detection["label"])
+            for detection in detections
+        ]
+        new_rows["track_id"] = [
+            detection.get("track_id", -1) for detection in detections
+        ]
+        new_rows["first_seen"] = [
+            detection.get("first_seen", timestamp) for detection in detections
+        ]
+        new_rows["last_seen"] = [
+            detection.get("last_seen", timestamp) for detection in detections
+        ]
+        new_rows["frames"] = [detection.get("frames", 1) for detection in detections]
+        self.size += count
+
+    def extend(self, other):
+        """
+        Appends the detections of another array, remapping its string tables
+
+        @param other (DetectionArray): The array to append
+        """
+        rows = other.data().copy()
+        for column, table, ids, other_table in (
+            ("label_id", self.labels, self._label_ids, other.labels),
+            ("camera", self.cameras, self._camera_ids, other.cameras),
+            ("source", self.sources, self._source_ids, other.sources),
+        ):
+            mapping = np.array(
+                [self._table_index(table, ids, value) for value in other_table] + [-1],
+                dtype=np.int32,
+            )
+            rows[column] = mapping[rows[column]]  # -1 stays -1 with the trailing entry
+        self._reserve(len(rows))
+        self.rows[self.size : self.size + len(rows)] = rows
+        self.size += len(rows)
+
+    def data(self):
+        """
+        Gets the used rows of the array
+
+        @return (numpy.ndarray): A view of the used rows
+        """
+        return self.rows[: self.size]
+
+    def label_names(self):
+        """
+        Gets the label of every detection
+
+        @return (numpy.ndarray): The labels, in detection order
+        """
+        return np.array(self.labels, dtype=object)[self.data()["label_id"]]
+
+    def filter(self, min_confidence=None, labels=None, camera_id=None):
+        """
+        Selects the detections that match all the given conditions
+
+        @param min_confidence (float): The minimum confidence (0-1), or None for any
+        @param labels (list): The labels to keep, or None for all
+        @param camera_id (str): The camera ID to keep, or None for all
+        @return (DetectionArray): The selected detections
+        """
+        data = self.data()
+        mask = np.ones(self.size, dtype=bool)
+        if min_confidence is not None:
+            mask &= data["confidence"] >= min_confidence
+        if labels is not None:
+            label_ids = [
+                self._label_ids[label] for label in labels if label in self._label_ids
+            ]
+            mask &= np.isin(data["label_id"], label_ids)
+        if camera_id is not None:
+            mask &= data["camera"] == self._camera_ids.get(str(camera_id), -2)
+        return self._select(mask)
+
+    def nms(self, overlap):
+        """
+        Removes overlapping detections of the same label, frame, and camera with non-maximum suppression
+
+        @param overlap (int): The maximum overlap between detections of the same group (0-100)
+        @return (DetectionArray): The detections that were kept
+        """
+        data = self.data()
+        if self.size < 2:
+            return self._select(np.ones(self.size, dtype=bool))
+        groups = np.stack(
+            (data["frame_index"], data["source"], data["camera"], data["label_id"]),
+            axis=1,
+        )
+        _, group_ids = np.unique(groups, axis=0, return_inverse=True)
+        # Non-maximum suppression expects (left, top, width, height) boxes
+        boxes = data["bbox"].astype(np.float64)
+        boxes[:, :2] -= boxes[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes.tolist(),
+            data["confidence"].tolist(),
+            group_ids.ravel().tolist(),
+            0.0,
+            overlap / 100.0,
+        )
+        mask = np.zeros(self.size, dtype=bool)
+        mask[np.array(indices, dtype=int).flatten()] = True
+        return self._select(mask)
+
+    def aggregate(self):
+        """
+        Computes the count and confidence statistics of every label
+
+        @return (dict): Per label, the number of detections and frames, and the mean and maximum confidence
+        """
+        data = self.data()
+        if self.size == 0:
+            return {}
+        label_ids = data["label_id"]
+        num_labels = len(self.labels)
+        counts = np.bincount(label_ids, minlength=num_labels)
+        frames = np.bincount(label_ids, weights=data["frames"], minlength=num_labels)
+        confidence_sums = np.bincount(
+            label_ids, weights=data["confidence"], minlength=num_labels
+        )
+        max_confidences = np.full(num_labels, -np.inf)
+        np.maximum.at(max_confidences, label_ids, data["confidence"])
+        return {
+            label: {
+                "count": int(counts[i]),
+                "frames": int(frames[i]),
+                "mean_confidence": float(confidence_sums[i] / counts[i]),
+                "max_confidence": float(max_confidences[i]),
+            }
+            for i, label in enumerate(self.labels)
+            if counts[i]
+        }
+
+    def to_dicts(self):
+        """
+        Converts the detections to a list of dicts
+
+        @return (list): A list of dictionaries containing the detected objects
+        """
+        return list(self)
+
+    def _reserve(self, count):
+        """
+        Grows the row buffer to fit count more rows, at least doubling its capacity
+
+        @param count (int): The number of rows to add
+        """
+        if self.size + count <= len(self.rows):
+            return
+        rows = np.zeros(max(2 * len(self.rows), self.size + count), dtype=self.DTYPE)
+        rows[: self.size] = self.rows[: self.size]
+        self.rows = rows
+
+    @staticmethod
+    def _table_index(table, ids, value):
+        """
+        Gets the index of a value in a string table, adding it if needed
+
+        @param table (list): The string table
+        @param ids (dict): The index of every value of the table
+        @param value (str): The value to look up
+        @return (int): The index of the value
+        """
+        index = ids.get(value)
+        if index is None:
+            index = ids[value] = len(table)
+            table.append(value)
+        return index
+
+    def _select(self, mask):
+        """
+        Creates an array with the selected rows and the same string tables
+
+        @param mask (numpy.ndarray): The boolean mask of the rows to keep
+        @return (DetectionArray): The new array
+        """
+        selected = DetectionArray(capacity=int(mask.sum()))
+        rows = self.data()[mask]
+        selected.rows[: len(rows)] = rows
+        selected.size = len(rows)
+        selected.labels = list(self.labels)
+        selected.cameras = list(self.cameras)
+        selected.sources = list(self.sources)
+        selected._label_ids = dict(self._label_ids)
+        selected._camera_ids = dict(self._camera_ids)
+        selected._source_ids = dict(self._source_ids)
+        return selected
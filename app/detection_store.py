@@ -0,0 +1,519 @@
+import os
+import sqlite3
+import threading
+import time
+from detection_array import DetectionArray
+import config
+
+
+class DetectionStore:
+    """
+    DetectionStore class to keep every scan and its detections in a local SQLite database.
+    The database runs in WAL mode, so reads do not block the writer, and detections are inserted
+    in batches with executemany. The detections are indexed by camera, time, and label, so
+    reports and queries do not have to scan old data.
+
+    A scan is begun before its first frame and its frames and detections are appended in chunks
+    while it runs, so a crash only loses the last unsaved chunk. Scans that never finished stay
+    in the running status and are left out of get_latest_scan.
+
+    Tables:
+    - scans: One row per scan (timestamp, camera ID, status)
+    - scan_frames: One row per sampled frame of a scan (source, frame index, output path)
+    - scan_checkpoints: The input of a resumable scan (input type, input path, fingerprint)
+    - detections: One row per detection, linked to its scan
+
+    Attributes:
+    - db_path (str): The path of the SQLite database file
+    - connection (sqlite3.Connection): The database connection, shared by all threads
+    - lock (threading.Lock): The lock to serialize the use of the connection
+
+    Methods:
+    - begin_scan(self, timestamp, camera_id): Starts a scan in the running status
+    - append_to_scan(self, scan_id, detections, frames): Appends a chunk of detections and frames to a scan
+    - finish_scan(self, scan_id): Marks a scan as complete
+    - delete_scan(self, scan_id): Deletes a scan with its frames, detections, and checkpoint
+    - delete_scan_source(self, scan_id, source, start_frame): Deletes the frames and detections of a source of a scan from a frame on
+    - save_checkpoint(self, scan_id, input_type, input_path, fingerprint): Saves the input of a resumable scan
+    - find_checkpoint(self, input_type, input_path): Finds the latest unfinished scan of an input
+    - get_scan_progress(self, scan_id): Gets the last saved frame and first failed frame of every source of a scan
+    - count_scan_rows(self, scan_id): Counts the frames and detections of a scan
+    - sync(self): Checkpoints the WAL so the saved chunks are on disk
+    - get_latest_scan(self): Gets the most recent complete scan
+    - get_scan(self, scan_id): Gets a scan by ID
+    - summarize_scan(self, scan_id): Computes the count and confidence statistics of every label of a scan
+    - iter_scan_frames(self, scan_id, chunk_size): Iterates over the frames of a scan, one chunk at a time
+    - iter_scan_detections(self, scan_id, chunk_size): Iterates over the detections of a scan, one chunk at a time
+    - get_scan_detections(self, scan_id): Gets the detections of a scan
+    - query_detections(self, label, start, end, camera_id, limit): Gets the detections that match the given filters
+    - count_by_camera(self, start, end): Counts the detections of every camera
+    - close(self): Closes the database connection
+    - _create_schema(self): Creates the tables and indexes if they do not exist
+    - _to_array(rows): Converts detection rows to a DetectionArray
+    """
+
+    DETECTION_COLUMNS = (
+        "source, frame_index, timestamp, label, confidence, x, y, w, h, "
+        "COALESCE(track_id, -1), first_seen, last_seen, frames, camera_id"
+    )
+
+    def __init__(self, db_path=config.DETECTION_DB_PATH):
+        """
+        Initializes the DetectionStore and creates the database if needed
+
+        @param db_path (str): The path of the SQLite database file
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL
+        self.lock = threading.Lock()
+        self._create_schema()
+
+    def _create_schema(self):
+        """
+        Creates the tables and indexes if they do not exist
+        """
+        with self.lock, self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS scans (
+                    id INTEGER PRIMARY KEY,
+                    timestamp TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    camera_id TEXT,
+                    status TEXT NOT NULL DEFAULT 'running'
+                );
+                CREATE TABLE IF NOT EXISTS scan_frames (
+                    id INTEGER PRIMARY KEY,
+                    scan_id INTEGER NOT NULL REFERENCES scans(id),
+                    source TEXT,
+                    frame_index INTEGER,
+                    output_path TEXT
+                );
+                CREATE TABLE IF NOT EXISTS detections (
+                    id INTEGER PRIMARY KEY,
+                    scan_id INTEGER NOT NULL REFERENCES scans(id),
+                    camera_id TEXT,
+                    created_at REAL NOT NULL,
+                    source TEXT,
+                    frame_index INTEGER,
+                    timestamp REAL,
+                    label TEXT NOT NULL,
+                    confidence REAL,
+                    x REAL, y REAL, w REAL, h REAL,
+                    track_id INTEGER,
+                    first_seen REAL,
+                    last_seen REAL,
+                    frames INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS scan_checkpoints (
+                    scan_id INTEGER PRIMARY KEY REFERENCES scans(id),
+                    input_type TEXT NOT NULL,
+                    input_path TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS scan_checkpoints_input
+                    ON scan_checkpoints(input_type, input_path);
+                CREATE INDEX IF NOT EXISTS scans_status_time ON scans(status, created_at);
+                CREATE INDEX IF NOT EXISTS scan_frames_scan ON scan_frames(scan_id);
+                CREATE INDEX IF NOT EXISTS detections_scan ON detections(scan_id);
+                CREATE INDEX IF NOT EXISTS detections_camera_time
+                    ON detections(camera_id, created_at);
+                CREATE INDEX IF NOT EXISTS detections_label_time
+                    ON detections(label, created_at);
+                CREATE INDEX IF NOT EXISTS detections_time ON detections(created_at);
+                """)
+
+    def begin_scan(self, timestamp, camera_id=None):
+        """
+        Starts a scan in the running status
+
+        @param timestamp (str): The timestamp of the scan
+        @param camera_id (str): The camera ID
+        @return (int): The ID of the scan
+        """
+        with self.lock, self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO scans (timestamp, created_at, camera_id) VALUES (?, ?, ?)",
+                (timestamp, time.time(), None if camera_id is None else str(camera_id)),
+            )
+        return cursor.lastrowid
+
+    def append_to_scan(self, scan_id, detections, frames=()):
+        """
+        Appends a chunk of detections and frames to a scan in one transaction.
+        The detections get the creation time of the scan, and its camera ID if they have none.
+
+        @param scan_id (int): The ID of the scan
+        @param detections (DetectionArray): The detections (a list of detection dicts is converted)
+        @param frames (list): A list of (source, frame_index, output_path) tuples of sampled frames
+        """
+        if not isinstance(detections, DetectionArray):
+            detections = DetectionArray.from_dicts(list(detections))
+
+        data = detections.data()
+        labels = detections.label_names().tolist()
+        sources = [
+            detections.sources[index] if index >= 0 else None
+            for index in data["source"].tolist()
+        ]
+        cameras = [
+            detections.cameras[index] if index >= 0 else None
+            for index in data["camera"].tolist()
+        ]
+        track_ids = [
+            track_id if track_id >= 0 else None
+            for track_id in data["track_id"].tolist()
+        ]
+        bboxes = data["bbox"].tolist()
+
+        with self.lock, self.connection:
+            camera_id, created_at = self.connection.execute(
+                "SELECT camera_id, created_at FROM scans WHERE id = ?", (scan_id,)
+            ).fetchone()
+            self.connection.executemany(
+                "INSERT INTO scan_frames (scan_id, source, frame_index, output_path) "
+                "VALUES (?, ?, ?, ?)",
+                ((scan_id, *frame) for frame in frames),
+            )
+            self.connection.executemany(
+                "INSERT INTO detections (scan_id, camera_id, created_at, source, frame_index, "
+                "timestamp, label, confidence, x, y, w, h, track_id, first_seen, last_seen, frames) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip(
+                    [scan_id] * len(data),
+                    [camera or camera_id for camera in cameras],
+                    [created_at] * len(data),
+                    sources,
+                    data["frame_index"].tolist(),
+                    data["timestamp"].tolist(),
+                    labels,
+                    data["confidence"].tolist(),
+                    *zip(*bboxes) if bboxes else ([], [], [], []),
+                    track_ids,
+                    data["first_seen"].tolist(),
+                    data["last_seen"].tolist(),
+                    data["frames"].tolist(),
+                ),
+            )
+
+    def finish_scan(self, scan_id):
+        """
+        Marks a scan as complete
+
+        @param scan_id (int): The ID of the scan
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "UPDATE scans SET status = 'complete' WHERE id = ?", (scan_id,)
+            )
+
+    def delete_scan(self, scan_id):
+        """
+        Deletes a scan with its frames, detections, and checkpoint
+
+        @param scan_id (int): The ID of the scan
+        """
+        with self.lock, self.connection:
+            for table, column in (
+                ("detections", "scan_id"),
+                ("scan_frames", "scan_id"),
+                ("scan_checkpoints", "scan_id"),
+                ("scans", "id"),
+            ):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE {column} = ?", (scan_id,)
+                )
+
+    def delete_scan_source(self, scan_id, source, start_frame=0):
+        """
+        Deletes the frames and detections of a source of a scan from a frame on.
+        Tracked objects are saved with frame index 0, so they are only deleted with the whole source.
+
+        @param scan_id (int): The ID of the scan
+        @param source (str): The source path
+        @param start_frame (int): The first frame index to delete (0 for the whole source)
+        """
+        with self.lock, self.connection:
+            for table in ("detections", "scan_frames"):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE scan_id = ? AND source = ? AND frame_index >= ?",
+                    (scan_id, source, start_frame),
+                )
+
+    def save_checkpoint(self, scan_id, input_type, input_path, fingerprint):
+        """
+        Saves the input of a resumable scan
+
+        @param scan_id (int): The ID of the scan
+        @param input_type (str): The type of input of the scan
+        @param input_path (str): The path of the input of the scan
+        @param fingerprint (str): The fingerprint of the input files
+        """
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO scan_checkpoints (scan_id, input_type, input_path, fingerprint) "
+                "VALUES (?, ?, ?, ?)",
+                (scan_id, input_type, input_path, fingerprint),
+            )
+
+    def find_checkpoint(self, input_type, input_path):
+        """
+        Finds the checkpoint of the latest unfinished scan of an input
+
+        @param input_type (str): The type of input of the scan
+        @param input_path (str): The path of the input of the scan
+        @return (dict): The scan ID and fingerprint of the scan, or None if there is no unfinished scan
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT scan_checkpoints.scan_id, fingerprint FROM scan_checkpoints "
+                "JOIN scans ON scans.id = scan_checkpoints.scan_id "
+                "WHERE input_type = ? AND input_path = ? AND status = 'running' "
+                "ORDER BY created_at DESC, scans.id DESC LIMIT 1",
+                (input_type, input_path),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"scan_id": row[0], "fingerprint": row[1]}
+
+    def get_scan_progress(self, scan_id):
+        """
+        Gets the last saved frame and the first failed frame of every source of a scan.
+        Failed frames are saved without an output path.
+
+        @param scan_id (int): The ID of the scan
+        @return (list): A list of (source, last_frame_index, failed_frame_index) tuples, in scan order,
+            with failed_frame_index None if no frame of the source failed
+        """
+        with self.lock:
+            return self.connection.execute(
+                "SELECT source, MAX(frame_index), "
+                "MIN(CASE WHEN output_path IS NULL THEN frame_index END) "
+                "FROM scan_frames WHERE scan_id = ? GROUP BY source ORDER BY MIN(id)",
+                (scan_id,),
+            ).fetchall()
+
+    def count_scan_rows(self, scan_id):
+        """
+        Counts the frames and detections of a scan
+
+        @param scan_id (int): The ID of the scan
+        @return (tuple): The number of frames and the number of detections
+        """
+        with self.lock:
+            return tuple(
+                self.connection.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE scan_id = ?", (scan_id,)
+                ).fetchone()[0]
+                for table in ("scan_frames", "detections")
+            )
+
+    def sync(self):
+        """
+        Checkpoints the WAL into the database file. With synchronous=NORMAL, committed chunks
+        survive a crash of the application but not of the system until they are checkpointed.
+        """
+        with self.lock:
+            self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def get_latest_scan(self):
+        """
+        Gets the most recent complete scan
+
+        @return (dict): The scan, or None if there are no complete scans
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id FROM scans WHERE status = 'complete' "
+                "ORDER BY created_at DESC, id DESC LIMIT 1"
+            ).fetchone()
+        return self.get_scan(row[0]) if row else None
+
+    def get_scan(self, scan_id):
+        """
+        Gets a scan by ID
+
+        @param scan_id (int): The ID of the scan
+        @return (dict): The ID, timestamp, creation time, camera ID, and status of the scan, or None if not found
+        """
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT id, timestamp, created_at, camera_id, status FROM scans WHERE id = ?",
+                (scan_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "timestamp": row[1],
+            "created_at": row[2],
+            "camera_id": row[3],
+            "status": row[4],
+        }
+
+    def summarize_scan(self, scan_id):
+        """
+        Computes the count and confidence statistics of every label of a scan, in the database
+
+        @param scan_id (int): The ID of the scan
+        @return (dict): Per label, the number of detections and frames, and the mean and maximum confidence
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT label, COUNT(*), SUM(frames), AVG(confidence), MAX(confidence) "
+                "FROM detections WHERE scan_id = ? GROUP BY label ORDER BY MIN(id)",
+                (scan_id,),
+            ).fetchall()
+        return {
+            label: {
+                "count": count,
+                "frames": frames,
+                "mean_confidence": mean_confidence,
+                "max_confidence": max_confidence,
+            }
+            for label, count, frames, mean_confidence, max_confidence in rows
+        }
+
+    def iter_scan_frames(self, scan_id, chunk_size=config.REPORT_CHUNK_SIZE):
+        """
+        Iterates over the frames of a scan in sampling order, reading one chunk at a time
+
+        @param scan_id (int): The ID of the scan
+        @param chunk_size (int): The number of frames to read per query
+        @return (generator): A generator of (source, frame_index, output_path) tuples
+        """
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    "SELECT id, source, frame_index, output_path FROM scan_frames "
+                    "WHERE scan_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (scan_id, last_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for row in rows:
+                yield row[1:]
+
+    def iter_scan_detections(self, scan_id, chunk_size=config.REPORT_CHUNK_SIZE):
+        """
+        Iterates over the detections of a scan in insertion order, reading one chunk at a time
+
+        @param scan_id (int): The ID of the scan
+        @param chunk_size (int): The number of detections to read per query
+        @return (generator): A generator of detection dicts
+        """
+        last_id = 0
+        while True:
+            with self.lock:
+                rows = self.connection.execute(
+                    f"SELECT id, {self.DETECTION_COLUMNS} FROM detections "
+                    "WHERE scan_id = ? AND id > ? ORDER BY id LIMIT ?",
+                    (scan_id, last_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield from self._to_array([row[1:] for row in rows])
+
+    def get_scan_detections(self, scan_id):
+        """
+        Gets the detections of a scan, in insertion order
+
+        @param scan_id (int): The ID of the scan
+        @return (DetectionArray): The detections of the scan
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {self.DETECTION_COLUMNS} FROM detections WHERE scan_id = ? ORDER BY id",
+                (scan_id,),
+            ).fetchall()
+        return self._to_array(rows)
+
+    def query_detections(
+        self, label=None, start=None, end=None, camera_id=None, limit=None
+    ):
+        """
+        Gets the detections that match all the given filters, most recent first
+
+        @param label (str): The label of the detections, or None for all
+        @param start (float): The earliest scan time, as a Unix timestamp, or None
+        @param end (float): The latest scan time, as a Unix timestamp, or None
+        @param camera_id (str): The camera ID, or None for all cameras
+        @param limit (int): The maximum number of detections, or None for all
+        @return (DetectionArray): The matching detections
+        """
+        conditions, params = [], []
+        for condition, value in (
+            ("label = ?", label),
+            ("created_at >= ?", start),
+            ("created_at <= ?", end),
+            ("camera_id = ?", None if camera_id is None else str(camera_id)),
+        ):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        query = f"SELECT {self.DETECTION_COLUMNS} FROM detections"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return self._to_array(rows)
+
+    def count_by_camera(self, start=None, end=None):
+        """
+        Counts the detections of every camera
+
+        @param start (float): The earliest scan time, as a Unix timestamp, or None
+        @param end (float): The latest scan time, as a Unix timestamp, or None
+        @return (dict): The number of detections per camera ID
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT camera_id, COUNT(*) FROM detections "
+                "WHERE created_at >= ? AND created_at <= ? GROUP BY camera_id",
+                (
+                    float("-inf") if start is None else start,
+                    float("inf") if end is None else end,
+                ),
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        """
+        Closes the database connection
+        """
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def _to_array(rows):
+        """
+        Converts detection rows to a DetectionArray
+
+        @param rows (list): The rows, with the columns of DETECTION_COLUMNS
+        @return (DetectionArray): The detections
+        """
+        if not rows:
+            return DetectionArray()
+        columns = list(zip(*rows))
+        return DetectionArray.from_columns(
+            source=columns[0],
+            frame_index=columns[1],
+            timestamp=columns[2],
+            label=columns[3],
+            confidence=columns[4],
+            bbox=list(zip(*columns[5:9])),
+            track_id=columns[9],
+            first_seen=columns[10],
+            last_seen=columns[11],
+            frames=columns[12],
+            camera_id=columns[13],
+        )
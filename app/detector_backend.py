@@ -0,0 +1,355 @@
+import hashlib
+import threading
+import cv2
+import numpy as np
+import os
+import config
+
+
+class DetectorBackendFactory:
+    """
+    DetectorBackendFactory is a factory class that creates instances of the DetectorBackend class.
+    Allows for the creation of either a RoboflowBackend (hosted model) or an OnnxBackend (local model).
+
+    The ONNX option runs the model in-process on the CPU and does not require a network connection.
+    """
+
+    @staticmethod
+    def create_backend(backend_type=config.DETECTOR_BACKEND):
+        """
+        Creates an instance of the DetectorBackend class based on the backend type.
+        Default is the backend set in the configuration.
+
+        @param backend_type (str): The type of backend to create (roboflow or onnx)
+        @return (DetectorBackend): An instance of the DetectorBackend class
+        """
+        if backend_type == "roboflow":
+            return RoboflowBackend()
+        elif backend_type == "onnx":
+            return OnnxBackend(config.ONNX_MODEL_PATH, config.ONNX_LABELS_FILE)
+        else:
+            raise ValueError(f"Invalid detector backend: {backend_type}")
+
+    @staticmethod
+    def get_model_id(backend_type=config.DETECTOR_BACKEND):
+        """
+        Gets the ID of the configured model without loading it, for keying cached predictions.
+        The ONNX model and labels files are hashed, so a retrained model at the same path gets a new ID.
+
+        @param backend_type (str): The type of backend (roboflow or onnx)
+        @return (str): The model ID
+        """
+        if backend_type == "roboflow":
+            return f"roboflow/{config.ROBOFLOW_PROJECT}/{config.ROBOFLOW_MODEL}"
+        elif backend_type == "onnx":
+            digest = hashlib.sha256(
+                f"{config.ONNX_INPUT_SIZE}|{config.ONNX_OUTPUT_FORMAT}".encode()
+            )
+            for path in (config.ONNX_MODEL_PATH, config.ONNX_LABELS_FILE):
+                if path and os.path.isfile(path):
+                    with open(path, "rb") as file:
+                        for chunk in iter(lambda: file.read(1 << 20), b""):
+                            digest.update(chunk)
+            return f"onnx/{digest.hexdigest()}"
+        else:
+            raise ValueError(f"Invalid detector backend: {backend_type}")
+
+
+class BaseDetectorBackend:
+    """
+    BaseDetectorBackend is an abstract class that defines the interface for a DetectorBackend.
+    The DetectorBackend class is responsible for running a model on a frame and returning the predictions.
+
+    Every backend returns predictions as a list of dictionaries with the keys:
+    - bbox (tuple): The bounding box (x, y, w, h) where x and y are the center of the box
+    - label (str): The class label of the detected object
+    - confidence (float): The confidence of the prediction between 0 and 1
+
+    Methods:
+    - predict(self, frame, confidence, overlap): Runs the model on the frame and returns the predictions
+    - predict_batch(self, frames, confidence, overlap): Runs the model on several frames and returns the predictions per frame
+    """
+
+    def predict(self, frame, confidence, overlap):
+        """
+        Runs the model on the frame and returns the predictions.
+        This method should be implemented by the derived classes.
+
+        @param frame (numpy.ndarray): The frame to run the model on
+        @param confidence (int): The minimum confidence of a prediction (0-100)
+        @param overlap (int): The maximum overlap between predictions of the same class (0-100)
+        @return (list): A list of dictionaries containing the predictions
+        """
+        raise NotImplementedError
+
+    def predict_batch(self, frames, confidence, overlap):
+        """
+        Runs the model on several frames and returns the predictions per frame.
+        Backends that cannot batch fall back to one predict call per frame.
+
+        @param frames (list): A list of frames to run the model on
+        @param confidence (int): The minimum confidence of a prediction (0-100)
+        @param overlap (int): The maximum overlap between predictions of the same class (0-100)
+        @return (list): A list of prediction lists, in the same order as the frames
+        """
+        return [self.predict(frame, confidence, overlap) for frame in frames]
+
+
+class RoboflowBackend(BaseDetectorBackend):
+    """
+    RoboflowBackend is a concrete class that extends the BaseDetectorBackend class.
+    The RoboflowBackend class sends each frame to the hosted Roboflow model.
+
+    Attributes:
+    - model (Model): The Roboflow model to detect objects in a frame
+
+    Methods:
+    - predict(self, frame, confidence, overlap): Sends the frame to the Roboflow model and returns the predictions
+    - _load_model(self): Loads the Roboflow model for object detection
+    """
+
+    def __init__(self):
+        """
+        Initializes the RoboflowBackend with the Roboflow model
+        """
+        self.model = self._load_model()
+
+    def predict(self, frame, confidence, overlap):
+        """
+        Sends the frame to the Roboflow model and returns the predictions
+
+        @param frame (numpy.ndarray): The frame to run the model on
+        @param confidence (int): The minimum confidence of a prediction (0-100)
+        @param overlap (int): The maximum overlap between predictions of the same class (0-100)
+        @return (list): A list of dictionaries containing the predictions
+        """
+        predictions = self.model.predict(
+            frame, confidence=confidence, overlap=overlap
+        ).json()["predictions"]
+
+        return [
+            {
+                "bbox": tuple(
+                    map(
+                        int,
+                        (
+                            prediction["x"],
+                            prediction["y"],
+                            prediction["width"],
+                            prediction["height"],
+                        ),
+                    )
+                ),
+                "label": prediction["class"],
+                "confidence": prediction["confidence"],
+            }
+            for prediction in predictions
+        ]
+
+    def _load_model(self):
+        """
+        Loads the Roboflow model for object detection
+
+        @return (Model): The Roboflow model for object detection
+        """
+        from roboflow import Roboflow  # Only required for the hosted backend
+
+        rf = Roboflow(api_key=config.ROBOFLOW_API_KEY)
+        project = rf.workspace().project(config.ROBOFLOW_PROJECT)
+        model = project.version(config.ROBOFLOW_MODEL).model
+        return model
+
+
+class OnnxBackend(BaseDetectorBackend):
+    """
+    OnnxBackend is a concrete class that extends the BaseDetectorBackend class.
+    The OnnxBackend class runs an exported YOLO model (.onnx) in-process using OpenCV DNN.
+
+    Both YOLOv5 style outputs (x, y, w, h, objectness, class scores) and
+    YOLOv8 style outputs (x, y, w, h, class scores) are supported. The output format is
+    configured, or detected from the number of labels, or from the layout of the output
+    when there is no labels file.
+
+    Attributes:
+    - net (cv2.dnn.Net): The OpenCV DNN network
+    - labels (list): The class labels of the model, in output order
+    - input_size (int): The square input size of the model
+    - output_format (str): The output format of the model (auto, yolov5, or yolov8)
+    - supports_batching (bool): Whether the model accepts more than one frame per forward pass
+    - lock (threading.Lock): The lock to serialize forward passes, as the network is not thread-safe
+
+    Methods:
+    - predict(self, frame, confidence, overlap): Runs the ONNX model on the frame and returns the predictions
+    - predict_batch(self, frames, confidence, overlap): Runs the ONNX model on several frames in one forward pass
+    - _load_labels(labels_file): Loads the class labels from the labels file
+    - _parse_output(self, output, frame_shape, confidence, overlap): Converts the raw model output to predictions
+    """
+
+    def __init__(
+        self,
+        model_path,
+        labels_file,
+        input_size=config.ONNX_INPUT_SIZE,
+        output_format=config.ONNX_OUTPUT_FORMAT,
+    ):
+        """
+        Initializes the OnnxBackend with the given model, labels, input size, and output format
+
+        @param model_path (str): The path of the .onnx model file
+        @param labels_file (str): The path of the labels file (one label per line)
+        @param input_size (int): The square input size of the model
+        @param output_format (str): The output format of the model (auto, yolov5, or yolov8)
+        """
+        if not model_path:
+            raise ValueError("No ONNX model path configured")
+        if output_format not in ("auto", "yolov5", "yolov8"):
+            raise ValueError(f"Invalid ONNX output format: {output_format}")
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.labels = self._load_labels(labels_file)
+        self.input_size = input_size
+        self.output_format = output_format
+        self.supports_batching = True
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _load_labels(labels_file):
+        """
+        Loads the class labels from the labels file
+
+        @param labels_file (str): The path of the labels file (one label per line)
+        @return (list): A list of class labels
+        """
+        if not labels_file:
+            return []
+        try:
+            with open(labels_file, "r") as file:
+                return [line.strip() for line in file if line.strip()]
+        except FileNotFoundError:
+            print(f"Labels file not found: {labels_file}")
+            return []
+
+    def predict(self, frame, confidence, overlap):
+        """
+        Runs the ONNX model on the frame and returns the predictions
+
+        @param frame (numpy.ndarray): The frame to run the model on
+        @param confidence (int): The minimum confidence of a prediction (0-100)
+        @param overlap (int): The maximum overlap between predictions of the same class (0-100)
+        @return (list): A list of dictionaries containing the predictions
+        """
+        blob = cv2.dnn.blobFromImage(
+            frame,
+            1 / 255.0,
+            (self.input_size, self.input_size),
+            swapRB=True,
+            crop=False,
+        )
+        with self.lock:
+            self.net.setInput(blob)
+            output = self.net.forward()
+        return self._parse_output(output[0], frame.shape, confidence, overlap)
+
+    def predict_batch(self, frames, confidence, overlap):
+        """
+        Runs the ONNX model on several frames in one forward pass.
+        Models exported with a fixed batch size of 1 fall back to one forward pass per frame.
+
+        @param frames (list): A list of frames to run the model on
+        @param confidence (int): The minimum confidence of a prediction (0-100)
+        @param overlap (int): The maximum overlap between predictions of the same class (0-100)
+        @return (list): A list of prediction lists, in the same order as the frames
+        """
+        if len(frames) <= 1 or not self.supports_batching:
+            return super().predict_batch(frames, confidence, overlap)
+
+        blob = cv2.dnn.blobFromImages(
+            frames,
+            1 / 255.0,
+            (self.input_size, self.input_size),
+            swapRB=True,
+            crop=False,
+        )
+        try:
+            with self.lock:
+                self.net.setInput(blob)
+                outputs = self.net.forward()
+        except cv2.error:
+            print("ONNX model does not support batching. Falling back to single frames.")
+            self.supports_batching = False
+            return super().predict_batch(frames, confidence, overlap)
+
+        return [
+            self._parse_output(output, frame.shape, confidence, overlap)
+            for output, frame in zip(outputs, frames)
+        ]
+
+    def _parse_output(self, output, frame_shape, confidence, overlap):
+        """
+        Converts the raw model output for a single frame to predictions
+
+        @param output (numpy.ndarray): The raw model output for a single frame
+        @param frame_shape (tuple): The shape of the original frame
+        @param confidence (int): The minimum confidence of a prediction (0-100)
+        @param overlap (int): The maximum overlap between predictions of the same class (0-100)
+        @return (list): A list of dictionaries containing the predictions
+        """
+        # YOLOv8 exports are (attributes, boxes), YOLOv5 exports are (boxes, attributes)
+        transposed = output.shape[0] < output.shape[1]
+        if transposed:
+            output = output.T
+
+        if self.output_format != "auto":
+            is_yolov5 = self.output_format == "yolov5"
+        elif self.labels:
+            is_yolov5 = output.shape[1] == len(self.labels) + 5
+        else:  # The column count alone cannot tell the formats apart
+            is_yolov5 = not transposed
+        if is_yolov5:  # Objectness before the scores
+            scores = output[:, 5:] * output[:, 4:5]
+        else:
+            scores = output[:, 4:]
+
+        class_ids = np.argmax(scores, axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+        keep = confidences >= confidence / 100.0
+        boxes, class_ids, confidences = output[keep, :4], class_ids[keep], confidences[keep]
+        if len(boxes) == 0:
+            return []
+
+        # Scale the boxes from the model input size back to the frame size
+        frame_height, frame_width = frame_shape[:2]
+        boxes = boxes * np.array(
+            [
+                frame_width / self.input_size,
+                frame_height / self.input_size,
+                frame_width / self.input_size,
+                frame_height / self.input_size,
+            ]
+        )
+
+        # Non-maximum suppression expects (left, top, width, height) boxes
+        nms_boxes = np.column_stack(
+            (boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2, boxes[:, 2:])
+        )
+        indices = cv2.dnn.NMSBoxesBatched(
+            nms_boxes.tolist(),
+            confidences.tolist(),
+            class_ids.tolist(),
+            confidence / 100.0,
+            overlap / 100.0,
+        )
+
+        predictions = []
+        for i in np.array(indices).flatten():
+            class_id = int(class_ids[i])
+            label = self.labels[class_id] if class_id < len(self.labels) else str(class_id)
+            predictions.append(
+                {
+                    "bbox": tuple(int(v) for v in boxes[i]),
+                    "label": label,
+                    "confidence": float(confidences[i]),
+                }
+            )
+        return predictions
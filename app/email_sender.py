@@ -1,32 +1,48 @@
 from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
-import base64
-import os
+import threading
 import config
 
 
 class EmailSender:
     """
-    EmailSender class to send emails using the SendGrid API
+    EmailSender class to send emails using the SendGrid API.
+    The SendGrid client is created once and reused for every message, and an email to several
+    recipients is sent with one request, with one personalization per recipient so the recipients
+    do not see each other's addresses.
 
     Attributes:
     - sendgrid_api_key (str): The SendGrid API key to authenticate the user
     - sender_email (str): The email address of the sender
+    - api_host (str): The base URL of the SendGrid API (a local stand-in when testing)
+    - timeout (float): The timeout of a request, in seconds
+    - client (SendGridAPIClient): The SendGrid client, created on first use
+    - lock (threading.Lock): The lock to create the client once across threads
 
     Methods:
-    - __init__(self): Initializes the EmailSender with the required SendGrid API key and sender email
+    - __init__(self, api_host, timeout): Initializes the EmailSender with the required SendGrid API key and sender email
     - send_email(self, subject, content, recipient): Sends an email with the given subject, content, and recipient
+    - send_email_batch(self, subject, content, recipients): Sends an email to several recipients with one request
+    - _get_client(self): Gets the SendGrid client, creating it on first use
     """
 
-    def __init__(self):
+    MAX_PERSONALIZATIONS = 1000  # SendGrid limit per request
+
+    def __init__(
+        self, api_host=config.SENDGRID_API_HOST, timeout=config.NOTIFICATION_TIMEOUT
+    ):
         """
         Initializes the EmailSender with the required SendGrid API key and sender email
 
-        @param sendgrid_api_key (str): The SendGrid API key to authenticate the user
-        @param sender_email (str): The email address of the sender
+        @param api_host (str): The base URL of the SendGrid API
+        @param timeout (float): The timeout of a request, in seconds
         """
         self.sendgrid_api_key = config.SENDGRID_API_KEY
         self.sender_email = config.SENDER_EMAIL
+        self.api_host = api_host
+        self.timeout = timeout
+        self.client = None
+        self.lock = threading.Lock()
 
     def send_email(self, subject, content, recipient):
         """
@@ -35,16 +51,51 @@ class EmailSender:
         @param subject (str): The subject of the email
         @param content (str): The content of the email
         @param recipient (str): The email address of the recipient
+        @return (bool): True if the email was sent, False otherwise
+        """
+        return self.send_email_batch(subject, content, [recipient])
+
+    def send_email_batch(self, subject, content, recipients):
+        """
+        Sends an email with the given subject and content to several recipients, with one request
+        per MAX_PERSONALIZATIONS recipients. Each recipient gets their own personalization.
+
+        @param subject (str): The subject of the email
+        @param content (str): The content of the email
+        @param recipients (list): The email addresses of the recipients
+        @return (bool): True if the email was sent to every recipient, False otherwise
+        """
+        sent = True
+        for start in range(0, len(recipients), self.MAX_PERSONALIZATIONS):
+            batch = recipients[start : start + self.MAX_PERSONALIZATIONS]
+            try:
+                message = Mail(
+                    from_email=self.sender_email,
+                    to_emails=batch,
+                    subject=subject,
+                    html_content=content,
+                    is_multiple=True,
+                )
+                response = self._get_client().send(message)
+                print(
+                    f"Email sent to {len(batch)} recipients. Status code: {response.status_code}"
+                )
+            except Exception as e:
+                print(f"Error sending email: {str(e)}")
+                sent = False
+        return sent
+
+    def _get_client(self):
+        """
+        Gets the SendGrid client, creating it on first use.
+        The timeout is set on its HTTP client, as SendGrid requests have none by default and a hung
+        request would otherwise hold its delivery worker forever.
+
+        @return (SendGridAPIClient): The SendGrid client
         """
-        try:
-            sg = SendGridAPIClient(self.sendgrid_api_key)
-            message = Mail(
-                from_email=self.sender_email,
-                to_emails=recipient,
-                subject=subject,
-                html_content=content,
-            )
-            response = sg.send(message)
-            print(f"Email sent. Status code: {response.status_code}")
-        except Exception as e:
-            print(f"Error sending email: {str(e)}")
+        with self.lock:
+            if self.client is None:
+                client = SendGridAPIClient(self.sendgrid_api_key, host=self.api_host)
+                client.client.timeout = self.timeout
+                self.client = client
+            return self.client
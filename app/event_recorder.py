@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+from file_processor import FileProcessor
+import config
+
+
+class EventRecorder:
+    """
+    EventRecorder class to record short video clips around detections instead of the whole stream.
+    The last few seconds of frames are kept in memory as JPEG images in a pre-event ring buffer.
+    When a detection fires, a clip starts with the buffered pre-roll and continues until no
+    detection has been seen for the post-roll duration. Compression and clip encoding both run
+    on background threads, so the capture thread only queues the frames.
+
+    Attributes:
+    - camera_id (str): The camera ID, used for the clip directory
+    - output_dir (str): The base output directory for the clips
+    - pre_seconds (float): The seconds of video to keep before a detection
+    - post_seconds (float): The seconds of video to keep after the last detection
+    - max_seconds (float): The maximum length of a clip, in seconds
+    - jpeg_quality (int): The JPEG quality of the buffered frames (0-100)
+    - frame_queue (queue.Queue): The bounded queue of frames waiting to be compressed
+    - ring (collections.deque): The compressed pre-roll frames as (timestamp, jpeg) tuples
+    - clip (list): The compressed frames of the clip being recorded, or None if not recording
+    - clip_end (float): The time at which the clip being recorded ends
+    - clip_executor (ThreadPoolExecutor): The executor that encodes the finished clips
+    - dropped_count (int): The number of frames dropped because the queue was full
+    - clip_count (int): The number of clips written
+    - thread (threading.Thread): The compression thread
+    - closed (bool): Whether the recorder has been closed
+
+    Methods:
+    - add_frame(self, frame, detected): Queues a frame and whether it had detections
+    - close(self): Finishes the clip being recorded and waits for the pending clips to be written
+    - _run(self): Compression thread loop that fills the ring buffer and the clips
+    - _process_frame(self, timestamp, frame, detected): Compresses a frame and adds it to the ring buffer or the clip
+    - _finish_clip(self): Hands the recorded clip to the clip executor
+    - _write_clip(self, clip): Decodes the clip frames and writes them as a video file
+    """
+
+    def __init__(
+        self,
+        camera_id,
+        output_dir=config.OUT_LIVE_DIR,
+        pre_seconds=config.EVENT_PRE_SECONDS,
+        post_seconds=config.EVENT_POST_SECONDS,
+        max_seconds=config.EVENT_MAX_SECONDS,
+        jpeg_quality=config.EVENT_JPEG_QUALITY,
+    ):
+        """
+        Initializes the EventRecorder and starts the compression thread
+
+        @param camera_id (str): The camera ID, used for the clip directory
+        @param output_dir (str): The base output directory for the clips
+        @param pre_seconds (float): The seconds of video to keep before a detection
+        @param post_seconds (float): The seconds of video to keep after the last detection
+        @param max_seconds (float): The maximum length of a clip, in seconds
+        @param jpeg_quality (int): The JPEG quality of the buffered frames (0-100)
+        """
+        self.camera_id = camera_id
+        self.output_dir = output_dir
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.max_seconds = max_seconds
+        self.jpeg_quality = jpeg_quality
+        self.frame_queue = queue.Queue(maxsize=config.EVENT_QUEUE_SIZE)
+        self.ring = deque()
+        self.clip = None
+        self.clip_end = 0
+        self.clip_executor = ThreadPoolExecutor(max_workers=1)
+        self.dropped_count = 0
+        self.clip_count = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add_frame(self, frame, detected):
+        """
+        Queues a frame and whether it had detections, without waiting for compression.
+        The frame must not be modified afterwards. Frames are dropped when the queue is full.
+
+        @param frame (numpy.ndarray): The frame to record
+        @param detected (bool): Whether objects were detected in the frame
+        """
+        if self.closed:
+            return
+        try:
+            self.frame_queue.put_nowait((time.time(), frame, detected))
+        except queue.Full:
+            self.dropped_count += 1
+
+    def close(self):
+        """
+        Finishes the clip being recorded and waits for the pending clips to be written
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.frame_queue.put((None, None, False))
+        self.thread.join()
+        self.clip_executor.shutdown(wait=True)
+        if self.dropped_count:
+            print(
+                f"Camera {self.camera_id}: {self.dropped_count} frames dropped by the event recorder"
+            )
+
+    def _run(self):
+        """
+        Compression thread loop that fills the ring buffer and the clips
+        """
+        while True:
+            timestamp, frame, detected = self.frame_queue.get()
+            if frame is None:
+                break
+            try:
+                self._process_frame(timestamp, frame, detected)
+            except Exception as e:
+                print(f"Error recording frame: {str(e)}")
+        if self.clip:
+            self._finish_clip()
+
+    def _process_frame(self, timestamp, frame, detected):
+        """
+        Compresses a frame and adds it to the ring buffer or the clip being recorded.
+        A detection starts a clip with the ring buffer as pre-roll, or extends the current clip.
+
+        @param timestamp (float): The capture time of the frame
+        @param frame (numpy.ndarray): The frame
+        @param detected (bool): Whether objects were detected in the frame
+        """
+        ret, jpeg = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        )
+        if not ret:
+            return
+
+        if self.clip is not None:
+            self.clip.append((timestamp, jpeg))
+            if detected:
+                self.clip_end = timestamp + self.post_seconds
+            if (
+                timestamp >= self.clip_end
+                or timestamp - self.clip[0][0] >= self.max_seconds
+            ):
+                self._finish_clip()
+            return
+
+        self.ring.append((timestamp, jpeg))
+        while self.ring and timestamp - self.ring[0][0] > self.pre_seconds:
+            self.ring.popleft()
+        if detected:
+            self.clip = list(self.ring)
+            self.clip_end = timestamp + self.post_seconds
+            self.ring.clear()
+
+    def _finish_clip(self):
+        """
+        Hands the recorded clip to the clip executor and goes back to buffering
+        """
+        clip, self.clip = self.clip, None
+        self.clip_executor.submit(self._write_clip, clip)
+
+    def _write_clip(self, clip):
+        """
+        Decodes the clip frames and writes them as a video file.
+        The frame rate is measured from the frame timestamps, so the clip plays back in real time.
+
+        @param clip (list): The compressed frames as (timestamp, jpeg) tuples
+        """
+        try:
+            duration = clip[-1][0] - clip[0][0]
+            fps = (len(clip) - 1) / duration if duration > 0 else config.EVENT_CLIP_FPS
+            height, width = cv2.imdecode(clip[0][1], cv2.IMREAD_COLOR).shape[:2]
+            file_processor = FileProcessor(self.output_dir, self.camera_id)
+            clip_path = file_processor.start_video_writer(width, height, fps, "event")
+            for _, jpeg in clip:
+                frame = cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+                if frame.shape[:2] != (height, width):  # The stream resolution changed
+                    frame = cv2.resize(frame, (width, height))
+                file_processor.write_frame(frame)
+            file_processor.release_video_writer()
+            self.clip_count += 1
+            print(
+                f"Camera {self.camera_id}: Saved {duration:.1f}s event clip: {clip_path}"
+            )
+        except Exception as e:
+            print(f"Error writing event clip: {str(e)}")
@@ -1,7 +1,12 @@
 from datetime import datetime
 import cv2
+import json
 import os
+import queue
 import shutil
+import threading
+import time
+import config
 
 
 class FileProcessor:
@@ -12,17 +17,44 @@ class FileProcessor:
     - base_output_dir (str): The base output directory to save files
     - camera_id (int): The camera ID to use for saving files
     - out (cv2.VideoWriter): The video writer object
+    - recording_queue (queue.Queue): The frames waiting for the segmented recording thread (None if not recording)
+    - recording_thread (threading.Thread): The segmented recording thread
+    - dropped_count (int): The number of frames dropped because the recording queue was full
+
+    Segmented recording splits a continuous recording into files of at most N seconds or megabytes.
+    The writers are opened and closed on the recording thread, and frames wait in the queue while
+    a segment rotates, so the capture loop is never blocked. Every segment has a JSON sidecar with
+    its start and end timestamps, frame count, and an index of (frame, timestamp, byte offset)
+    entries once per second. Every closed segment is also appended to recording_index.jsonl,
+    so an incident time can be found without scanning the videos.
+
+    Unless a frame rate is given, segments play back at the rate frames are actually written, which
+    follows the capture and detection rate of the live loop. The first frames are held until about
+    a second of them is measured, and every later segment uses the rate measured over the previous one.
 
     Methods:
     - set_camera_id(camera_id): Sets the camera ID to use for saving files
+    - _output_dir(): Creates and gets the output directory of the camera
     - _generate_filename(prefix, extension): Generates a filename with the given prefix and extension
     - save_image(frame, image_prefix="image"): Saves the given frame as an image with the given prefix
     - start_video_writer(frame_width, frame_height, fps=20.0, video_prefix="video"): Starts a video writer with the given parameters
-    - write_frame(frame): Writes the given frame to the video writer
+    - write_frame(frame): Writes the given frame to the video writer, or queues it for the segmented recording
     - release_video_writer(): Releases the video writer
+    - start_segmented_recording(fps, segment_seconds, segment_max_mb, video_prefix="segment"): Starts recording to rotating segment files
+    - stop_segmented_recording(): Writes the queued frames and closes the last segment
+    - find_segment(index_path, timestamp): Finds the segment file and frame recorded at the given time
+    - _recording_loop(fps, segment_seconds, segment_max_bytes, video_prefix): Recording thread loop that writes and rotates the segments
+    - _record_frame(segment, timestamp, frame, fps, measured, segment_seconds, segment_max_bytes, video_prefix): Writes a frame to the current segment, rotating it if needed
+    - measure_fps(frame_count, duration): Computes the frame rate of frames written over a duration
+    - _open_segment(frame, timestamp, fps, video_prefix): Opens a new segment file
+    - _close_segment(segment): Closes a segment and writes its index
     - rename_file(old_path, new_name): Renames the file at the old path with the new name
     """
 
+    FPS_SAMPLE_SECONDS = 1.0  # Frames measured before the first segment is opened
+    FPS_SAMPLE_FRAMES = 30
+    FALLBACK_FPS = 20.0  # When the frame rate cannot be measured
+
     def __init__(self, base_output_dir, camera_id=None):
         """
         Initializes the FileProcessor with the given base_output_dir and camera_id
@@ -33,6 +65,9 @@ class FileProcessor:
         self.base_output_dir = base_output_dir
         self.camera_id = camera_id
         self.out = None
+        self.recording_queue = None
+        self.recording_thread = None
+        self.dropped_count = 0
 
     def set_camera_id(self, camera_id):
         """
@@ -42,6 +77,19 @@ class FileProcessor:
         """
         self.camera_id = camera_id
 
+    def _output_dir(self):
+        """
+        Creates and gets the output directory of the camera
+
+        @return (str): The output directory
+        """
+        if self.camera_id is not None:
+            output_dir = os.path.join(self.base_output_dir, str(self.camera_id))
+        else:
+            output_dir = self.base_output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        return output_dir
+
     def _generate_filename(self, prefix, extension):
         """
         Generates a filename with the given prefix and extension
@@ -50,7 +98,7 @@ class FileProcessor:
         @param extension (str): The extension of the filename
         @return (str): The generated filename
         """
-        current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
+        current_time = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         return f"{prefix}_{current_time}.{extension}"
 
     def save_image(self, frame, image_prefix="image"):
@@ -60,11 +108,7 @@ class FileProcessor:
         @param frame (numpy.ndarray): The frame to save as an image
         @param image_prefix (str): The prefix of the image filename
         """
-        if self.camera_id is not None:
-            image_dir = os.path.join(self.base_output_dir, str(self.camera_id))
-        else:
-            image_dir = self.base_output_dir
-        os.makedirs(image_dir, exist_ok=True)
+        image_dir = self._output_dir()
         image_filename = self._generate_filename(image_prefix, "jpg")
         cv2.imwrite(os.path.join(image_dir, image_filename), frame)
 
@@ -78,24 +122,28 @@ class FileProcessor:
         @param frame_height (int): The height of the video frame
         @param fps (float): The frames per second of the video
         @param video_prefix (str): The prefix of the video filename
+        @return (str): The path of the video file
         """
-        if self.camera_id is not None:
-            video_dir = os.path.join(self.base_output_dir, str(self.camera_id))
-        else:
-            video_dir = self.base_output_dir
-        os.makedirs(video_dir, exist_ok=True)
+        video_dir = self._output_dir()
         video_filename = self._generate_filename(video_prefix, "avi")
         video_path = os.path.join(video_dir, video_filename)
         fourcc = cv2.VideoWriter_fourcc(*"XVID")
         self.out = cv2.VideoWriter(video_path, fourcc, fps, (frame_width, frame_height))
+        return video_path
 
     def write_frame(self, frame):
         """
-        Writes the given frame to the video writer
+        Writes the given frame to the video writer, or queues it for the segmented recording.
+        A queued frame must not be modified afterwards. Frames are dropped when the queue is full.
 
         @param frame (numpy.ndarray): The frame to write to the video writer
         """
-        if self.out is not None:
+        if self.recording_queue is not None:
+            try:
+                self.recording_queue.put_nowait((time.time(), frame))
+            except queue.Full:
+                self.dropped_count += 1
+        elif self.out is not None:
             self.out.write(frame)
 
     def release_video_writer(self):
@@ -104,6 +152,249 @@ class FileProcessor:
         """
         if self.out is not None:
             self.out.release()
+            self.out = None
+
+    def start_segmented_recording(
+        self,
+        fps=config.RECORDING_FPS,
+        segment_seconds=config.RECORDING_SEGMENT_SECONDS,
+        segment_max_mb=config.RECORDING_SEGMENT_MAX_MB,
+        video_prefix="segment",
+    ):
+        """
+        Starts recording the written frames to rotating segment files on a background thread.
+        The segment size is taken from the first frame.
+
+        @param fps (float): The frames per second of the video (0 or None to use the measured rate of the written frames)
+        @param segment_seconds (float): The maximum duration of a segment, in seconds
+        @param segment_max_mb (float): The maximum size of a segment, in megabytes
+        @param video_prefix (str): The prefix of the segment filenames
+        """
+        if self.recording_thread is not None:
+            return
+        self.recording_queue = queue.Queue(maxsize=config.RECORDING_QUEUE_SIZE)
+        self.recording_thread = threading.Thread(
+            target=self._recording_loop,
+            args=(fps, segment_seconds, segment_max_mb * 1024 * 1024, video_prefix),
+            daemon=True,
+        )
+        self.recording_thread.start()
+
+    def stop_segmented_recording(self):
+        """
+        Writes the queued frames and closes the last segment
+        """
+        if self.recording_thread is None:
+            return
+        self.recording_queue.put(None)
+        self.recording_thread.join()
+        self.recording_queue = None
+        self.recording_thread = None
+        if self.dropped_count:
+            print(f"Recording: {self.dropped_count} frames dropped")
+
+    @staticmethod
+    def find_segment(index_path, timestamp):
+        """
+        Finds the segment file and frame recorded at the given time
+
+        @param index_path (str): The path of the recording_index.jsonl file
+        @param timestamp (float): The time to look for, as a Unix timestamp
+        @return (tuple): A (segment_path, frame_index) tuple, or None if nothing was recorded at that time
+        """
+        with open(index_path, "r") as index_file:
+            for line in index_file:
+                segment = json.loads(line)
+                if segment["start"] <= timestamp <= segment["end"]:
+                    break
+            else:
+                return None
+        with open(segment["index_path"], "r") as sidecar_file:
+            entries = json.load(sidecar_file)["index"]
+        frame_index = 0
+        for entry in entries:  # Entries are in time order
+            if entry["timestamp"] > timestamp:
+                break
+            frame_index = entry["frame"]
+        return segment["path"], frame_index
+
+    def _recording_loop(self, fps, segment_seconds, segment_max_bytes, video_prefix):
+        """
+        Recording thread loop that writes the queued frames and rotates the segments
+
+        @param fps (float): The frames per second of the video (0 or None to use the measured rate)
+        @param segment_seconds (float): The maximum duration of a segment, in seconds
+        @param segment_max_bytes (int): The maximum size of a segment, in bytes
+        @param video_prefix (str): The prefix of the segment filenames
+        """
+        segment = None
+        measured = not fps
+        sample = []  # The first frames, held until their rate is measured
+        while True:
+            item = self.recording_queue.get()
+            if item is None:
+                break
+            if not fps:
+                sample.append(item)
+                duration = item[0] - sample[0][0]
+                if (
+                    duration < self.FPS_SAMPLE_SECONDS
+                    and len(sample) < self.FPS_SAMPLE_FRAMES
+                ):
+                    continue
+                fps = self.measure_fps(len(sample), duration)
+                items, sample = sample, []
+            else:
+                items = [item]
+            for timestamp, frame in items:
+                segment = self._record_frame(
+                    segment,
+                    timestamp,
+                    frame,
+                    fps,
+                    measured,
+                    segment_seconds,
+                    segment_max_bytes,
+                    video_prefix,
+                )
+        if sample:  # Stopped before a second of frames was measured
+            fps = self.measure_fps(len(sample), sample[-1][0] - sample[0][0])
+            for timestamp, frame in sample:
+                segment = self._record_frame(
+                    segment,
+                    timestamp,
+                    frame,
+                    fps,
+                    measured,
+                    segment_seconds,
+                    segment_max_bytes,
+                    video_prefix,
+                )
+        if segment is not None:
+            self._close_segment(segment)
+
+    def _record_frame(
+        self,
+        segment,
+        timestamp,
+        frame,
+        fps,
+        measured,
+        segment_seconds,
+        segment_max_bytes,
+        video_prefix,
+    ):
+        """
+        Writes a frame to the current segment, closing it and opening the next one if it is full.
+        With a measured frame rate, the next segment uses the rate measured over the closed one.
+
+        @param segment (dict): The state of the current segment, or None if no segment is open
+        @param timestamp (float): The time the frame was written
+        @param frame (numpy.ndarray): The frame to record
+        @param fps (float): The frames per second of a new segment, if there is no previous segment
+        @param measured (bool): Whether the frame rate is measured from the written frames
+        @param segment_seconds (float): The maximum duration of a segment, in seconds
+        @param segment_max_bytes (int): The maximum size of a segment, in bytes
+        @param video_prefix (str): The prefix of the segment filenames
+        @return (dict): The state of the current segment, or None if the frame could not be recorded
+        """
+        try:
+            if segment is not None and (
+                timestamp - segment["start"] >= segment_seconds
+                or segment["bytes"] >= segment_max_bytes
+            ):
+                self._close_segment(segment)
+                if measured:
+                    fps = self.measure_fps(
+                        segment["frames"], segment["end"] - segment["start"]
+                    )
+                segment = None
+            if segment is None:
+                segment = self._open_segment(frame, timestamp, fps, video_prefix)
+            if frame.shape[:2] != segment["shape"]:  # The stream resolution changed
+                frame = cv2.resize(frame, segment["shape"][::-1])
+            segment["writer"].write(frame)
+            if timestamp - segment["indexed"] >= 1.0:
+                # The writer buffers its output, so the offset is a lower bound
+                segment["bytes"] = os.path.getsize(segment["path"])
+                segment["index"].append(
+                    {
+                        "frame": segment["frames"],
+                        "timestamp": timestamp,
+                        "offset": segment["bytes"],
+                    }
+                )
+                segment["indexed"] = timestamp
+            segment["frames"] += 1
+            segment["end"] = timestamp
+        except Exception as e:
+            print(f"Error recording frame: {str(e)}")
+        return segment
+
+    @classmethod
+    def measure_fps(cls, frame_count, duration):
+        """
+        Computes the frame rate of frames written over a duration
+
+        @param frame_count (int): The number of frames
+        @param duration (float): The time between the first and last frame, in seconds
+        @return (float): The frames per second, or FALLBACK_FPS if it cannot be measured
+        """
+        if frame_count < 2 or duration <= 0:
+            return cls.FALLBACK_FPS
+        return (frame_count - 1) / duration
+
+    def _open_segment(self, frame, timestamp, fps, video_prefix):
+        """
+        Opens a new segment file
+
+        @param frame (numpy.ndarray): The first frame of the segment
+        @param timestamp (float): The time of the first frame
+        @param fps (float): The frames per second of the video
+        @param video_prefix (str): The prefix of the segment filename
+        @return (dict): The state of the segment
+        """
+        height, width = frame.shape[:2]
+        path = os.path.join(
+            self._output_dir(), self._generate_filename(video_prefix, "avi")
+        )
+        fourcc = cv2.VideoWriter_fourcc(*"XVID")
+        return {
+            "path": path,
+            "writer": cv2.VideoWriter(path, fourcc, fps, (width, height)),
+            "shape": (height, width),
+            "fps": fps,
+            "start": timestamp,
+            "end": timestamp,
+            "frames": 0,
+            "bytes": 0,
+            "indexed": float("-inf"),
+            "index": [],
+        }
+
+    def _close_segment(self, segment):
+        """
+        Closes a segment, writes its JSON sidecar, and appends it to the recording index
+
+        @param segment (dict): The state of the segment
+        """
+        segment["writer"].release()
+        summary = {
+            "path": segment["path"],
+            "index_path": os.path.splitext(segment["path"])[0] + ".json",
+            "start": segment["start"],
+            "end": segment["end"],
+            "frames": segment["frames"],
+            "fps": segment["fps"],
+            "bytes": os.path.getsize(segment["path"]),
+        }
+        with open(summary["index_path"], "w") as sidecar_file:
+            json.dump(dict(summary, index=segment["index"]), sidecar_file)
+        index_path = os.path.join(
+            os.path.dirname(segment["path"]), "recording_index.jsonl"
+        )
+        with open(index_path, "a") as index_file:
+            index_file.write(json.dumps(summary) + "\n")
 
     def rename_file(self, old_path, new_name):
         """
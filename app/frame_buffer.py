@@ -0,0 +1,89 @@
+from collections import deque
+import threading
+import config
+
+
+class FrameBuffer:
+    """
+    FrameBuffer class to pass frames from a producer thread to a consumer thread with bounded memory.
+    When the buffer is full, the oldest frame is dropped so the consumer always sees recent frames.
+
+    Two policies are supported:
+    - drop_oldest: Keeps up to max_size frames and drops the oldest frame when full
+    - latest_only: Keeps only the most recent frame
+
+    Attributes:
+    - policy (str): The drop policy (drop_oldest or latest_only)
+    - frames (collections.deque): The buffered frames
+    - condition (threading.Condition): The condition to wait for new frames
+    - put_count (int): The number of frames put in the buffer
+    - dropped_count (int): The number of frames dropped before they were read
+
+    Methods:
+    - put(self, frame): Adds a frame to the buffer, dropping the oldest frame if the buffer is full
+    - get(self, timeout=None): Waits for a frame and removes it from the buffer
+    - clear(self): Removes all frames from the buffer
+    - stats(self): Gets the buffer size and the frame counters
+    """
+
+    def __init__(
+        self, max_size=config.LIVE_BUFFER_SIZE, policy=config.LIVE_BUFFER_POLICY
+    ):
+        """
+        Initializes the FrameBuffer with the given size and drop policy
+
+        @param max_size (int): The maximum number of buffered frames (ignored for latest_only)
+        @param policy (str): The drop policy (drop_oldest or latest_only)
+        """
+        if policy not in ("drop_oldest", "latest_only"):
+            raise ValueError(f"Invalid frame buffer policy: {policy}")
+        self.policy = policy
+        self.frames = deque(maxlen=1 if policy == "latest_only" else max(1, max_size))
+        self.condition = threading.Condition()
+        self.put_count = 0
+        self.dropped_count = 0
+
+    def put(self, frame):
+        """
+        Adds a frame to the buffer, dropping the oldest frame if the buffer is full
+
+        @param frame (numpy.ndarray): The frame to add
+        """
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped_count += 1  # The deque drops the oldest frame on append
+            self.frames.append(frame)
+            self.put_count += 1
+            self.condition.notify()
+
+    def get(self, timeout=None):
+        """
+        Waits for a frame and removes it from the buffer
+
+        @param timeout (float): The maximum number of seconds to wait (None to wait forever)
+        @return (numpy.ndarray): The oldest buffered frame, or None if the timeout expired
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: len(self.frames) > 0, timeout):
+                return None
+            return self.frames.popleft()
+
+    def clear(self):
+        """
+        Removes all frames from the buffer
+        """
+        with self.condition:
+            self.frames.clear()
+
+    def stats(self):
+        """
+        Gets the buffer size and the frame counters
+
+        @return (dict): A dictionary with the buffered, put, and dropped frame counts
+        """
+        with self.condition:
+            return {
+                "buffered": len(self.frames),
+                "put": self.put_count,
+                "dropped": self.dropped_count,
+            }
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+import threading
+import time
+import cv2
+import numpy as np
+import config
+
+
+class FrameCache:
+    """
+    FrameCache class to reuse the detections of near-duplicate frames.
+    Frames are keyed by a 64-bit difference hash (dHash) of a downscaled grayscale copy.
+    A frame is a hit when a cached frame of the same size has a hash within the Hamming
+    distance tolerance and has not expired. The least recently used entry is evicted when
+    the cache is full.
+
+    Attributes:
+    - max_entries (int): The maximum number of cached frames
+    - ttl (float): The number of seconds a cached entry stays valid
+    - tolerance (int): The maximum Hamming distance between two hashes of near-duplicate frames
+    - entries (OrderedDict): The cached entries (hash -> (frame shape, detections, expiry time))
+    - hits (int): The number of lookups that returned cached detections
+    - misses (int): The number of lookups that did not find cached detections
+    - lock (threading.Lock): The lock to guard the cache across threads
+
+    Methods:
+    - compute_hash(frame): Computes the 64-bit difference hash of the frame
+    - hamming_distance(hash_a, hash_b): Counts the bits that differ between two hashes
+    - get(self, frame_hash, shape): Gets the cached detections of a near-duplicate frame
+    - put(self, frame_hash, shape, detections): Caches the detections of a frame
+    - stats(self): Gets the hit and miss counters of the cache
+    - clear(self): Removes all cached entries
+    """
+
+    def __init__(
+        self,
+        max_entries=config.FRAME_CACHE_MAX_ENTRIES,
+        ttl=config.FRAME_CACHE_TTL,
+        tolerance=config.FRAME_CACHE_TOLERANCE,
+    ):
+        """
+        Initializes the FrameCache with the given size, time to live, and Hamming distance tolerance
+
+        @param max_entries (int): The maximum number of cached frames
+        @param ttl (float): The number of seconds a cached entry stays valid
+        @param tolerance (int): The maximum Hamming distance between two hashes of near-duplicate frames
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tolerance = tolerance
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def compute_hash(frame):
+        """
+        Computes the 64-bit difference hash of the frame.
+        Each bit tells if a pixel is brighter than its right neighbour on a 9x8 grayscale thumbnail.
+
+        @param frame (numpy.ndarray): The frame to hash
+        @return (int): The 64-bit hash of the frame
+        """
+        gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        bits = small[:, 1:] > small[:, :-1]
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    @staticmethod
+    def hamming_distance(hash_a, hash_b):
+        """
+        Counts the bits that differ between two hashes
+
+        @param hash_a (int): The first hash
+        @param hash_b (int): The second hash
+        @return (int): The number of differing bits
+        """
+        return bin(hash_a ^ hash_b).count("1")
+
+    def get(self, frame_hash, shape):
+        """
+        Gets the cached detections of a near-duplicate frame
+
+        @param frame_hash (int): The hash of the frame
+        @param shape (tuple): The shape of the frame
+        @return (list): A copy of the cached detections, or None if there is no match
+        """
+        now = time.monotonic()
+        with self.lock:
+            match = None
+            # Scan from the most recently used entry, which is the most likely match
+            for cached_hash, (cached_shape, _, expires_at) in reversed(
+                list(self.entries.items())
+            ):
+                if expires_at <= now:
+                    del self.entries[cached_hash]  # Drop expired entries while scanning
+                    continue
+                if cached_shape != shape:
+                    continue
+                if self.hamming_distance(cached_hash, frame_hash) <= self.tolerance:
+                    match = cached_hash
+                    break
+
+            if match is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.entries.move_to_end(match)  # Mark as most recently used
+            return [dict(detection) for detection in self.entries[match][1]]
+
+    def put(self, frame_hash, shape, detections):
+        """
+        Caches the detections of a frame and evicts the least recently used entries if the cache is full
+
+        @param frame_hash (int): The hash of the frame
+        @param shape (tuple): The shape of the frame
+        @param detections (list): The detections of the frame
+        """
+        with self.lock:
+            self.entries[frame_hash] = (
+                shape,
+                [dict(detection) for detection in detections],
+                time.monotonic() + self.ttl,
+            )
+            self.entries.move_to_end(frame_hash)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        """
+        Gets the hit and miss counters of the cache
+
+        @return (dict): A dictionary with the hits, misses, hit rate, and number of entries
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+            }
+
+    def clear(self):
+        """
+        Removes all cached entries
+        """
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,278 @@
+import math
+import cv2
+import config
+
+
+class FrameSamplerFactory:
+    """
+    FrameSamplerFactory is a factory class that creates instances of the FrameSampler class.
+    Allows for the creation of a sampler that keeps every frame, every Nth frame, a fixed
+    number of frames per second, or only the frames where the scene changes.
+    """
+
+    @staticmethod
+    def create_sampler(policy=config.SCAN_SAMPLING_POLICY):
+        """
+        Creates an instance of the FrameSampler class based on the sampling policy.
+        Default is the policy set in the configuration.
+
+        @param policy (str): The sampling policy (all, nth, fps, or scene)
+        @return (FrameSampler): An instance of the FrameSampler class
+        """
+        if policy == "all":
+            return AllFramesSampler()
+        elif policy == "nth":
+            return EveryNthFrameSampler(config.SCAN_SAMPLE_EVERY_N)
+        elif policy == "fps":
+            return TargetFpsSampler(config.SCAN_SAMPLE_FPS)
+        elif policy == "scene":
+            return SceneChangeSampler(
+                config.SCAN_SCENE_THRESHOLD,
+                config.SCAN_SCENE_METHOD,
+                config.SCAN_SCENE_CHECK_EVERY,
+            )
+        else:
+            raise ValueError(f"Invalid sampling policy: {policy}")
+
+
+class BaseFrameSampler:
+    """
+    BaseFrameSampler is an abstract class that defines the interface for a FrameSampler.
+    The FrameSampler class decides which frames of a video are sent to the object detector.
+
+    Sampling happens in two steps. should_decode is asked before a frame is decoded, so
+    frames it rejects are skipped with cv2.VideoCapture.grab() and never pay the decode cost.
+    accept is asked after a frame is decoded, for samplers that need to look at the pixels.
+
+    Methods:
+    - reset(self, fps, start_frame): Resets the sampler for a new video with the given frame rate
+    - should_decode(self, frame_index): Checks if the frame at the given index should be decoded
+    - accept(self, frame, frame_index): Checks if the decoded frame should be sent to the object detector
+    """
+
+    def reset(self, fps, start_frame=0):
+        """
+        Resets the sampler for a new video with the given frame rate
+
+        @param fps (float): The frame rate of the video (0 if unknown)
+        @param start_frame (int): The index of the first frame, when a resumed video starts partway through
+        """
+        self.fps = fps
+
+    def should_decode(self, frame_index):
+        """
+        Checks if the frame at the given index should be decoded.
+        This method should be implemented by the derived classes.
+
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): True if the frame should be decoded, False if it should be skipped
+        """
+        raise NotImplementedError
+
+    def accept(self, frame, frame_index):
+        """
+        Checks if the decoded frame should be sent to the object detector
+
+        @param frame (numpy.ndarray): The decoded frame
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): True if the frame should be sent to the object detector
+        """
+        return True
+
+
+class AllFramesSampler(BaseFrameSampler):
+    """
+    AllFramesSampler is a concrete class that extends the BaseFrameSampler class.
+    Every frame of the video is decoded and sent to the object detector.
+
+    Methods:
+    - should_decode(self, frame_index): Checks if the frame at the given index should be decoded (always True)
+    """
+
+    def should_decode(self, frame_index):
+        """
+        Checks if the frame at the given index should be decoded. Every frame is decoded.
+
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): Always True
+        """
+        return True
+
+
+class EveryNthFrameSampler(BaseFrameSampler):
+    """
+    EveryNthFrameSampler is a concrete class that extends the BaseFrameSampler class.
+    Only every Nth frame of the video is decoded and sent to the object detector.
+
+    Attributes:
+    - n (int): The sampling interval in frames
+
+    Methods:
+    - should_decode(self, frame_index): Checks if the frame at the given index is an Nth frame
+    """
+
+    def __init__(self, n):
+        """
+        Initializes the EveryNthFrameSampler with the given sampling interval
+
+        @param n (int): The sampling interval in frames
+        """
+        self.n = max(1, int(n))
+
+    def should_decode(self, frame_index):
+        """
+        Checks if the frame at the given index should be decoded, which is every Nth frame
+
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): True if the frame index is a multiple of n
+        """
+        return frame_index % self.n == 0
+
+
+class TargetFpsSampler(BaseFrameSampler):
+    """
+    TargetFpsSampler is a concrete class that extends the BaseFrameSampler class.
+    Frames are decoded at a fixed target rate, independent of the frame rate of the video.
+    If the frame rate of the video is unknown, every frame is decoded.
+
+    Attributes:
+    - target_fps (float): The number of frames per second to send to the object detector
+    - next_index (float): The index of the next frame to decode
+
+    Methods:
+    - reset(self, fps, start_frame): Resets the sampler for a new video and finds the first frame to decode
+    - should_decode(self, frame_index): Checks if the frame at the given index is due at the target rate
+    """
+
+    def __init__(self, target_fps):
+        """
+        Initializes the TargetFpsSampler with the given target rate
+
+        @param target_fps (float): The number of frames per second to send to the object detector
+        """
+        self.target_fps = float(target_fps)
+        self.fps = 0
+        self.next_index = 0.0
+
+    def reset(self, fps, start_frame=0):
+        """
+        Resets the sampler for a new video with the given frame rate. A resumed video continues
+        on the same frames as a scan that started at frame 0.
+
+        @param fps (float): The frame rate of the video (0 if unknown)
+        @param start_frame (int): The index of the first frame, when a resumed video starts partway through
+        """
+        super().reset(fps, start_frame)
+        self.next_index = 0.0
+        if fps > 0 and 0 < self.target_fps < fps:
+            # Continue on the same frames as a scan that started at frame 0
+            step = fps / self.target_fps
+            self.next_index = math.ceil(start_frame / step) * step
+
+    def should_decode(self, frame_index):
+        """
+        Checks if the frame at the given index should be decoded to keep the target rate.
+        Every frame is decoded if the frame rate of the video is unknown or not above the target.
+
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): True if the frame is due at the target rate
+        """
+        if self.fps <= 0 or self.target_fps <= 0 or self.target_fps >= self.fps:
+            return True
+        if frame_index >= self.next_index:
+            self.next_index += self.fps / self.target_fps
+            return True
+        return False
+
+
+class SceneChangeSampler(BaseFrameSampler):
+    """
+    SceneChangeSampler is a concrete class that extends the BaseFrameSampler class.
+    Every check_every-th frame is decoded and compared with the last sampled frame on a small
+    grayscale thumbnail. Only frames that differ by more than the threshold are sent to the
+    object detector. The first frame of every video is always sent.
+
+    The difference is scored with either:
+    - diff: The mean absolute pixel difference, between 0 and 1
+    - hist: The Bhattacharyya distance between the grayscale histograms, between 0 and 1
+
+    Attributes:
+    - threshold (float): The minimum score for a frame to count as a scene change
+    - method (str): The scoring method (diff or hist)
+    - check_every (int): The interval in frames between scene change checks
+    - last_thumbnail (numpy.ndarray): The thumbnail of the last sampled frame
+
+    Methods:
+    - reset(self, fps, start_frame): Resets the sampler for a new video and forgets the last sampled frame
+    - should_decode(self, frame_index): Checks if the frame at the given index is due for a scene change check
+    - accept(self, frame, frame_index): Checks if the decoded frame is a scene change
+    - _score(self, thumbnail): Scores the difference between the thumbnail and the last sampled thumbnail
+    """
+
+    THUMBNAIL_SIZE = (64, 36)
+
+    def __init__(self, threshold, method="diff", check_every=1):
+        """
+        Initializes the SceneChangeSampler with the given threshold, method, and check interval
+
+        @param threshold (float): The minimum score for a frame to count as a scene change
+        @param method (str): The scoring method (diff or hist)
+        @param check_every (int): The interval in frames between scene change checks
+        """
+        if method not in ("diff", "hist"):
+            raise ValueError(f"Invalid scene change method: {method}")
+        self.threshold = threshold
+        self.method = method
+        self.check_every = max(1, int(check_every))
+        self.last_thumbnail = None
+
+    def reset(self, fps, start_frame=0):
+        """
+        Resets the sampler for a new video, so its first frame is always sent
+
+        @param fps (float): The frame rate of the video (0 if unknown)
+        @param start_frame (int): The index of the first frame, when a resumed video starts partway through
+        """
+        super().reset(fps, start_frame)
+        self.last_thumbnail = None
+
+    def should_decode(self, frame_index):
+        """
+        Checks if the frame at the given index should be decoded for a scene change check
+
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): True if the frame index is a multiple of check_every
+        """
+        return frame_index % self.check_every == 0
+
+    def accept(self, frame, frame_index):
+        """
+        Checks if the decoded frame differs enough from the last sampled frame to be sent to the
+        object detector, and makes it the last sampled frame if so
+
+        @param frame (numpy.ndarray): The decoded frame
+        @param frame_index (int): The index of the frame in the video
+        @return (bool): True if the frame is the first of the video or a scene change
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumbnail = cv2.resize(gray, self.THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+        if self.last_thumbnail is not None and self._score(thumbnail) < self.threshold:
+            return False
+        self.last_thumbnail = thumbnail
+        return True
+
+    def _score(self, thumbnail):
+        """
+        Scores the difference between the thumbnail and the last sampled thumbnail
+
+        @param thumbnail (numpy.ndarray): The grayscale thumbnail of the current frame
+        @return (float): The difference score between 0 and 1
+        """
+        if self.method == "diff":
+            return float(cv2.absdiff(thumbnail, self.last_thumbnail).mean()) / 255.0
+
+        hist = cv2.calcHist([thumbnail], [0], None, [32], [0, 256])
+        last_hist = cv2.calcHist([self.last_thumbnail], [0], None, [32], [0, 256])
+        cv2.normalize(hist, hist)
+        cv2.normalize(last_hist, last_hist)
+        return cv2.compareHist(hist, last_hist, cv2.HISTCMP_BHATTACHARYYA)
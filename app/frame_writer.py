@@ -0,0 +1,148 @@
+import atexit
+import queue
+import threading
+import cv2
+import config
+
+
+class AsyncFrameWriter:
+    """
+    AsyncFrameWriter class to annotate and save output images off the detection hot path.
+    Frames are copied into a bounded queue and written by one or more encoder threads.
+    When the queue is full a non-blocking write is dropped and counted, so a slow disk never
+    blocks live detection. Blocking writes wait for room instead, for scans that must keep every image.
+    Pending writes are flushed when the writer is closed, including at interpreter exit.
+
+    Attributes:
+    - write_queue (queue.Queue): The bounded queue of pending writes
+    - threads (list): The encoder threads
+    - dropped_count (int): The number of writes dropped because the queue was full
+    - written_count (int): The number of images written to disk
+    - failed_count (int): The number of images that could not be written
+    - closed (bool): Whether the writer has been closed
+    - lock (threading.Lock): The lock to guard the counters
+
+    Methods:
+    - submit(self, frame, detections, output_path, annotate, block=False): Queues a frame to be annotated and written
+    - queue_depth(self): Gets the number of pending writes
+    - stats(self): Gets the queue depth and the write counters
+    - flush(self): Blocks until all pending writes are written
+    - close(self): Flushes the pending writes and stops the encoder threads
+    - _run(self): Encoder thread loop that annotates and writes the queued frames
+    """
+
+    def __init__(
+        self,
+        max_queue_size=config.FRAME_WRITER_QUEUE_SIZE,
+        num_threads=config.FRAME_WRITER_THREADS,
+    ):
+        """
+        Initializes the AsyncFrameWriter and starts the encoder threads
+
+        @param max_queue_size (int): The maximum number of pending writes
+        @param num_threads (int): The number of encoder threads
+        """
+        self.write_queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped_count = 0
+        self.written_count = 0
+        self.failed_count = 0
+        self.closed = False
+        self.lock = threading.Lock()
+        self.threads = [
+            threading.Thread(target=self._run, daemon=True)
+            for _ in range(max(1, num_threads))
+        ]
+        for thread in self.threads:
+            thread.start()
+        atexit.register(self.close)
+
+    def submit(self, frame, detections, output_path, annotate, block=False):
+        """
+        Queues a frame to be annotated and written, and returns without waiting for the write.
+        The frame is copied, so the caller is free to modify it afterwards.
+
+        @param frame (numpy.ndarray): The frame to write
+        @param detections (list): The detections to draw on the frame
+        @param output_path (str): The path to write the image to
+        @param annotate (function): The function that draws the detections on the frame
+        @param block (bool): Whether to wait for room in the queue instead of dropping the write
+        @return (bool): True if the write was queued, False if it was dropped
+        """
+        if self.closed:
+            return False
+        try:
+            self.write_queue.put(
+                (frame.copy(), detections, output_path, annotate), block=block
+            )
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped_count += 1
+            print(f"Frame writer queue full. Dropped write: {output_path}")
+            return False
+
+    def queue_depth(self):
+        """
+        Gets the number of pending writes
+
+        @return (int): The number of pending writes
+        """
+        return self.write_queue.qsize()
+
+    def stats(self):
+        """
+        Gets the queue depth and the write counters
+
+        @return (dict): A dictionary with the queue depth and the written, dropped, and failed counts
+        """
+        with self.lock:
+            return {
+                "queue_depth": self.queue_depth(),
+                "written": self.written_count,
+                "dropped": self.dropped_count,
+                "failed": self.failed_count,
+            }
+
+    def flush(self):
+        """
+        Blocks until all pending writes are written
+        """
+        self.write_queue.join()
+
+    def close(self):
+        """
+        Flushes the pending writes and stops the encoder threads
+        """
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        self.flush()
+        for _ in self.threads:
+            self.write_queue.put(None)  # One stop signal per encoder thread
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self):
+        """
+        Encoder thread loop that annotates and writes the queued frames
+        """
+        while True:
+            item = self.write_queue.get()
+            try:
+                if item is None:
+                    return
+                frame, detections, output_path, annotate = item
+                annotate(frame, detections)
+                success = cv2.imwrite(output_path, frame)
+                with self.lock:
+                    if success:
+                        self.written_count += 1
+                    else:
+                        self.failed_count += 1
+            except Exception as e:
+                print(f"Error writing frame: {str(e)}")
+                with self.lock:
+                    self.failed_count += 1
+            finally:
+                self.write_queue.task_done()
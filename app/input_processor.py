@@ -7,63 +7,136 @@ class InputProcessor:
     """
     InputProcessor class with static methods to process input data (image, video, or directory)
 
+    The iter_* methods are generators that yield frames lazily, one at a time, together with
+    a dictionary of source metadata (source path, frame index, and timestamp in milliseconds).
+    A resumed scan passes the frame index to start each source at, or None for a complete source.
+    The process_* methods collect the same frames into a list.
+
     Attributes:
     - None
 
     Methods:
+    - iter_image(image_path, start_frame=0): Yields the frame of an image file with its source metadata
+    - iter_video(video_path, sampler=None, start_frame=0): Yields the sampled frames of a video file with their source metadata
+    - iter_directory(directory_path, sampler=None, start_frames=None): Yields the frames of every image and video file in a directory
     - process_image(image_path): Processes an image file and returns a list of frames
     - process_video(video_path): Processes a video file and returns a list of frames
     - process_directory(directory_path): Processes a directory and returns a list of frames
     """
 
     @staticmethod
-    def process_image(image_path):
+    def iter_image(image_path, start_frame=0):
         """
-        Processes an image file and returns a list of frames
+        Yields the frame of an image file with its source metadata
 
         @param image_path (str): The path of the image file
-        @return (list): A list containing the image frame
+        @param start_frame (int): The frame index to start at (the image is skipped unless 0)
+        @return (generator): A generator of (frame, source_info) tuples
         """
+        if start_frame != 0:  # Already scanned
+            return
         image = cv2.imread(image_path)
-        return [image] if image is not None else []
+        if image is not None:
+            yield image, {"source": image_path, "frame_index": 0, "timestamp": 0.0}
 
     @staticmethod
-    def process_video(video_path):
+    def iter_video(video_path, sampler=None, start_frame=0):
         """
-        Processes a video file and returns a list of frames
+        Yields the sampled frames of a video file with their source metadata.
+        Frames are decoded one at a time, so memory use does not grow with the video length.
+        Frames rejected by the sampler before decoding are skipped with grab() and never decoded.
+        A resumed video seeks straight to start_frame instead of decoding its way there.
 
         @param video_path (str): The path of the video file
-        @return (list): A list containing the video frames
+        @param sampler (FrameSampler): The sampler that selects the frames to yield (all frames if None)
+        @param start_frame (int): The frame index to start at (None to skip the video)
+        @return (generator): A generator of (frame, source_info) tuples
         """
+        if start_frame is None:  # Already scanned
+            return
         cap = cv2.VideoCapture(video_path)
         if not cap.isOpened():
             raise Exception(f"Cannot open video: {video_path}")
 
-        frames = []
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frames.append(frame)
-
-        cap.release()
-        return frames
+        try:
+            if start_frame > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            if sampler is not None:
+                sampler.reset(cap.get(cv2.CAP_PROP_FPS), start_frame)
+            frame_index = start_frame
+            while True:
+                if sampler is not None and not sampler.should_decode(frame_index):
+                    if not cap.grab():  # Advance without decoding the frame
+                        break
+                    frame_index += 1
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                # Read after the frame is decoded; before, it is the time of the previous frame
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC)
+                if sampler is not None and not sampler.accept(frame, frame_index):
+                    frame_index += 1
+                    continue
+                yield frame, {
+                    "source": video_path,
+                    "frame_index": frame_index,
+                    "timestamp": timestamp,
+                }
+                frame_index += 1
+        finally:
+            cap.release()
 
     @staticmethod
-    def process_directory(directory_path):
+    def iter_directory(directory_path, sampler=None, start_frames=None):
         """
-        Processes a directory and returns a list of frames.
+        Yields the frames of every image and video file in a directory.
         Each file in the directory is processed as an image or video file.
 
         @param directory_path (str): The path of the directory
-        @return (list): A list containing the frames from the directory
+        @param sampler (FrameSampler): The sampler that selects the video frames to yield (all frames if None)
+        @param start_frames (dict): The frame index to start each file at (None to skip it, 0 if missing)
+        @return (generator): A generator of (frame, source_info) tuples
         """
-        frames = []
-        for filename in os.listdir(directory_path):
+        start_frames = start_frames or {}
+        for filename in sorted(os.listdir(directory_path)):
             file_path = os.path.join(directory_path, filename)
             if os.path.isfile(file_path):
+                start_frame = start_frames.get(file_path, 0)
                 if filename.lower().endswith((".jpg", ".jpeg", ".png")):
-                    frames.append(InputProcessor.process_image(file_path))
+                    yield from InputProcessor.iter_image(file_path, start_frame)
                 elif filename.lower().endswith((".mp4", ".avi")):
-                    frames.extend(InputProcessor.process_video(file_path))
-        return frames
+                    yield from InputProcessor.iter_video(
+                        file_path, sampler, start_frame
+                    )
+
+    @staticmethod
+    def process_image(image_path):
+        """
+        Processes an image file and returns a list of frames
+
+        @param image_path (str): The path of the image file
+        @return (list): A list containing the image frame
+        """
+        return [frame for frame, _ in InputProcessor.iter_image(image_path)]
+
+    @staticmethod
+    def process_video(video_path):
+        """
+        Processes a video file and returns a list of frames
+
+        @param video_path (str): The path of the video file
+        @return (list): A list containing the video frames
+        """
+        return [frame for frame, _ in InputProcessor.iter_video(video_path)]
+
+    @staticmethod
+    def process_directory(directory_path):
+        """
+        Processes a directory and returns a list of frames.
+        Each file in the directory is processed as an image or video file.
+
+        @param directory_path (str): The path of the directory
+        @return (list): A list containing the frames from the directory
+        """
+        return [frame for frame, _ in InputProcessor.iter_directory(directory_path)]
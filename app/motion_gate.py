@@ -0,0 +1,108 @@
+import time
+import cv2
+import config
+
+
+class MotionGate:
+    """
+    MotionGate class to decide if a live frame should be sent to the object detector.
+    The frame is downscaled to a small grayscale image and compared with the scene background,
+    and the object detector is only called when the changed area is larger than the threshold.
+
+    Two methods are supported:
+    - mog2: Background subtraction with cv2.createBackgroundSubtractorMOG2
+    - diff: Absolute difference with the previous frame
+
+    Attributes:
+    - method (str): The motion detection method (mog2 or diff)
+    - threshold (float): The minimum fraction of changed pixels that counts as motion (0-1)
+    - min_interval (float): The minimum number of seconds between two frames let through by the gate
+    - width (int): The width of the downscaled frame used for motion detection
+    - subtractor (cv2.BackgroundSubtractorMOG2): The background subtractor for the mog2 method
+    - previous (numpy.ndarray): The previous downscaled frame for the diff method
+    - last_pass_time (float): The time of the last frame let through by the gate
+    - passed_count (int): The number of frames let through by the gate
+    - skipped_count (int): The number of frames held back by the gate
+
+    Methods:
+    - should_detect(self, frame): Checks if the frame should be sent to the object detector
+    - _motion_ratio(self, small): Computes the fraction of changed pixels in the downscaled frame
+    """
+
+    def __init__(
+        self,
+        method=config.MOTION_GATE_METHOD,
+        threshold=config.MOTION_GATE_THRESHOLD,
+        min_interval=config.MOTION_GATE_MIN_INTERVAL,
+        width=config.MOTION_GATE_WIDTH,
+    ):
+        """
+        Initializes the MotionGate with the given method, threshold, minimum interval, and width
+
+        @param method (str): The motion detection method (mog2 or diff)
+        @param threshold (float): The minimum fraction of changed pixels that counts as motion (0-1)
+        @param min_interval (float): The minimum number of seconds between two frames let through by the gate
+        @param width (int): The width of the downscaled frame used for motion detection
+        """
+        if method not in ("mog2", "diff"):
+            raise ValueError(f"Invalid motion gate method: {method}")
+        self.method = method
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.width = width
+        self.subtractor = (
+            cv2.createBackgroundSubtractorMOG2(detectShadows=False)
+            if method == "mog2"
+            else None
+        )
+        self.previous = None
+        self.last_pass_time = None
+        self.passed_count = 0
+        self.skipped_count = 0
+
+    def should_detect(self, frame):
+        """
+        Checks if the frame should be sent to the object detector.
+        The first frame always passes. Later frames pass when motion is found and at least
+        min_interval seconds have passed since the last frame let through by the gate.
+
+        @param frame (numpy.ndarray): The captured frame
+        @return (bool): True if the frame should be sent to the object detector, False otherwise
+        """
+        height = max(1, int(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.cvtColor(
+            cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA),
+            cv2.COLOR_BGR2GRAY,
+        )
+        small = cv2.GaussianBlur(small, (5, 5), 0)
+
+        # Update the background model on every frame, even if the interval has not passed
+        motion = self._motion_ratio(small) >= self.threshold
+        now = time.monotonic()
+        if self.last_pass_time is not None:
+            if not motion or now - self.last_pass_time < self.min_interval:
+                self.skipped_count += 1
+                return False
+
+        self.last_pass_time = now
+        self.passed_count += 1
+        return True
+
+    def _motion_ratio(self, small):
+        """
+        Computes the fraction of changed pixels in the downscaled frame
+
+        @param small (numpy.ndarray): The downscaled grayscale frame
+        @return (float): The fraction of changed pixels (0-1)
+        """
+        if self.method == "mog2":
+            mask = self.subtractor.apply(small)
+        else:
+            if self.previous is None or self.previous.shape != small.shape:
+                self.previous = small
+                return 0.0
+            mask = cv2.threshold(
+                cv2.absdiff(small, self.previous), 25, 255, cv2.THRESH_BINARY
+            )[1]
+            self.previous = small
+        return cv2.countNonZero(mask) / mask.size
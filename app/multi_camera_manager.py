@@ -0,0 +1,303 @@
+import queue
+import threading
+import time
+import cv2
+from camera_manager import BaseCameraManager
+from object_detector import ObjectDetector
+from frame_buffer import FrameBuffer
+from motion_gate import MotionGate
+from camera_reconnector import CameraReconnector
+from event_recorder import EventRecorder
+from object_tracker import ObjectTracker
+import config
+
+
+class CameraWorker:
+    """
+    CameraWorker class to capture frames from a single camera on its own thread.
+    The worker connects, reads, and reconnects independently of the other cameras,
+    and keeps the most recent frames in its own input buffer for the detector pool.
+
+    Attributes:
+    - camera_id (str): The camera ID
+    - source (str): The camera index or stream URL
+    - camera (BaseCameraManager): The camera connection
+    - reconnector (CameraReconnector): The reader that reconnects the camera in the background
+    - input_buffer (FrameBuffer): The captured frames waiting for detection
+    - output_buffer (FrameBuffer): The annotated frames waiting for display
+    - motion_gate (MotionGate): The motion gate in front of the detector (None if disabled)
+    - event_recorder (EventRecorder): The recorder of clips around detections (None if disabled)
+    - tracker (ObjectTracker): The tracker that follows the objects between detector runs (None if disabled)
+    - running (threading.Event): The event to control the capture loop
+    - thread (threading.Thread): The capture thread
+    - on_frame (function): The callback to notify the detector pool of a new frame
+
+    Methods:
+    - start(self): Starts the capture thread
+    - stop(self): Stops the capture thread, disconnects from the camera, and writes the clip being recorded
+    - _capture_loop(self): Capture loop that reads frames while the camera reconnects in the background
+    """
+
+    def __init__(self, camera_id, source, on_frame):
+        """
+        Initializes the CameraWorker with the given camera ID, source, and frame callback
+
+        @param camera_id (str): The camera ID
+        @param source (str): The camera index or stream URL
+        @param on_frame (function): The callback to notify the detector pool of a new frame
+        """
+        self.camera_id = camera_id
+        self.source = source
+        self.camera = BaseCameraManager()
+        self.reconnector = CameraReconnector(self.camera, source, camera_id)
+        self.input_buffer = FrameBuffer(policy="latest_only")
+        self.output_buffer = FrameBuffer()
+        self.motion_gate = MotionGate() if config.MOTION_GATE_ENABLED else None
+        self.tracker = (
+            ObjectTracker(keep_finished=False) if config.TRACKING_ENABLED else None
+        )
+        self.event_recorder = (
+            EventRecorder(camera_id) if config.EVENT_CLIPS_ENABLED else None
+        )
+        self.running = threading.Event()
+        self.thread = None
+        self.on_frame = on_frame
+
+    def start(self):
+        """
+        Starts the capture thread
+        """
+        self.running.set()
+        self.thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops the capture thread, disconnects from the camera, and writes the clip being recorded
+        """
+        self.running.clear()
+        if self.thread is not None and self.thread != threading.current_thread():
+            self.thread.join()
+        if self.event_recorder is not None:
+            self.event_recorder.close()
+
+    def _capture_loop(self):
+        """
+        Capture loop that reads frames while the camera connects and reconnects in the background.
+        A failing camera is retried with backoff without affecting the other cameras.
+        """
+        try:
+            self.reconnector.request_reconnect()  # Initial connection
+            while self.running.is_set():
+                frame = self.reconnector.read_frame()
+                if frame is None:  # Keep running while the camera reconnects
+                    time.sleep(config.CAMERA_IDLE_WAIT_MS / 1000)
+                    continue
+                self.input_buffer.put(frame)
+                self.on_frame(self.camera_id)
+        finally:
+            self.reconnector.stop()
+            self.camera.disconnect_camera()
+
+
+class MultiCameraManager:
+    """
+    MultiCameraManager class to stream several cameras concurrently from one process.
+    Each camera has its own CameraWorker, and all workers feed a shared pool of detection
+    threads through their per-camera buffers. Cameras can be added or removed at runtime
+    without stopping the others.
+
+    Attributes:
+    - workers (dict): The camera workers (camera ID -> CameraWorker)
+    - object_detector (ObjectDetector): The object detector shared by the detection threads
+    - owns_detector (bool): Whether the object detector was created by this manager
+    - notification_manager (NotificationManager): The notification manager to alert live detections to, or None
+    - ready_queue (queue.Queue): The IDs of the cameras with a frame waiting for detection
+    - pending (set): The IDs of the cameras already in the ready queue
+    - lock (threading.Lock): The lock to guard the workers and the pending set
+    - running (threading.Event): The event to control the detection threads
+    - detector_threads (list): The detection threads
+
+    Methods:
+    - add_camera(self, camera_id, source): Adds a camera and starts capturing from it
+    - remove_camera(self, camera_id): Stops capturing from a camera and removes it
+    - get_camera_ids(self): Gets the IDs of the managed cameras
+    - get_camera_health(self): Gets the health state of every camera
+    - start(self, num_detectors): Starts the shared detection threads
+    - stop(self): Stops all cameras and detection threads
+    - display_frames(self): Displays the annotated frames of every camera in its own window
+    - _notify_frame(self, camera_id): Marks a camera as having a frame waiting for detection
+    - _detection_loop(self): Detection loop that processes the waiting frames of all cameras
+    """
+
+    def __init__(self, object_detector=None, notification_manager=None):
+        """
+        Initializes the MultiCameraManager with the given object detector, or a new one if None
+
+        @param object_detector (ObjectDetector): The object detector shared by the detection threads
+        @param notification_manager (NotificationManager): The notification manager to alert live detections to, or None
+        """
+        self.workers = {}
+        self.owns_detector = object_detector is None
+        self.object_detector = object_detector or ObjectDetector()
+        self.notification_manager = notification_manager
+        self.ready_queue = queue.Queue()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.detector_threads = []
+
+    def add_camera(self, camera_id, source):
+        """
+        Adds a camera and starts capturing from it
+
+        @param camera_id (str): The camera ID
+        @param source (str): The camera index or stream URL
+        """
+        worker = CameraWorker(camera_id, source, self._notify_frame)
+        with self.lock:
+            if camera_id in self.workers:
+                raise ValueError(f"Camera {camera_id} is already added")
+            self.workers[camera_id] = worker
+        worker.start()
+
+    def remove_camera(self, camera_id):
+        """
+        Stops capturing from a camera and removes it
+
+        @param camera_id (str): The camera ID
+        """
+        with self.lock:
+            worker = self.workers.pop(camera_id, None)
+            self.pending.discard(camera_id)
+        if worker is not None:
+            worker.stop()
+
+    def get_camera_ids(self):
+        """
+        Gets the IDs of the managed cameras
+
+        @return (list): A list of camera IDs
+        """
+        with self.lock:
+            return list(self.workers)
+
+    def get_camera_health(self):
+        """
+        Gets the health state of every camera
+
+        @return (dict): The health state (connected, degraded, or reconnecting) per camera ID
+        """
+        with self.lock:
+            workers = list(self.workers.values())
+        return {worker.camera_id: worker.reconnector.get_state() for worker in workers}
+
+    def start(self, num_detectors=config.DETECTION_WORKERS):
+        """
+        Starts the shared detection threads
+
+        @param num_detectors (int): The number of detection threads
+        """
+        self.running.set()
+        self.detector_threads = [
+            threading.Thread(target=self._detection_loop, daemon=True)
+            for _ in range(max(1, num_detectors))
+        ]
+        for thread in self.detector_threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stops all cameras and detection threads
+        """
+        for camera_id in self.get_camera_ids():
+            self.remove_camera(camera_id)
+        self.running.clear()
+        for thread in self.detector_threads:
+            thread.join()
+        self.detector_threads = []
+        if self.owns_detector:
+            self.object_detector.close()
+        else:
+            self.object_detector.flush()
+
+    def display_frames(self):
+        """
+        Displays the annotated frames of every camera in its own window.
+        Press "q" to stop all cameras.
+        """
+        while self.running.is_set():
+            shown = False
+            with self.lock:
+                workers = list(self.workers.values())
+            for worker in workers:
+                frame = worker.output_buffer.get(timeout=0)
+                if frame is not None:
+                    cv2.imshow(f"Live Stream - Camera {worker.camera_id}", frame)
+                    shown = True
+            if not shown:
+                time.sleep(config.LIVE_BUFFER_TIMEOUT / 10)  # Nothing new to show
+            if cv2.waitKey(1) & 0xFF == ord("q"):
+                self.stop()
+                break
+        cv2.destroyAllWindows()
+        cv2.waitKey(1)
+
+    def _notify_frame(self, camera_id):
+        """
+        Marks a camera as having a frame waiting for detection.
+        A camera is queued at most once until its frame is processed, so a fast camera
+        cannot crowd out the others and its frames are never detected out of order.
+
+        @param camera_id (str): The camera ID
+        """
+        with self.lock:
+            if camera_id in self.pending:
+                return
+            self.pending.add(camera_id)
+        self.ready_queue.put(camera_id)
+
+    def _detection_loop(self):
+        """
+        Detection loop that processes the waiting frames of all cameras
+        """
+        while self.running.is_set():
+            try:
+                camera_id = self.ready_queue.get(timeout=config.LIVE_BUFFER_TIMEOUT)
+            except queue.Empty:
+                continue
+            with self.lock:
+                worker = self.workers.get(camera_id)
+            if worker is None:  # The camera was removed
+                continue
+            frame = worker.input_buffer.get(timeout=0)
+            if frame is not None:
+                detections = []
+                tracker = worker.tracker
+                try:
+                    if tracker is not None and not tracker.should_detect():
+                        detections = tracker.predict(time.time())
+                    elif worker.motion_gate is None or worker.motion_gate.should_detect(
+                        frame
+                    ):
+                        detections, _ = self.object_detector.detect_objects(
+                            frame, camera_id, config.OUT_LIVE_DIR
+                        )
+                        if tracker is not None:
+                            detections = tracker.update(detections, time.time())
+                    self.object_detector.annotate_frame(frame, detections)
+                    if self.notification_manager is not None and detections:
+                        self.notification_manager.send_detection_alerts(
+                            camera_id, detections
+                        )
+                except Exception as e:
+                    print(f"Camera {camera_id}: Error detecting objects: {str(e)}")
+                if worker.event_recorder is not None:
+                    worker.event_recorder.add_frame(frame, bool(detections))
+                worker.output_buffer.put(frame)
+
+            # Release the camera only now, so each camera is processed by one thread at a time
+            with self.lock:
+                self.pending.discard(camera_id)
+            if worker.input_buffer.stats()["buffered"]:
+                self._notify_frame(camera_id)
@@ -0,0 +1,229 @@
+import multiprocessing
+import queue
+import time
+import cv2
+from camera_manager import BaseCameraManager
+from shared_frame_ring import SharedFrameRing
+from motion_gate import MotionGate
+from camera_reconnector import CameraReconnector
+import config
+
+
+def _capture_process(camera_id, source, descriptor, ready_queue, stop_event):
+    """
+    Capture process that reads frames from a camera into its shared memory ring.
+    Frames are resized to the slot shape if needed, and only the slot index and
+    metadata are sent to the inference processes. A frame is dropped when every
+    slot is still being processed.
+
+    @param camera_id (str): The camera ID
+    @param source (str): The camera index or stream URL
+    @param descriptor (tuple): The description of the camera's shared memory ring
+    @param ready_queue (multiprocessing.Queue): The queue of slots ready for inference
+    @param stop_event (multiprocessing.Event): The event to stop the capture process
+    """
+    ring = SharedFrameRing.attach(descriptor)
+    camera = BaseCameraManager()
+    motion_gate = MotionGate() if config.MOTION_GATE_ENABLED else None
+    height, width = ring.shape[:2]
+    frame_index = 0
+    dropped_count = 0
+    reconnector = CameraReconnector(camera, source, camera_id)
+    try:
+        reconnector.request_reconnect()  # Initial connection
+        while not stop_event.is_set():
+            frame = reconnector.read_frame()
+            if frame is None:  # Keep running while the camera reconnects
+                stop_event.wait(config.CAMERA_IDLE_WAIT_MS / 1000)
+                continue
+            frame_index += 1
+            if motion_gate is not None and not motion_gate.should_detect(frame):
+                continue
+
+            slot = ring.acquire_slot()
+            if slot is None:  # Inference is behind, drop the frame
+                dropped_count += 1
+                continue
+            if frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height))
+            ring.write(slot, frame)
+            ready_queue.put((camera_id, descriptor, slot, frame_index, time.time()))
+    finally:
+        print(f"Camera {camera_id}: Capture stopped. {dropped_count} frames dropped.")
+        ready_queue.cancel_join_thread()  # Do not block exit on undelivered slots
+        reconnector.stop()
+        camera.disconnect_camera()
+        ring.close()
+
+
+def _inference_process(ready_queue, result_queue, stop_event):
+    """
+    Inference process that detects objects in the frames announced on the ready queue.
+    Frames are read in place from the shared memory rings and the slot is released
+    as soon as detection is done. The detections are sent to the result queue.
+
+    @param ready_queue (multiprocessing.Queue): The queue of slots ready for inference
+    @param result_queue (multiprocessing.Queue): The queue of detection results
+    @param stop_event (multiprocessing.Event): The event to stop the inference process
+    """
+    from object_detector import ObjectDetector  # Loaded in the child process only
+
+    object_detector = ObjectDetector()
+    rings = {}  # Shared memory name -> attached ring
+    try:
+        while not stop_event.is_set():
+            try:
+                camera_id, descriptor, slot, frame_index, timestamp = ready_queue.get(
+                    timeout=config.LIVE_BUFFER_TIMEOUT
+                )
+            except queue.Empty:
+                continue
+
+            ring = rings.get(descriptor[0])
+            if ring is None:
+                try:
+                    ring = rings[descriptor[0]] = SharedFrameRing.attach(descriptor)
+                except FileNotFoundError:  # The camera was removed
+                    continue
+            try:
+                detections, output_path = object_detector.detect_objects(
+                    ring.read(slot), camera_id, config.OUT_LIVE_DIR
+                )
+                result_queue.put(
+                    (camera_id, frame_index, timestamp, detections, output_path)
+                )
+            except Exception as e:
+                print(f"Camera {camera_id}: Error detecting objects: {str(e)}")
+            finally:
+                ring.release(slot)
+    finally:
+        object_detector.close()
+        for ring in rings.values():
+            ring.close()
+
+
+class MultiprocessCameraManager:
+    """
+    MultiprocessCameraManager class to stream several cameras with capture and inference in separate processes.
+    Each camera has a capture process that writes frames into its own shared memory ring of
+    fixed-shape slots, and a pool of inference processes reads the slots in place. Only slot
+    indices and metadata go through queues, so frames are never pickled, and capture, decode,
+    and inference do not contend for one interpreter's GIL.
+
+    Attributes:
+    - context (multiprocessing.context.SpawnContext): The multiprocessing context
+    - cameras (dict): The capture processes (camera ID -> (process, stop event, ring))
+    - ready_queue (multiprocessing.Queue): The queue of slots ready for inference
+    - result_queue (multiprocessing.Queue): The queue of detection results
+    - stop_event (multiprocessing.Event): The event to stop the inference processes
+    - inference_processes (list): The inference processes
+
+    Methods:
+    - add_camera(self, camera_id, source): Adds a camera and starts its capture process
+    - remove_camera(self, camera_id): Stops a camera's capture process and frees its ring
+    - get_camera_ids(self): Gets the IDs of the managed cameras
+    - start(self, num_processes): Starts the inference processes
+    - stop(self): Stops all capture and inference processes
+    - get_result(self, timeout): Gets the next detection result
+    """
+
+    def __init__(self):
+        """
+        Initializes the MultiprocessCameraManager with empty queues and no cameras
+        """
+        # Spawn new interpreters, forking a process with running threads is unsafe
+        self.context = multiprocessing.get_context("spawn")
+        self.cameras = {}
+        self.ready_queue = self.context.Queue()
+        self.result_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.inference_processes = []
+
+    def add_camera(self, camera_id, source):
+        """
+        Adds a camera and starts its capture process
+
+        @param camera_id (str): The camera ID
+        @param source (str): The camera index or stream URL
+        """
+        if camera_id in self.cameras:
+            raise ValueError(f"Camera {camera_id} is already added")
+        ring = SharedFrameRing.create(
+            config.LIVE_RING_SLOTS,
+            (config.LIVE_FRAME_HEIGHT, config.LIVE_FRAME_WIDTH, 3),
+        )
+        stop_event = self.context.Event()
+        process = self.context.Process(
+            target=_capture_process,
+            args=(camera_id, source, ring.descriptor(), self.ready_queue, stop_event),
+            daemon=True,
+        )
+        process.start()
+        self.cameras[camera_id] = (process, stop_event, ring)
+
+    def remove_camera(self, camera_id):
+        """
+        Stops a camera's capture process and frees its ring
+
+        @param camera_id (str): The camera ID
+        """
+        camera = self.cameras.pop(camera_id, None)
+        if camera is None:
+            return
+        process, stop_event, ring = camera
+        stop_event.set()
+        process.join()
+        ring.close()
+        ring.unlink()
+
+    def get_camera_ids(self):
+        """
+        Gets the IDs of the managed cameras
+
+        @return (list): A list of camera IDs
+        """
+        return list(self.cameras)
+
+    def start(self, num_processes=config.INFERENCE_PROCESSES):
+        """
+        Starts the inference processes
+
+        @param num_processes (int): The number of inference processes
+        """
+        self.stop_event.clear()
+        self.inference_processes = [
+            self.context.Process(
+                target=_inference_process,
+                args=(self.ready_queue, self.result_queue, self.stop_event),
+                daemon=True,
+            )
+            for _ in range(max(1, num_processes))
+        ]
+        for process in self.inference_processes:
+            process.start()
+
+    def stop(self):
+        """
+        Stops all capture and inference processes
+        """
+        for camera_id in self.get_camera_ids():
+            self.remove_camera(camera_id)
+        self.stop_event.set()
+        for process in self.inference_processes:
+            # Keep reading results, a child cannot exit while its queue data is unread
+            while process.is_alive():
+                self.get_result(timeout=0.1)
+            process.join()
+        self.inference_processes = []
+
+    def get_result(self, timeout=None):
+        """
+        Gets the next detection result
+
+        @param timeout (float): The maximum number of seconds to wait (None to wait forever)
+        @return (tuple): A (camera_id, frame_index, timestamp, detections, output_path) tuple, or None on timeout
+        """
+        try:
+            return self.result_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
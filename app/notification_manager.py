@@ -1,24 +1,45 @@
-import os
-
+from datetime import datetime
+from alert_outbox import AlertOutbox
+from alert_suppressor import AlertSuppressor
 from email_sender import EmailSender
 from sms_sender import SmsSender
 from recipient_manager import RecipientManager
 import config
+import threading
 
 
 class NotificationManager:
     """
-    NotificationManager class to send notifications to recipients via email or SMS
+    NotificationManager class to send notifications to recipients via email or SMS.
+    Notifications are queued in the alert outbox, which delivers them in the background with retries
+    and per-channel rate limits, so a scan does not wait for SendGrid or Twilio. All email recipients
+    get the same message in one request, and every SMS message is queued on its own.
+
+    Live detections (with LIVE_ALERTS_ENABLED) go through the alert suppressor, so an object that
+    stays in frame is alerted once per cooldown, and the detections suppressed meanwhile are sent
+    as a digest when the cooldown ends. A background thread checks for ended cooldowns.
 
     Attributes:
     - email_sender (EmailSender): The email sender to send emails
     - sms_sender (SmsSender): The SMS sender to send SMS messages
     - recipient_manager (RecipientManager): The recipient manager to get the list of recipients
+    - outbox (AlertOutbox): The outbox that delivers the notifications
+    - suppressor (AlertSuppressor): The suppressor of repeated live detection alerts
+    - stop_event (threading.Event): The event to stop the digest thread
+    - digest_thread (threading.Thread): The thread that sends the digests of ended cooldowns
 
     Methods:
     - read_report_content(report_path): Reads the content of the report file
     - format_content_as_html(content, report_content): Formats the content and report as HTML
-    - send_notifications(report_path): Sends notifications to recipients with the report attached
+    - send_notifications(report_path): Queues notifications to recipients with the report attached
+    - send_detection_alerts(camera_id, detections): Queues an alert for the live detections that are not suppressed
+    - send_digests(now): Queues a digest of the detections suppressed during the ended cooldowns
+    - get_delivery_metrics(): Gets the queue depth and delivery latency of the notifications
+    - close(): Stops the delivery of notifications
+    - _enqueue(subject, html_content, text_content): Queues a notification to all recipients
+    - _run_digests(): Sends the digests of the ended cooldowns until the manager is closed
+    - _send_email(recipients, subject, content): Sends a queued email
+    - _send_sms(recipients, subject, content): Sends a queued SMS message
     """
 
     def __init__(self):
@@ -32,6 +53,12 @@ class NotificationManager:
         self.email_sender = EmailSender()
         self.sms_sender = SmsSender()
         self.recipient_manager = RecipientManager(config.RECIPIENTS_FILE)
+        self.outbox = AlertOutbox({"email": self._send_email, "sms": self._send_sms})
+        self.outbox.start()
+        self.suppressor = AlertSuppressor()
+        self.stop_event = threading.Event()
+        self.digest_thread = threading.Thread(target=self._run_digests, daemon=True)
+        self.digest_thread.start()
 
     def read_report_content(self, report_path):
         """
@@ -60,7 +87,8 @@ class NotificationManager:
 
     def send_notifications(self, report_path):
         """
-        Sends notifications to recipients with the report attached
+        Queues notifications to recipients with the report attached, and returns without waiting
+        for them to be sent
 
         @param report_path (str): The path of the report file
         """
@@ -73,10 +101,147 @@ class NotificationManager:
             return
 
         html_content = self.format_content_as_html(content, report_content)
+        self._enqueue(subject, html_content, report_content)
+
+    def send_detection_alerts(self, camera_id, detections):
+        """
+        Queues an alert for the live detections of a frame that are not suppressed, and returns
+        without waiting for it to be sent. Nothing is queued if every detection is suppressed.
+        Errors are printed instead of raised, so a notification failure never stops a live stream.
+
+        @param camera_id (str): The camera ID
+        @param detections (list): A list of dictionaries containing the detected objects
+        @return (int): The number of detections alerted
+        """
+        try:
+            alerted = [
+                detection
+                for detection in detections
+                if self.suppressor.check(
+                    camera_id, detection["label"], detection.get("track_id")
+                )
+            ]
+            if not alerted:
+                return 0
+
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            content = "\n".join(
+                f"{timestamp} Camera {camera_id}: {detection['label']} detected "
+                f"(confidence {detection['confidence']:.2f})"
+                for detection in alerted
+            )
+            html_content = self.format_content_as_html("Objects detected.", content)
+            self._enqueue("Airport Monitoring Alert", html_content, content)
+            return len(alerted)
+        except Exception as e:
+            print(f"Camera {camera_id}: Error sending detection alert: {str(e)}")
+            return 0
+
+    def send_digests(self, now=None):
+        """
+        Queues one digest of the detections suppressed during the cooldowns that have ended
 
-        recipients = self.recipient_manager.get_recipients()
-        for recipient in recipients:
-            if "@" in recipient:
-                self.email_sender.send_email(subject, html_content, recipient)
-            else:
-                self.sms_sender.send_sms(report_content, recipient)
+        @param now (float): The current time (current time if None)
+        @return (int): The number of digest entries sent
+        """
+        digests = self.suppressor.pop_digests(now)
+        if not digests:
+            return 0
+
+        def format_time(timestamp):
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+        content = "\n".join(
+            f"Camera {digest['camera_id']}: {digest['label']}"
+            + (
+                f" (track {digest['track_id']})"
+                if digest["track_id"] is not None
+                else ""
+            )
+            + f" detected {digest['suppressed']} more times from "
+            f"{format_time(digest['first_seen'])} to {format_time(digest['last_seen'])}"
+            for digest in digests
+        )
+        html_content = self.format_content_as_html(
+            "Detections suppressed since the last alerts.", content
+        )
+        self._enqueue("Airport Monitoring Alert Digest", html_content, content)
+        return len(digests)
+
+    def get_delivery_metrics(self, window_seconds=3600):
+        """
+        Gets the queue depth and delivery latency of the notifications
+
+        @param window_seconds (float): The period to compute the latency over, in seconds
+        @return (dict): The delivery metrics of the alert outbox
+        """
+        return self.outbox.get_metrics(window_seconds)
+
+    def close(self):
+        """
+        Stops the delivery of notifications, after queueing the digests of the cooldowns still open.
+        Notifications not sent yet are sent on the next start.
+        """
+        self.stop_event.set()
+        self.digest_thread.join()
+        self.send_digests(float("inf"))
+        self.outbox.close()
+
+    def _enqueue(self, subject, html_content, text_content):
+        """
+        Queues a notification to all recipients: the HTML content by email, and the text content by SMS
+
+        @param subject (str): The subject of the notification
+        @param html_content (str): The content of the email
+        @param text_content (str): The content of the SMS messages
+        """
+        recipients = [
+            recipient
+            for recipient in self.recipient_manager.get_recipients()
+            if recipient.strip()
+        ]
+        emails = [recipient for recipient in recipients if "@" in recipient]
+        phone_numbers = [recipient for recipient in recipients if "@" not in recipient]
+
+        # One email per request batch, so a retry only resends the batch that failed
+        batch_size = self.email_sender.MAX_PERSONALIZATIONS
+        for start in range(0, len(emails), batch_size):
+            self.outbox.enqueue(
+                "email", emails[start : start + batch_size], subject, html_content
+            )
+        for phone_number in phone_numbers:
+            self.outbox.enqueue("sms", [phone_number], subject, text_content)
+
+    def _run_digests(self):
+        """
+        Sends the digests of the ended cooldowns until the manager is closed
+        """
+        while not self.stop_event.wait(config.ALERT_POLL_SECONDS):
+            try:
+                self.send_digests()
+            except Exception as e:
+                print(f"Error sending alert digest: {str(e)}")
+
+    def _send_email(self, recipients, subject, content):
+        """
+        Sends a queued email
+
+        @param recipients (list): The email addresses of the recipients
+        @param subject (str): The subject of the email
+        @param content (str): The content of the email
+        @return (bool): True if the email was sent, False otherwise
+        """
+        return self.email_sender.send_email_batch(subject, content, recipients)
+
+    def _send_sms(self, recipients, subject, content):
+        """
+        Sends a queued SMS message. SMS messages have no subject.
+
+        @param recipients (list): The phone number of the recipient
+        @param subject (str): The subject of the notification (unused)
+        @param content (str): The content of the SMS message
+        @return (bool): True if the SMS message was sent, False otherwise
+        """
+        return all(
+            self.sms_sender.send_sms(content, recipient) for recipient in recipients
+        )
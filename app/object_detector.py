@@ -1,5 +1,10 @@
-from roboflow import Roboflow
+from detector_backend import DetectorBackendFactory
+from frame_cache import FrameCache
+from prediction_cache import PredictionCache
+from frame_writer import AsyncFrameWriter
+from concurrent.futures import ThreadPoolExecutor
 import cv2
+import numpy as np
 import os
 import config
 from datetime import datetime
@@ -7,26 +12,67 @@ from datetime import datetime
 
 class ObjectDetector:
     """
-    ObjectDetector class to detect objects in a frame using Roboflow
+    ObjectDetector class to detect objects in a frame using the configured detector backend
 
     Attributes:
-    - model (Model): The Roboflow model to detect objects in a frame
+    - backend (DetectorBackend): The backend (Roboflow or ONNX) to detect objects in a frame
+    - frame_cache (FrameCache): The cache of detections for near-duplicate frames (None if disabled)
+    - prediction_cache (PredictionCache): The persistent cache of predictions per frame content (None if not used)
+    - model_id (str): The ID of the model, for keying the persistent cache (None if not used)
+    - frame_writer (AsyncFrameWriter): The background writer for output images (None to write synchronously)
+    - tiled (bool): Whether to detect objects in overlapping tiles instead of the whole frame
+    - tile_executor (ThreadPoolExecutor): The executor that runs the tiles concurrently (None if not tiled)
 
     Methods:
     - detect_objects(frame, camera_id, media_out): Detects objects in the given frame and saves the output image
+    - detect_objects_batch(frames, camera_id, media_out): Detects objects in several frames with one backend call
+    - predict_objects_batch(frames, camera_id): Detects objects in several frames with one backend call, without saving them
+    - save_frame(frame, detections, camera_id, media_out): Annotates a copy of the frame and saves it as an output image
+    - annotate_frame(frame, detections): Draws the bounding boxes and labels of the detections on the frame
+    - flush(): Blocks until all output images are written
+    - close(): Writes the pending output images and stops the background writer
     - generate_output_path(camera_id, media_type): Generates the output path based on the camera ID and media type
-    - _load_model(): Loads the Roboflow model for object detection
+    - _predict_batch(frames): Gets the detections of the frames from the cache or the backend
+    - _predict_cached(frames): Gets the detections of the frames from the persistent cache or the backend
+    - _prediction_params(): Gets the model ID and prediction parameters that key the persistent cache
+    - _predict_frames(frames): Gets the detections of the frames from the backend, whole or in tiles
+    - _predict_tiled(frame): Detects objects in overlapping tiles of the frame and merges the detections
+    - tile_origins(frame_shape, tile_size, overlap): Computes the top-left corners of the overlapping tiles
+    - merge_detections(detections, overlap): Merges overlapping detections of the same label with non-maximum suppression
     """
 
-    def __init__(self):
+    def __init__(
+        self, backend=None, tiled=config.TILED_INFERENCE, prediction_cache=None
+    ):
         """
-        Initializes the ObjectDetector with the Roboflow model
+        Initializes the ObjectDetector with the given backend, or the configured backend if None.
+        In replay mode of the prediction cache, no backend is created.
+
+        @param backend (DetectorBackend): The backend to detect objects in a frame
+        @param tiled (bool): Whether to detect objects in overlapping tiles instead of the whole frame
+        @param prediction_cache (PredictionCache): The persistent cache of predictions, or None
         """
-        self.model = self._load_model()
+        replay = prediction_cache is not None and prediction_cache.replay
+        self.backend = backend or (
+            None if replay else DetectorBackendFactory.create_backend()
+        )
+        self.frame_cache = FrameCache() if config.FRAME_CACHE_ENABLED else None
+        self.prediction_cache = prediction_cache
+        self.model_id = (
+            DetectorBackendFactory.get_model_id()
+            if prediction_cache is not None
+            else None
+        )
+        self.frame_writer = AsyncFrameWriter() if config.FRAME_WRITER_ASYNC else None
+        self.tiled = tiled
+        self.tile_executor = (
+            ThreadPoolExecutor(max_workers=config.TILE_WORKERS) if tiled else None
+        )
 
     def detect_objects(self, frame, camera_id, media_out):
         """
-        Detects objects in the given frame and saves the output image
+        Detects objects in the given frame and saves the annotated output image.
+        The frame itself is not modified; use annotate_frame to draw the detections on it.
 
         @param frame (numpy.ndarray): The frame to detect objects in
         @param camera_id (int): The camera ID to use for saving the output image
@@ -34,28 +80,49 @@ class ObjectDetector:
         @return (list): A list of dictionaries containing the detected objects
         """
         print(f"Camera {camera_id}: Detecting objects...")
-        detections = []  # List to store the detected objects
-        predictions = self.model.predict(frame, confidence=40, overlap=30).json()[
-            "predictions"
-        ]
+        detections = self._predict_batch([frame])[0]
+        return detections, self.save_frame(frame, detections, camera_id, media_out)
 
-        # Process each prediction
-        for prediction in predictions:
-            x, y, w, h = map(
-                int,
-                (
-                    prediction["x"],
-                    prediction["y"],
-                    prediction["width"],
-                    prediction["height"],
-                ),
-            )
-            label = prediction["class"]
-            confidence = prediction["confidence"]
-            detections.append(
-                {"bbox": (x, y, w, h), "label": label, "confidence": confidence}
-            )
-            # Draw bounding box and label on the frame
+    def detect_objects_batch(self, frames, camera_id, media_out):
+        """
+        Detects objects in several frames with one backend call and saves the output images
+
+        @param frames (list): The frames to detect objects in
+        @param camera_id (int): The camera ID to use for saving the output images
+        @param media_out (str): The type of media output (image, video, or live)
+        @return (list): A list of (detections, output_path) tuples, in the same order as the frames
+        """
+        batch_detections = self.predict_objects_batch(frames, camera_id)
+
+        results = []
+        for frame, detections in zip(frames, batch_detections):
+            output_path = self.save_frame(frame, detections, camera_id, media_out)
+            results.append((detections, output_path))
+        return results
+
+    def predict_objects_batch(self, frames, camera_id):
+        """
+        Detects objects in several frames with one backend call, without saving the output images,
+        so a failed batch can be retried before any of its frames is saved
+
+        @param frames (list): The frames to detect objects in
+        @param camera_id (int): The camera ID, for the progress message
+        @return (list): A list of detection lists, in the same order as the frames
+        """
+        print(f"Camera {camera_id}: Detecting objects in {len(frames)} frames...")
+        return self._predict_batch(frames)
+
+    def annotate_frame(self, frame, detections):
+        """
+        Draws the bounding boxes and labels of the detections on the frame
+
+        @param frame (numpy.ndarray): The frame to draw on
+        @param detections (list): A list of dictionaries containing the detected objects
+        """
+        for detection in detections:
+            x, y, w, h = detection["bbox"]
+            label = detection["label"]
+            confidence = detection["confidence"]
             cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
             cv2.putText(
                 frame,
@@ -67,10 +134,21 @@ class ObjectDetector:
                 2,
             )
 
-        # Generate output path based on media type
-        output_path = self.generate_output_path(camera_id, media_out)
-        cv2.imwrite(output_path, frame)
-        return detections, output_path
+    def flush(self):
+        """
+        Blocks until all output images are written
+        """
+        if self.frame_writer is not None:
+            self.frame_writer.flush()
+
+    def close(self):
+        """
+        Writes the pending output images and stops the background writer and the tile executor
+        """
+        if self.frame_writer is not None:
+            self.frame_writer.close()
+        if self.tile_executor is not None:
+            self.tile_executor.shutdown(wait=True)
 
     def generate_output_path(self, camera_id, media_type):
         """
@@ -91,16 +169,215 @@ class ObjectDetector:
             raise ValueError("Invalid media type")
 
         os.makedirs(output_dir, exist_ok=True)
-        filename = datetime.now().strftime("%Y%m%d_%H%M%S") + ".jpg"
+        filename = datetime.now().strftime("%Y%m%d_%H%M%S_%f") + ".jpg"
         return os.path.join(output_dir, filename)
 
-    def _load_model(self):
+    def _predict_batch(self, frames):
+        """
+        Gets the detections of the frames from the cache, and sends only the cache misses to the backend
+
+        @param frames (list): The frames to detect objects in
+        @return (list): A list of detection lists, in the same order as the frames
+        """
+        if self.frame_cache is None:
+            return self._predict_cached(frames)
+
+        results = [None] * len(frames)
+        hashes = [FrameCache.compute_hash(frame) for frame in frames]
+        misses = []
+        for i, frame in enumerate(frames):
+            results[i] = self.frame_cache.get(hashes[i], frame.shape)
+            if results[i] is None:
+                misses.append(i)
+
+        # Near-duplicate misses within the batch are sent to the backend only once
+        unique, duplicates = [], {}
+        for i in misses:
+            for j in unique:
+                if (
+                    frames[i].shape == frames[j].shape
+                    and FrameCache.hamming_distance(hashes[i], hashes[j])
+                    <= self.frame_cache.tolerance
+                ):
+                    duplicates[i] = j
+                    break
+            else:
+                unique.append(i)
+
+        if unique:
+            predictions = self._predict_cached([frames[i] for i in unique])
+            for i, detections in zip(unique, predictions):
+                self.frame_cache.put(hashes[i], frames[i].shape, detections)
+                results[i] = detections
+        for i, j in duplicates.items():
+            results[i] = [dict(detection) for detection in results[j]]
+        return results
+
+    def _predict_cached(self, frames):
+        """
+        Gets the detections of the frames from the persistent cache, and sends only the cache misses
+        to the backend. In replay mode, a miss is an error and the backend is never called.
+
+        @param frames (list): The frames to detect objects in
+        @return (list): A list of detection lists, in the same order as the frames
+        """
+        if self.prediction_cache is None:
+            return self._predict_frames(frames)
+
+        params = self._prediction_params()
+        keys = [PredictionCache.compute_key(frame, params) for frame in frames]
+        results = self.prediction_cache.get_many(keys)
+        misses = [i for i, detections in enumerate(results) if detections is None]
+        if misses:
+            if self.prediction_cache.replay:
+                raise Exception(
+                    f"{len(misses)} frames not found in the prediction cache (replay mode)"
+                )
+            predictions = self._predict_frames([frames[i] for i in misses])
+            for i, detections in zip(misses, predictions):
+                results[i] = detections
+            self.prediction_cache.put_many([(keys[i], results[i]) for i in misses])
+        return results
+
+    def _prediction_params(self):
         """
-        Loads the Roboflow model for object detection
+        Gets the model ID and the prediction parameters that key the persistent cache.
+        Tiled and full-frame predictions of the same frame are cached separately.
 
-        @return (Model): The Roboflow model for object detection
+        @return (str): The model ID and prediction parameters
         """
-        rf = Roboflow(api_key=config.ROBOFLOW_API_KEY)
-        project = rf.workspace().project(config.ROBOFLOW_PROJECT)
-        model = project.version(config.ROBOFLOW_MODEL).model
-        return model
+        tiling = (
+            f"tiles={config.TILE_SIZE},{config.TILE_OVERLAP},{config.TILE_FULL_FRAME}"
+            if self.tiled
+            else "full"
+        )
+        return (
+            f"{self.model_id}|confidence={config.DETECTION_CONFIDENCE}"
+            f"|overlap={config.DETECTION_OVERLAP}|{tiling}"
+        )
+
+    def _predict_frames(self, frames):
+        """
+        Gets the detections of the frames from the backend, whole or in tiles
+
+        @param frames (list): The frames to detect objects in
+        @return (list): A list of detection lists, in the same order as the frames
+        """
+        if not self.tiled:
+            return self.backend.predict_batch(
+                frames, config.DETECTION_CONFIDENCE, config.DETECTION_OVERLAP
+            )
+        return [self._predict_tiled(frame) for frame in frames]
+
+    def _predict_tiled(self, frame):
+        """
+        Detects objects in overlapping tiles of the frame, so small objects keep their full resolution.
+        The tiles are sent to the backend in batches that run concurrently, the tile boxes are
+        moved back to frame coordinates, and duplicates from the overlaps are merged.
+        The whole frame is also detected, if configured, for objects larger than a tile.
+
+        @param frame (numpy.ndarray): The frame to detect objects in
+        @return (list): A list of dictionaries containing the detected objects
+        """
+        origins = self.tile_origins(frame.shape, config.TILE_SIZE, config.TILE_OVERLAP)
+        tiles = [
+            frame[y : y + config.TILE_SIZE, x : x + config.TILE_SIZE]
+            for x, y in origins
+        ]
+        if config.TILE_FULL_FRAME and len(tiles) > 1:
+            origins.append((0, 0))
+            tiles.append(frame)
+
+        batch_size = max(1, config.TILE_BATCH_SIZE)
+        batches = [
+            tiles[start : start + batch_size]
+            for start in range(0, len(tiles), batch_size)
+        ]
+        batch_results = self.tile_executor.map(
+            lambda batch: self.backend.predict_batch(
+                batch, config.DETECTION_CONFIDENCE, config.DETECTION_OVERLAP
+            ),
+            batches,
+        )
+
+        detections = []
+        tile_results = (result for results in batch_results for result in results)
+        for (x, y), tile_detections in zip(origins, tile_results):
+            for detection in tile_detections:
+                bx, by, bw, bh = detection["bbox"]
+                detections.append(dict(detection, bbox=(bx + x, by + y, bw, bh)))
+        return self.merge_detections(detections, config.DETECTION_OVERLAP)
+
+    @staticmethod
+    def tile_origins(frame_shape, tile_size, overlap):
+        """
+        Computes the top-left corners of the overlapping tiles that cover the frame.
+        The last tile of each row and column is aligned with the frame edge.
+
+        @param frame_shape (tuple): The shape of the frame
+        @param tile_size (int): The width and height of a tile, in pixels
+        @param overlap (float): The fraction of a tile that overlaps the next tile (0-1)
+        @return (list): A list of (x, y) tile origins
+        """
+        height, width = frame_shape[:2]
+        step = max(1, int(tile_size * (1 - overlap)))
+
+        def starts(length):
+            if length <= tile_size:
+                return [0]
+            positions = list(range(0, length - tile_size, step))
+            return positions + [length - tile_size]
+
+        return [(x, y) for y in starts(height) for x in starts(width)]
+
+    @staticmethod
+    def merge_detections(detections, overlap):
+        """
+        Merges overlapping detections of the same label with non-maximum suppression
+
+        @param detections (list): A list of dictionaries containing the detected objects
+        @param overlap (int): The maximum overlap between detections of the same label (0-100)
+        @return (list): The detections that were kept
+        """
+        if len(detections) < 2:
+            return detections
+        labels = sorted({detection["label"] for detection in detections})
+        class_ids = [labels.index(detection["label"]) for detection in detections]
+        boxes = np.array([detection["bbox"] for detection in detections], dtype=float)
+        # Non-maximum suppression expects (left, top, width, height) boxes
+        boxes[:, :2] -= boxes[:, 2:] / 2
+        indices = cv2.dnn.NMSBoxesBatched(
+            boxes.tolist(),
+            [float(detection["confidence"]) for detection in detections],
+            class_ids,
+            0.0,
+            overlap / 100.0,
+        )
+        return [detections[i] for i in np.array(indices).flatten()]
+
+    def save_frame(self, frame, detections, camera_id, media_out):
+        """
+        Annotates a copy of the frame and saves it to the output directory of the given media type.
+        With the background writer, the write is queued and the output path is returned without waiting.
+
+        @param frame (numpy.ndarray): The frame to save
+        @param detections (list): The detections to draw on the saved image
+        @param camera_id (int): The camera ID to use for saving the output image
+        @param media_out (str): The type of media output (image, video, or live)
+        @return (str): The output path of the saved image
+        """
+        output_path = self.generate_output_path(camera_id, media_out)
+        if self.frame_writer is not None:
+            # Live frames may be dropped under load, scan frames wait for room in the queue
+            self.frame_writer.submit(
+                frame,
+                detections,
+                output_path,
+                self.annotate_frame,
+                block=media_out != config.OUT_LIVE_DIR,
+            )
+        else:
+            annotated = frame.copy()
+            self.annotate_frame(annotated, detections)
+            cv2.imwrite(output_path, annotated)
+        return output_path
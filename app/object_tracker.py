@@ -0,0 +1,305 @@
+import itertools
+import config
+
+
+class Track:
+    """
+    Track class to hold the state of one tracked object
+
+    Attributes:
+    - track_id (int): The track ID, unique within its tracker
+    - label (str): The label of the object
+    - bbox (tuple): The last detected bounding box (x, y, w, h), with x and y at the center
+    - confidence (float): The confidence of the last detection
+    - best_bbox (tuple): The bounding box of the most confident detection
+    - best_confidence (float): The confidence of the most confident detection
+    - velocity (tuple): The smoothed velocity of the box center (vx, vy), in pixels per second
+    - first_seen (float): The timestamp of the first detection
+    - last_seen (float): The timestamp of the last detection
+    - hits (int): The number of detections matched to the track
+    - misses (int): The number of consecutive updates without a matching detection
+
+    Methods:
+    - predict_bbox(self, timestamp): Predicts the bounding box at the given time with constant velocity
+    - update(self, detection, timestamp): Updates the track with a matching detection
+    """
+
+    def __init__(self, track_id, detection, timestamp):
+        """
+        Initializes the Track with its first detection
+
+        @param track_id (int): The track ID
+        @param detection (dict): The first detection of the object
+        @param timestamp (float): The timestamp of the detection
+        """
+        self.track_id = track_id
+        self.label = detection["label"]
+        self.bbox = tuple(detection["bbox"])
+        self.confidence = detection["confidence"]
+        self.best_bbox = self.bbox
+        self.best_confidence = self.confidence
+        self.velocity = (0.0, 0.0)
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.hits = 1
+        self.misses = 0
+
+    def predict_bbox(self, timestamp):
+        """
+        Predicts the bounding box at the given time, moving the last box at constant velocity
+
+        @param timestamp (float): The time to predict the box at
+        @return (tuple): The predicted bounding box (x, y, w, h), in whole pixels like the detected boxes
+        """
+        x, y, w, h = self.bbox
+        dt = timestamp - self.last_seen
+        return (
+            int(round(x + self.velocity[0] * dt)),
+            int(round(y + self.velocity[1] * dt)),
+            int(round(w)),
+            int(round(h)),
+        )
+
+    def update(self, detection, timestamp):
+        """
+        Updates the track with a matching detection
+
+        @param detection (dict): The matching detection
+        @param timestamp (float): The timestamp of the detection
+        """
+        bbox = tuple(detection["bbox"])
+        dt = timestamp - self.last_seen
+        if dt > 0:
+            vx = (bbox[0] - self.bbox[0]) / dt
+            vy = (bbox[1] - self.bbox[1]) / dt
+            if self.hits == 1:
+                self.velocity = (vx, vy)
+            else:  # Smooth out the jitter of the detected boxes
+                self.velocity = (
+                    (self.velocity[0] + vx) / 2,
+                    (self.velocity[1] + vy) / 2,
+                )
+        self.bbox = bbox
+        self.confidence = detection["confidence"]
+        if self.confidence > self.best_confidence:
+            self.best_bbox = bbox
+            self.best_confidence = self.confidence
+        self.last_seen = max(self.last_seen, timestamp)
+        self.hits += 1
+        self.misses = 0
+
+
+class ObjectTracker:
+    """
+    ObjectTracker class to follow detected objects across frames and report each object once.
+    Detections are matched to the tracks of the same label by IoU, falling back to the distance
+    between box centers for small or fast objects. Matched detections get the stable track ID of
+    their track, unmatched detections start new tracks, and tracks that miss too many updates end.
+
+    Between two detector runs, predict moves the boxes of the tracks at constant velocity,
+    so the detector only needs to run every Nth frame.
+
+    Attributes:
+    - iou_threshold (float): The minimum IoU to match a detection to a track
+    - max_distance (float): The maximum center distance to match a detection to a track, relative to the track's box size
+    - max_missed (int): The number of updates a track can miss before it ends
+    - min_hits (int): The minimum number of detections for a track to be reported as an object
+    - detect_every_n (int): Run the detector on one frame out of every N
+    - keep_finished (bool): Whether to keep the ended tracks for get_objects (False for live streams)
+    - tracks (list): The active tracks
+    - finished_tracks (list): The tracks that have ended
+    - frame_count (int): The number of frames seen by should_detect
+    - track_ids (itertools.count): The generator of track IDs
+
+    Methods:
+    - should_detect(self): Checks if the detector should run on the next frame
+    - update(self, detections, timestamp): Matches the detections of a frame to the tracks
+    - predict(self, timestamp): Predicts the detections of a frame the detector did not run on
+    - get_objects(self): Gets the unique objects seen so far
+    - pop_finished_objects(self): Gets the objects of the ended tracks and forgets them
+    - iou(bbox_a, bbox_b): Computes the intersection over union of two bounding boxes
+    - _match(self, detections, timestamp): Matches the detections to the active tracks
+    - _to_objects(self, tracks): Converts tracks to object dicts, in order of first appearance
+    """
+
+    def __init__(
+        self,
+        iou_threshold=config.TRACKER_IOU_THRESHOLD,
+        max_distance=config.TRACKER_MAX_DISTANCE,
+        max_missed=config.TRACKER_MAX_MISSED,
+        min_hits=config.TRACKER_MIN_HITS,
+        detect_every_n=config.TRACKING_DETECT_EVERY_N,
+        keep_finished=True,
+    ):
+        """
+        Initializes the ObjectTracker with the given matching settings
+
+        @param iou_threshold (float): The minimum IoU to match a detection to a track
+        @param max_distance (float): The maximum center distance to match a detection to a track, relative to the track's box size
+        @param max_missed (int): The number of updates a track can miss before it ends
+        @param min_hits (int): The minimum number of detections for a track to be reported as an object
+        @param detect_every_n (int): Run the detector on one frame out of every N
+        @param keep_finished (bool): Whether to keep the ended tracks for get_objects (False for live streams)
+        """
+        self.iou_threshold = iou_threshold
+        self.max_distance = max_distance
+        self.max_missed = max_missed
+        self.min_hits = max(1, min_hits)
+        self.detect_every_n = max(1, detect_every_n)
+        self.keep_finished = keep_finished
+        self.tracks = []
+        self.finished_tracks = []
+        self.frame_count = 0
+        self.track_ids = itertools.count(1)
+
+    def should_detect(self):
+        """
+        Checks if the detector should run on the next frame, counting the frame
+
+        @return (bool): True on one frame out of every detect_every_n, False otherwise
+        """
+        detect = self.frame_count % self.detect_every_n == 0
+        self.frame_count += 1
+        return detect
+
+    def update(self, detections, timestamp):
+        """
+        Matches the detections of a frame to the tracks and assigns their track IDs
+
+        @param detections (list): A list of dictionaries containing the detected objects
+        @param timestamp (float): The timestamp of the frame, in seconds
+        @return (list): The detections, each with the track_id of its track
+        """
+        matches = self._match(detections, timestamp)
+        tracked = []
+        updated_ids = set()
+        for index, detection in enumerate(detections):
+            track = matches.get(index)
+            if track is None:
+                track = Track(next(self.track_ids), detection, timestamp)
+                self.tracks.append(track)
+            else:
+                track.update(detection, timestamp)
+            updated_ids.add(track.track_id)
+            tracked.append(dict(detection, track_id=track.track_id))
+
+        active_tracks = []
+        for track in self.tracks:
+            if track.track_id not in updated_ids:
+                track.misses += 1
+            if track.misses > self.max_missed:
+                if self.keep_finished:
+                    self.finished_tracks.append(track)
+            else:
+                active_tracks.append(track)
+        self.tracks = active_tracks
+        return tracked
+
+    def predict(self, timestamp):
+        """
+        Predicts the detections of a frame the detector did not run on, by moving the
+        boxes of the active tracks at constant velocity
+
+        @param timestamp (float): The timestamp of the frame, in seconds
+        @return (list): The predicted detections, with their track_id
+        """
+        return [
+            {
+                "label": track.label,
+                "confidence": track.confidence,
+                "bbox": track.predict_bbox(timestamp),
+                "track_id": track.track_id,
+            }
+            for track in self.tracks
+            if track.misses == 0
+        ]
+
+    def get_objects(self):
+        """
+        Gets the unique objects seen so far, one per track, in order of first appearance
+
+        @return (list): A list of dictionaries with the label, best confidence and bounding box,
+            track_id, first_seen and last_seen timestamps, and the number of frames of each object
+        """
+        return self._to_objects(self.finished_tracks + self.tracks)
+
+    def pop_finished_objects(self):
+        """
+        Gets the objects of the tracks that have ended and forgets them, so a long scan can
+        write its objects out as they end instead of keeping every track until the end
+
+        @return (list): A list of object dictionaries, as returned by get_objects
+        """
+        finished_tracks, self.finished_tracks = self.finished_tracks, []
+        return self._to_objects(finished_tracks)
+
+    def _to_objects(self, tracks):
+        """
+        Converts tracks to object dicts, in order of first appearance, leaving out the tracks
+        with fewer than min_hits detections
+
+        @param tracks (list): The tracks to convert
+        @return (list): A list of object dictionaries
+        """
+        tracks = sorted(tracks, key=lambda track: (track.first_seen, track.track_id))
+        return [
+            {
+                "label": track.label,
+                "confidence": track.best_confidence,
+                "bbox": track.best_bbox,
+                "track_id": track.track_id,
+                "first_seen": track.first_seen,
+                "last_seen": track.last_seen,
+                "frames": track.hits,
+            }
+            for track in tracks
+            if track.hits >= self.min_hits
+        ]
+
+    @staticmethod
+    def iou(bbox_a, bbox_b):
+        """
+        Computes the intersection over union of two bounding boxes
+
+        @param bbox_a (tuple): The first bounding box (x, y, w, h), with x and y at the center
+        @param bbox_b (tuple): The second bounding box (x, y, w, h), with x and y at the center
+        @return (float): The IoU, between 0 and 1
+        """
+        ax, ay, aw, ah = bbox_a
+        bx, by, bw, bh = bbox_b
+        overlap_w = min(ax + aw / 2, bx + bw / 2) - max(ax - aw / 2, bx - bw / 2)
+        overlap_h = min(ay + ah / 2, by + bh / 2) - max(ay - ah / 2, by - bh / 2)
+        if overlap_w <= 0 or overlap_h <= 0:
+            return 0.0
+        intersection = overlap_w * overlap_h
+        return intersection / (aw * ah + bw * bh - intersection)
+
+    def _match(self, detections, timestamp):
+        """
+        Matches the detections to the active tracks of the same label.
+        Candidate pairs are assigned greedily, best IoU first, then closest center first.
+
+        @param detections (list): A list of dictionaries containing the detected objects
+        @param timestamp (float): The timestamp of the frame, in seconds
+        @return (dict): The matched track per detection index
+        """
+        candidates = []
+        for track_index, track in enumerate(self.tracks):
+            px, py, pw, ph = track.predict_bbox(timestamp)
+            for index, detection in enumerate(detections):
+                if detection["label"] != track.label:
+                    continue
+                x, y, w, h = detection["bbox"]
+                iou = self.iou((px, py, pw, ph), (x, y, w, h))
+                distance = ((x - px) ** 2 + (y - py) ** 2) ** 0.5 / max(pw, ph, 1)
+                if iou >= self.iou_threshold or distance <= self.max_distance:
+                    candidates.append((-iou, distance, track_index, index))
+
+        matches = {}
+        matched_tracks = set()
+        for _, _, track_index, index in sorted(candidates):
+            if index in matches or track_index in matched_tracks:
+                continue
+            matches[index] = self.tracks[track_index]
+            matched_tracks.add(track_index)
+        return matches
@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import config
+
+
+class PredictionCache:
+    """
+    PredictionCache class to keep the predictions of the detector on disk, so re-scans of the same
+    files do not pay for the same inference again.
+
+    Predictions are keyed by a content hash of the frame bytes together with the model ID and the
+    prediction parameters (confidence, overlap, tiling), so a frame is only a hit when the same
+    model would see exactly the same pixels with the same settings. Unlike the FrameCache, which
+    reuses the detections of near-duplicate live frames for a few seconds, this cache needs an
+    exact match and persists across runs. The least recently used entries are evicted once the
+    stored predictions exceed max_bytes.
+
+    In replay mode the cache never calls the detector: a miss is an error. Scans of cached files
+    then give the same detections on every run without the model or a network connection, which
+    makes it an offline, deterministic source of predictions for benchmarks.
+
+    Attributes:
+    - db_path (str): The path of the SQLite database file
+    - max_bytes (int): The maximum size of the stored predictions, in bytes
+    - replay (bool): Whether to serve predictions from the cache only
+    - total_bytes (int): The size of the stored predictions, in bytes
+    - hits (int): The number of lookups that returned cached predictions
+    - misses (int): The number of lookups that did not find cached predictions
+    - connection (sqlite3.Connection): The database connection, shared by all threads
+    - lock (threading.Lock): The lock to serialize the use of the connection
+
+    Methods:
+    - compute_key(frame, params): Computes the cache key of a frame and the prediction parameters
+    - get_many(self, keys): Gets the cached predictions of several keys
+    - put_many(self, items): Caches the predictions of several keys and evicts the oldest entries if needed
+    - stats(self): Gets the hit and miss counters and the size of the cache
+    - close(self): Closes the database connection
+    - _evict(self): Removes the least recently used entries until the cache fits in max_bytes
+    """
+
+    def __init__(
+        self,
+        db_path=config.PREDICTION_CACHE_PATH,
+        max_mb=config.PREDICTION_CACHE_MAX_MB,
+        replay=config.PREDICTION_CACHE_REPLAY,
+    ):
+        """
+        Initializes the PredictionCache and creates the database if needed
+
+        @param db_path (str): The path of the SQLite database file
+        @param max_mb (float): The maximum size of the stored predictions, in megabytes
+        @param replay (bool): Whether to serve predictions from the cache only
+        """
+        self.db_path = db_path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.replay = replay
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.executescript("""
+                CREATE TABLE IF NOT EXISTS predictions (
+                    key TEXT PRIMARY KEY,
+                    predictions TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions(last_used);
+                """)
+            self.total_bytes = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM predictions"
+            ).fetchone()[0]
+
+    @staticmethod
+    def compute_key(frame, params):
+        """
+        Computes the cache key of a frame and the prediction parameters.
+        The shape is part of the key, so frames with the same bytes but different sizes do not collide.
+
+        @param frame (numpy.ndarray): The frame
+        @param params (str): The model ID and prediction parameters
+        @return (str): The cache key
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{params}|{frame.shape}|{frame.dtype}|".encode())
+        digest.update(np.ascontiguousarray(frame).data)  # No copy for whole frames
+        return digest.hexdigest()
+
+    def get_many(self, keys):
+        """
+        Gets the cached predictions of several keys and marks them as recently used
+
+        @param keys (list): The cache keys
+        @return (list): The cached detection lists, with None for the misses, in the same order as the keys
+        """
+        with self.lock:
+            rows = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(
+                0, len(unique_keys), 500
+            ):  # Stay under the SQL variable limit
+                chunk = unique_keys[start : start + 500]
+                rows.update(
+                    self.connection.execute(
+                        "SELECT key, predictions FROM predictions WHERE key IN "
+                        f"({', '.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                )
+            if rows:
+                now = time.time()
+                with self.connection:
+                    self.connection.executemany(
+                        "UPDATE predictions SET last_used = ? WHERE key = ?",
+                        ((now, key) for key in rows),
+                    )
+            hit_count = sum(key in rows for key in keys)
+            self.hits += hit_count
+            self.misses += len(keys) - hit_count
+
+        return [
+            (
+                [
+                    dict(detection, bbox=tuple(detection["bbox"]))
+                    for detection in json.loads(rows[key])
+                ]
+                if key in rows
+                else None
+            )
+            for key in keys
+        ]
+
+    def put_many(self, items):
+        """
+        Caches the predictions of several keys, and evicts the least recently used entries if
+        the cache grows past max_bytes
+
+        @param items (list): A list of (key, detections) tuples
+        """
+        now = time.time()
+        rows = []
+        for key, detections in dict(items).items():  # Identical frames are stored once
+            predictions = json.dumps(detections)
+            rows.append((key, predictions, len(predictions), now))
+
+        with self.lock, self.connection:
+            replaced = 0
+            for row in rows:  # Entries that are overwritten no longer count
+                existing = self.connection.execute(
+                    "SELECT size FROM predictions WHERE key = ?", (row[0],)
+                ).fetchone()
+                replaced += existing[0] if existing else 0
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO predictions (key, predictions, size, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self.total_bytes += sum(row[2] for row in rows) - replaced
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def stats(self):
+        """
+        Gets the hit and miss counters and the size of the cache
+
+        @return (dict): The number of hits, misses, and stored bytes
+        """
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.total_bytes}
+
+    def close(self):
+        """
+        Closes the database connection
+        """
+        with self.lock:
+            self.connection.close()
+
+    def _evict(self):
+        """
+        Removes the least recently used entries until the cache is back under 90% of max_bytes,
+        so eviction does not run again on the next put. The caller holds the lock and the transaction.
+        """
+        target = self.max_bytes * 0.9
+        evicted = []
+        for key, size in self.connection.execute(
+            "SELECT key, size FROM predictions ORDER BY last_used"
+        ):
+            if self.total_bytes <= target:
+                break
+            evicted.append((key,))
+            self.total_bytes -= size
+        self.connection.executemany("DELETE FROM predictions WHERE key = ?", evicted)
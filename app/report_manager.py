@@ -1,19 +1,35 @@
+import html
 import os
-from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from detection_array import DetectionArray
+from detection_store import DetectionStore
+from report_writer import ReportWriter
 import config
 
 
 class ReportManager:
     """
-    ReportManager class to manage and save reports of detections
+    ReportManager class to manage and save reports of detections.
+    Scans are written to the detection store while they run, and text or HTML reports are rendered
+    from the store on demand. Reports are rendered piece by piece, so long scans are never loaded
+    into memory at once.
 
     Attributes:
     - reports_directory (str): The path to the reports directory
+    - store (DetectionStore): The database of scans and detections
 
     Methods:
-    - format_report_content(detections, timestamp, output_paths, camera_id=None): Formats the report content with the given detections, timestamp, output paths, and camera ID
-    - save_detections(detections, timestamp, output_paths, camera_id=None): Saves the detections to a report file with the given timestamp, output paths, and camera ID
-    - get_latest_report(): Gets the path of the latest report file
+    - format_report_content(detections, timestamp, output_paths, camera_id=None, sampled_frames=None): Formats the report content with the given detections, timestamp, output paths, camera ID, and sampled frames
+    - iter_report_content(detections, summary, timestamp, output_paths, camera_id=None, sampled_frames=()): Yields the report content piece by piece
+    - format_html_report_content(detections, timestamp, output_paths, camera_id=None, sampled_frames=None): Formats the report content as an HTML page
+    - iter_html_report_content(detections, summary, timestamp, output_paths, camera_id=None, sampled_frames=()): Yields the HTML report piece by piece
+    - start_report(timestamp, camera_id=None): Starts the report of a scan and gets its writer
+    - resume_report(scan_id): Continues the report of an unfinished scan and gets its writer
+    - finish_report(report_writer): Completes the report of a scan and renders the text report file
+    - render_report(scan_id, report_format="txt"): Renders the report of a scan from the store to a file
+    - get_latest_report(report_format="txt"): Renders the report of the latest scan and gets its path
+    - _flatten_sampled_frames(sampled_frames): Converts the sampled frame indices per source path to (source, frame_index) pairs
     """
 
     def __init__(self):
@@ -22,70 +38,276 @@ class ReportManager:
         """
         self.reports_directory = config.REPORTS_DIR
         os.makedirs(self.reports_directory, exist_ok=True)
+        self.store = DetectionStore()
 
     def format_report_content(
-        self, detections, timestamp, output_paths, camera_id=None
+        self, detections, timestamp, output_paths, camera_id=None, sampled_frames=None
     ):
         """
-        Formats the report content with the given detections, timestamp, output paths, and camera ID
+        Formats the report content with the given detections, timestamp, output paths, camera ID, and sampled frames.
+        The summary counts the detections per label with vectorized aggregation over the DetectionArray.
 
-        @param detections (list): A list of detections
+        @param detections (DetectionArray): The detections (a list of detection dicts is converted)
         @param timestamp (str): The timestamp of the report
         @param output_paths (list): A list of output paths
         @param camera_id (str): The camera ID
+        @param sampled_frames (dict): The sampled frame indices per source path
         @return (str): The formatted report content
         """
-        output_paths_str = "\n".join(f"- {path}" for path in output_paths)
-        detections_str = "\n".join(
-            f"Label: {det['label']}, Confidence: {det['confidence']}, Bounding Box: {det['bbox']}"
-            for det in detections
+        if not isinstance(detections, DetectionArray):
+            detections = DetectionArray.from_dicts(list(detections))
+        return "".join(
+            self.iter_report_content(
+                detections,
+                detections.aggregate(),
+                timestamp,
+                output_paths,
+                camera_id,
+                self._flatten_sampled_frames(sampled_frames),
+            )
         )
-        report_content = (
+
+    def iter_report_content(
+        self,
+        detections,
+        summary,
+        timestamp,
+        output_paths,
+        camera_id=None,
+        sampled_frames=(),
+    ):
+        """
+        Yields the report content piece by piece, so a report can be written without holding it in memory
+
+        @param detections (iterable): The detection dicts
+        @param summary (dict): The count and confidence statistics per label
+        @param timestamp (str): The timestamp of the report
+        @param output_paths (iterable): The output paths
+        @param camera_id (str): The camera ID
+        @param sampled_frames (iterable): The (source, frame_index) pairs of the sampled frames, grouped by source
+        @return (generator): A generator of strings
+        """
+        yield (
             "YVR Eagle-Eye Report\n"
             "====================\n\n"
             f"Camera ID: {camera_id}\n"
             f"Timestamp: {timestamp}\n"
             "Output Paths:\n"
-            f"{output_paths_str}\n\n"
-            "Detections:\n"
-            f"{detections_str}\n"
         )
-        return report_content
+        for path in output_paths:
+            yield f"- {path}\n"
+        yield "\nSampled Frames:\n"
+        for source, frames in groupby(sampled_frames, key=itemgetter(0)):
+            yield f"- {source}: "
+            separator = ""
+            for _, frame_index in frames:
+                yield f"{separator}{frame_index}"
+                separator = ", "
+            yield "\n"
+        yield "\nSummary:\n"
+        for label, stats in summary.items():
+            yield (
+                f"- {label}: {stats['count']} detections in {stats['frames']} frames, "
+                f"Mean Confidence: {stats['mean_confidence']:.2f}, "
+                f"Max Confidence: {stats['max_confidence']:.2f}\n"
+            )
+        yield "\nDetections:\n"
+        for det in detections:
+            yield (
+                f"Label: {det['label']}, Confidence: {det['confidence']}, Bounding Box: {det['bbox']}"
+                + (
+                    f", Track: {det['track_id']}, Frames: {det['frames']}, "
+                    f"Seen: {det['first_seen']:.2f}s - {det['last_seen']:.2f}s, Source: {det['source']}"
+                    if "track_id" in det
+                    else ""
+                )
+                + "\n"
+            )
 
-    def save_detections(self, detections, timestamp, output_paths, camera_id=None):
+    def format_html_report_content(
+        self, detections, timestamp, output_paths, camera_id=None, sampled_frames=None
+    ):
         """
-        Saves the detections to a report file with the given timestamp, output paths, and camera ID
+        Formats the report content as an HTML page, with the detections in a table
 
-        @param detections (list): A list of detections
+        @param detections (DetectionArray): The detections (a list of detection dicts is converted)
         @param timestamp (str): The timestamp of the report
         @param output_paths (list): A list of output paths
         @param camera_id (str): The camera ID
+        @param sampled_frames (dict): The sampled frame indices per source path
+        @return (str): The formatted HTML report
+        """
+        if not isinstance(detections, DetectionArray):
+            detections = DetectionArray.from_dicts(list(detections))
+        return "".join(
+            self.iter_html_report_content(
+                detections,
+                detections.aggregate(),
+                timestamp,
+                output_paths,
+                camera_id,
+                self._flatten_sampled_frames(sampled_frames),
+            )
+        )
+
+    def iter_html_report_content(
+        self,
+        detections,
+        summary,
+        timestamp,
+        output_paths,
+        camera_id=None,
+        sampled_frames=(),
+    ):
         """
-        report_filename = f"report_{timestamp}.txt"
-        report_path = os.path.join(self.reports_directory, report_filename)
+        Yields the HTML report piece by piece, so a report can be written without holding it in memory
 
-        report_content = self.format_report_content(
-            detections, timestamp, output_paths, camera_id
+        @param detections (iterable): The detection dicts
+        @param summary (dict): The count and confidence statistics per label
+        @param timestamp (str): The timestamp of the report
+        @param output_paths (iterable): The output paths
+        @param camera_id (str): The camera ID
+        @param sampled_frames (iterable): The (source, frame_index) pairs of the sampled frames, grouped by source
+        @return (generator): A generator of strings
+        """
+
+        def escape(value):
+            return html.escape(str(value))
+
+        yield (
+            "<html><head><meta charset='utf-8'><title>YVR Eagle-Eye Report</title></head><body>"
+            "<h1>YVR Eagle-Eye Report</h1>"
+            f"<p>Camera ID: {escape(camera_id)}<br>Timestamp: {escape(timestamp)}</p>"
+            "<h2>Output Paths</h2><ul>"
+        )
+        for path in output_paths:
+            yield f"<li>{escape(path)}</li>"
+        yield "</ul><h2>Sampled Frames</h2><ul>"
+        for source, frames in groupby(sampled_frames, key=itemgetter(0)):
+            yield f"<li>{escape(source)}: "
+            separator = ""
+            for _, frame_index in frames:
+                yield f"{separator}{frame_index}"
+                separator = ", "
+            yield "</li>"
+        yield (
+            "</ul><h2>Summary</h2><table border='1'>"
+            "<tr><th>Label</th><th>Detections</th><th>Frames</th><th>Mean Confidence</th><th>Max Confidence</th></tr>"
+        )
+        for label, stats in summary.items():
+            yield (
+                f"<tr><td>{escape(label)}</td><td>{stats['count']}</td><td>{stats['frames']}</td>"
+                f"<td>{stats['mean_confidence']:.2f}</td><td>{stats['max_confidence']:.2f}</td></tr>"
+            )
+        yield (
+            "</table><h2>Detections</h2><table border='1'>"
+            "<tr><th>Label</th><th>Confidence</th><th>Bounding Box</th><th>Source</th><th>Frame</th><th>Track</th></tr>"
+        )
+        for det in detections:
+            yield (
+                f"<tr><td>{escape(det['label'])}</td><td>{det['confidence']:.2f}</td>"
+                f"<td>{escape(det['bbox'])}</td><td>{escape(det['source'] or '')}</td>"
+                f"<td>{det['frame_index']}</td><td>{det.get('track_id', '')}</td></tr>"
+            )
+        yield "</table></body></html>\n"
+
+    def start_report(self, timestamp, camera_id=None):
+        """
+        Starts the report of a scan, so the scan can write its frames and detections as it runs
+
+        @param timestamp (str): The timestamp of the report
+        @param camera_id (str): The camera ID
+        @return (ReportWriter): The writer of the report
+        """
+        return ReportWriter(self.store, timestamp, camera_id)
+
+    def resume_report(self, scan_id):
+        """
+        Continues the report of an unfinished scan, keeping its timestamp and camera ID
+
+        @param scan_id (int): The ID of the unfinished scan
+        @return (ReportWriter): The writer of the report
+        """
+        scan = self.store.get_scan(scan_id)
+        return ReportWriter(
+            self.store, scan["timestamp"], scan["camera_id"], scan_id=scan_id
         )
-        print("Saving report...")
-        print(f"\n{report_content}")
-        with open(report_path, "w") as file:
-            file.write(report_content)
 
+    def finish_report(self, report_writer):
+        """
+        Completes the report of a scan and renders the text report file.
+        A scan without detections is removed from the store and gets no report.
+
+        @param report_writer (ReportWriter): The writer of the report
+        @return (str): The path of the text report file, or None if there were no detections
+        """
+        scan_id = report_writer.close()
+        if report_writer.detection_count == 0:
+            self.store.delete_scan(scan_id)
+            return None
+
+        print("Saving report...")
+        report_path = self.render_report(scan_id)
+        with open(report_path, "r") as file:
+            print()
+            for line in file:
+                print(line, end="")
         return report_path
 
-    def get_latest_report(self):
+    def render_report(self, scan_id, report_format="txt"):
         """
-        Gets the path of the latest report file
+        Renders the report of a scan from the store to a file in the reports directory.
+        The detections and frames are read from the store one chunk at a time.
 
-        @return (str): The path of the latest report file
+        @param scan_id (int): The ID of the scan
+        @param report_format (str): The format of the report (txt or html)
+        @return (str): The path of the report file, or None if the scan does not exist
         """
-        report_files = os.listdir(self.reports_directory)
-        if not report_files:
+        scan = self.store.get_scan(scan_id)
+        if scan is None:
             return None
+        if report_format == "html":
+            formatter = self.iter_html_report_content
+        elif report_format == "txt":
+            formatter = self.iter_report_content
+        else:
+            raise ValueError("Invalid report format")
 
-        latest_report = max(
-            report_files,
-            key=lambda x: os.path.getctime(os.path.join(self.reports_directory, x)),
+        report_content = formatter(
+            self.store.iter_scan_detections(scan_id),
+            self.store.summarize_scan(scan_id),
+            scan["timestamp"],
+            (path for _, _, path in self.store.iter_scan_frames(scan_id) if path),
+            scan["camera_id"],
+            (frame[:2] for frame in self.store.iter_scan_frames(scan_id)),
         )
-        return os.path.join(self.reports_directory, latest_report)
+        report_path = os.path.join(
+            self.reports_directory, f"report_{scan['timestamp']}.{report_format}"
+        )
+        with open(report_path, "w") as file:
+            file.writelines(report_content)
+        return report_path
+
+    def get_latest_report(self, report_format="txt"):
+        """
+        Renders the report of the latest scan from the store and gets its path
+
+        @param report_format (str): The format of the report (txt or html)
+        @return (str): The path of the latest report file, or None if there are no scans
+        """
+        scan = self.store.get_latest_scan()
+        if scan is None:
+            return None
+        return self.render_report(scan["id"], report_format)
+
+    @staticmethod
+    def _flatten_sampled_frames(sampled_frames):
+        """
+        Converts the sampled frame indices per source path to (source, frame_index) pairs
+
+        @param sampled_frames (dict): The sampled frame indices per source path
+        @return (generator): A generator of (source, frame_index) pairs, grouped by source
+        """
+        for source, indices in (sampled_frames or {}).items():
+            for frame_index in indices:
+                yield source, frame_index
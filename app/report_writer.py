@@ -0,0 +1,131 @@
+import time
+from detection_array import DetectionArray
+import config
+
+
+class ReportWriter:
+    """
+    ReportWriter class to write the report of a scan incrementally while the scan runs.
+    Sampled frames and detections are buffered and appended to the detection store one chunk at
+    a time, so the memory used by the report stays bounded however long the scan is, and a crash
+    only loses the last unsaved chunk. The summary of the report is computed from the store once
+    the scan is closed.
+
+    A chunk is written when the buffer holds chunk_size rows, or when sync_seconds have passed since
+    the last sync; that time-based write also checkpoints the store so the saved chunks are on disk.
+    Chunks are only written between frames, so a frame is always saved together with its detections
+    and a resumed scan can continue after the last saved frame.
+
+    Attributes:
+    - store (DetectionStore): The database to write the scan to
+    - scan_id (int): The ID of the scan in the store
+    - timestamp (str): The timestamp of the scan
+    - camera_id (str): The camera ID
+    - chunk_size (int): The number of buffered rows that triggers a write
+    - sync_seconds (float): The maximum time between two syncs of the store
+    - detections (DetectionArray): The detections not yet written
+    - frames (list): The (source, frame_index, output_path) tuples not yet written
+    - detection_count (int): The number of detections in the report
+    - frame_count (int): The number of frames in the report
+    - last_sync (float): The time of the last sync of the store
+
+    Methods:
+    - add_frame(self, source, frame_index, output_path): Adds a sampled frame to the report
+    - add_detections(self, detections, frame_index, timestamp, source): Adds detections of the last added frame to the report
+    - flush(self, sync): Writes the buffered frames and detections to the store
+    - close(self): Writes the rest of the report and marks the scan as complete
+    - _flush_if_due(self): Writes the buffer if it is full or a sync is due
+    """
+
+    def __init__(
+        self,
+        store,
+        timestamp,
+        camera_id=None,
+        chunk_size=config.REPORT_CHUNK_SIZE,
+        sync_seconds=config.REPORT_SYNC_SECONDS,
+        scan_id=None,
+    ):
+        """
+        Initializes the ReportWriter and begins the scan in the store, or continues an unfinished scan
+
+        @param store (DetectionStore): The database to write the scan to
+        @param timestamp (str): The timestamp of the scan
+        @param camera_id (str): The camera ID
+        @param chunk_size (int): The number of buffered rows that triggers a write
+        @param sync_seconds (float): The maximum time between two syncs of the store
+        @param scan_id (int): The ID of the unfinished scan to continue, or None to begin a new scan
+        """
+        self.store = store
+        self.timestamp = timestamp
+        self.camera_id = camera_id
+        self.chunk_size = max(1, chunk_size)
+        self.sync_seconds = sync_seconds
+        self.detections = DetectionArray()
+        self.frames = []
+        if scan_id is None:
+            self.scan_id = store.begin_scan(timestamp, camera_id)
+            self.frame_count, self.detection_count = 0, 0
+        else:
+            self.scan_id = scan_id
+            self.frame_count, self.detection_count = store.count_scan_rows(scan_id)
+        self.last_sync = time.monotonic()
+
+    def add_frame(self, source, frame_index, output_path=None):
+        """
+        Adds a sampled frame to the report, first writing the buffer if it is due
+
+        @param source (str): The source path of the frame
+        @param frame_index (int): The index of the frame in its source
+        @param output_path (str): The path of the output image, or None if the frame failed
+        """
+        self._flush_if_due()
+        self.frames.append((source, frame_index, output_path))
+        self.frame_count += 1
+
+    def add_detections(self, detections, frame_index=0, timestamp=0.0, source=None):
+        """
+        Adds detections of the last added frame, or tracked objects, to the report
+
+        @param detections (list): A list of dictionaries containing the detected objects
+        @param frame_index (int): The index of the frame in its source
+        @param timestamp (float): The time of the frame in its source, in seconds
+        @param source (str): The source path
+        """
+        self.detections.append(
+            detections, frame_index, timestamp, self.camera_id, source
+        )
+        self.detection_count += len(detections)
+
+    def flush(self, sync=False):
+        """
+        Writes the buffered frames and detections to the store
+
+        @param sync (bool): Whether to also checkpoint the store so the chunks are on disk
+        """
+        if self.frames or len(self.detections):
+            self.store.append_to_scan(self.scan_id, self.detections, self.frames)
+            self.detections = DetectionArray()
+            self.frames = []
+        if sync:
+            self.store.sync()
+            self.last_sync = time.monotonic()
+
+    def close(self):
+        """
+        Writes the rest of the report and marks the scan as complete
+
+        @return (int): The ID of the scan
+        """
+        self.flush(sync=True)
+        self.store.finish_scan(self.scan_id)
+        return self.scan_id
+
+    def _flush_if_due(self):
+        """
+        Writes the buffer if it is full, or syncs if sync_seconds have passed since the last sync
+        """
+        if len(self.frames) + len(self.detections) >= self.chunk_size:
+            self.flush()
+        elif time.monotonic() - self.last_sync >= self.sync_seconds:
+            self.flush(sync=True)
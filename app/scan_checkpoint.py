@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+
+
+class ScanCheckpoint:
+    """
+    ScanCheckpoint class to resume a scan that did not finish from its last saved frame.
+
+    The progress of a scan is not saved separately: the ReportWriter saves every frame in the same
+    transaction as its detections, so the frames of a scan in the detection store are exactly the
+    frames whose results are saved. The checkpoint records the input of the scan with a fingerprint
+    of its files, so an input that changed since is never resumed, and reads the last saved frame
+    of every source back from the store.
+
+    Sources are scanned in order, so every source before the last saved one is complete, and the
+    last one continues after its last saved frame. A source with failed frames continues at its
+    first failed frame instead, so the failed frames are detected again. A tracked scan cannot
+    continue a source mid-way, because the tracks of the source are not saved, so it scans the
+    unfinished source again from its first frame, after deleting what was saved of it.
+
+    Attributes:
+    - scan_id (int): The ID of the scan in the detection store
+    - input_type (str): The type of input of the scan (1: Image, 2: Video, 3: Directory)
+    - input_path (str): The path of the input of the scan
+    - fingerprint (str): The fingerprint of the input files
+    - start_frames (dict): The frame index to continue each saved source at (None if the source is complete)
+
+    Methods:
+    - save(self, store): Saves the checkpoint of a new scan to the store
+    - load(store, input_type, input_path): Loads the checkpoint of the latest unfinished scan of an input
+    - rewind(self, store, restart): Deletes the saved results of the sources from the frame they continue at
+    - compute_fingerprint(input_path): Computes the fingerprint of the files of an input
+    """
+
+    def __init__(self, scan_id, input_type, input_path, fingerprint=None):
+        """
+        Initializes the ScanCheckpoint of a scan
+
+        @param scan_id (int): The ID of the scan in the detection store
+        @param input_type (str): The type of input of the scan (1: Image, 2: Video, 3: Directory)
+        @param input_path (str): The path of the input of the scan
+        @param fingerprint (str): The fingerprint of the input files (computed if None)
+        """
+        self.scan_id = scan_id
+        self.input_type = input_type
+        self.input_path = input_path
+        self.fingerprint = fingerprint or self.compute_fingerprint(input_path)
+        self.start_frames = {}
+
+    def save(self, store):
+        """
+        Saves the checkpoint of a new scan to the store
+
+        @param store (DetectionStore): The detection store of the scan
+        """
+        store.save_checkpoint(
+            self.scan_id, self.input_type, self.input_path, self.fingerprint
+        )
+
+    @classmethod
+    def load(cls, store, input_type, input_path):
+        """
+        Loads the checkpoint of the latest unfinished scan of an input, with the frame to
+        continue each source at
+
+        @param store (DetectionStore): The detection store of the scan
+        @param input_type (str): The type of input of the scan
+        @param input_path (str): The path of the input of the scan
+        @return (ScanCheckpoint): The checkpoint, or None if there is no unfinished scan of the unchanged input
+        """
+        saved = store.find_checkpoint(input_type, input_path)
+        if saved is None or saved["fingerprint"] != cls.compute_fingerprint(input_path):
+            return None
+
+        checkpoint = cls(saved["scan_id"], input_type, input_path, saved["fingerprint"])
+        progress = store.get_scan_progress(checkpoint.scan_id)
+        for position, (source, frame_index, failed_index) in enumerate(progress):
+            if failed_index is not None:  # Detect the failed frames again
+                checkpoint.start_frames[source] = failed_index
+            elif position == len(progress) - 1:
+                checkpoint.start_frames[source] = frame_index + 1
+            else:
+                checkpoint.start_frames[source] = None  # Complete
+        return checkpoint
+
+    def rewind(self, store, restart=False):
+        """
+        Deletes the saved results of the unfinished sources from the frame they continue at,
+        so no frame is reported twice when the scan is resumed
+
+        @param store (DetectionStore): The detection store of the scan
+        @param restart (bool): Whether to scan the unfinished sources again from their first frame (for tracked scans)
+        """
+        for source, start_frame in self.start_frames.items():
+            if start_frame is None:  # Complete
+                continue
+            if restart:
+                self.start_frames[source] = start_frame = 0
+            store.delete_scan_source(self.scan_id, source, start_frame)
+
+    @staticmethod
+    def compute_fingerprint(input_path):
+        """
+        Computes the fingerprint of the files of an input from their names, sizes, and modification times.
+        The files are not read, so the fingerprint is cheap even for long videos.
+
+        @param input_path (str): The path of the image, video, or directory
+        @return (str): The fingerprint, or an empty string if the input does not exist
+        """
+        if os.path.isdir(input_path):
+            paths = [
+                os.path.join(input_path, filename)
+                for filename in sorted(os.listdir(input_path))
+            ]
+        else:
+            paths = [input_path]
+
+        entries = []
+        for path in paths:
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append([os.path.basename(path), stat.st_size, stat.st_mtime_ns])
+        if not entries:
+            return ""
+        return hashlib.sha256(json.dumps(entries).encode()).hexdigest()
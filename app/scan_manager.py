@@ -1,6 +1,13 @@
 from input_processor import InputProcessor
 from object_detector import ObjectDetector
+from frame_sampler import FrameSamplerFactory
+from object_tracker import ObjectTracker
+from scan_checkpoint import ScanCheckpoint
+from prediction_cache import PredictionCache
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from datetime import datetime
+from itertools import islice
 import config
 import os
 import cv2
@@ -13,13 +20,19 @@ class ScanManager:
 
     Attributes:
     - input_processor (InputProcessor): The input processor to process input data
-    - object_detector (ObjectDetector): The object detector to detect objects in frames
+    - object_detector (ObjectDetector): The object detector for camera captures and live streams, without the persistent cache
+    - scan_detector (ObjectDetector): The object detector for file scans, sharing the backend of object_detector (the same detector if the prediction cache is disabled)
     - camera_manager (CameraManager): The camera manager to capture frames from the camera
 
     Methods:
     - __init__(self, camera_manager): Initializes the ScanManager with the given camera_manager
-    - run_scan(self, input_type, input_path): Runs a manual scan on the given input (image, video, or directory path)
-    - run_auto_scan(self): Runs an automatic scan by capturing a frame from the connected camera
+    - run_scan(self, input_type, input_path, report_writer, batch_size, sampler, workers, max_in_flight, tracking, checkpoint, resumable, use_cache): Runs a manual scan on the given input (image, video, or directory path)
+    - run_auto_scan(self, report_writer): Runs an automatic scan by capturing a frame from the connected camera
+    - _write_tracked_objects(trackers, report_writer): Writes the objects of the trackers to the report and forgets the trackers
+    - _iter_batches(input_data, batch_size): Groups the frames of a frame generator into batches
+    - _detect_batches(self, object_detector, batches, camera_id, workers, max_in_flight): Detects objects in the batches, serially or on a thread pool
+    - _detect_batch(self, object_detector, batch, camera_id): Detects objects in a batch and saves the output images once
+    - _predict_batch(self, object_detector, batch, camera_id): Detects objects in a batch without saving, isolating the errors of each frame
     """
 
     def __init__(self, camera_manager):
@@ -30,46 +43,262 @@ class ScanManager:
         """
         self.input_processor = InputProcessor()
         self.object_detector = ObjectDetector()
+        # Re-scans of the same files reuse the predictions of earlier scans. Camera frames are
+        # never seen again, so they would only fill the cache and evict the scan entries.
+        self.scan_detector = (
+            ObjectDetector(
+                backend=self.object_detector.backend, prediction_cache=PredictionCache()
+            )
+            if config.PREDICTION_CACHE_ENABLED
+            else self.object_detector
+        )
         self.camera_manager = camera_manager
 
-    def run_scan(self, input_type, input_path):
+    def run_scan(
+        self,
+        input_type,
+        input_path,
+        report_writer,
+        batch_size=config.SCAN_BATCH_SIZE,
+        sampler=None,
+        workers=config.SCAN_WORKERS,
+        max_in_flight=config.SCAN_MAX_IN_FLIGHT,
+        tracking=config.TRACKING_ENABLED,
+        checkpoint=None,
+        resumable=True,
+        use_cache=True,
+    ):
         """
-        Runs a manual scan on the given input (image, video, or directory path)
+        Runs a manual scan on the given input (image, video, or directory path).
+        Frames are streamed from the input processor and sent to the object detector
+        in batches of batch_size frames. With more than one worker, batches are detected
+        concurrently on a thread pool with at most max_in_flight frames pending, and the
+        results are reassembled in frame order. A frame that fails is reported and skipped.
+        Video frames are selected by the sampler.
+        With tracking, the detections of each source go through an object tracker and every
+        object is reported once, with its track ID and first and last seen timestamps.
+
+        The sampled frames, output paths, and detections are written to the report writer as the
+        frames are processed, so nothing accumulates in memory however long the scan is. If the
+        scan fails, what was processed so far is still written.
+
+        A new resumable scan saves a checkpoint of its input, so it can be resumed if it does not finish.
+        A resumed scan skips the sources it completed and continues the last one after its last
+        saved frame, seeking straight to it in a video.
 
         @param input_type (str): The type of input to process (1: Image, 2: Video, 3: Directory)
         @param input_path (str): The path of the input to process
-        @return (tuple): A tuple containing the detections and output paths
+        @param report_writer (ReportWriter): The writer of the scan report
+        @param batch_size (int): The number of frames to send to the object detector per call
+        @param sampler (FrameSampler): The sampler that selects the video frames to scan (configured policy if None)
+        @param workers (int): The number of detection threads (1 to detect serially)
+        @param max_in_flight (int): The maximum number of frames submitted but not yet collected
+        @param tracking (bool): Whether to report unique tracked objects instead of the detections of every frame
+        @param checkpoint (ScanCheckpoint): The checkpoint of the unfinished scan to resume, or None for a new scan
+        @param resumable (bool): Whether to save a checkpoint for a new scan (False for inputs that cannot be scanned again)
+        @param use_cache (bool): Whether to use the persistent prediction cache, if enabled (False for camera captures)
+        @return (int): The number of detections written to the report
         """
+        sampler = sampler or FrameSamplerFactory.create_sampler()
+        if checkpoint is None and resumable:  # Make the new scan resumable
+            checkpoint = ScanCheckpoint(report_writer.scan_id, input_type, input_path)
+            checkpoint.save(report_writer.store)
+        start_frames = checkpoint.start_frames if checkpoint is not None else {}
+
         if input_type == "1":  # If the input type is Image
-            input_data = self.input_processor.process_image(input_path)
+            input_data = self.input_processor.iter_image(
+                input_path, start_frames.get(input_path, 0)
+            )
         elif input_type == "2":  # If the input type is Video
-            input_data = self.input_processor.process_video(input_path)
+            input_data = self.input_processor.iter_video(
+                input_path, sampler, start_frames.get(input_path, 0)
+            )
         elif input_type == "3":  # If the input type is Directory
-            input_data = self.input_processor.process_directory(input_path)
+            input_data = self.input_processor.iter_directory(
+                input_path, sampler, start_frames
+            )
         else:
             raise ValueError("Invalid input type")
 
+        object_detector = self.scan_detector if use_cache else self.object_detector
         camera_id = self.camera_manager.get_camera_id()
-        detections = []
-        output_paths = []
+        trackers = {}  # Source path -> object tracker of the source being scanned
+        failed_frames = 0
 
-        # Process each frame to detect objects
-        for frame in input_data:
-            frame_detections, output_path = self.object_detector.detect_objects(
-                frame, camera_id, config.OUT_IMG_DIR
-            )
-            detections.extend(frame_detections)  # Add the detected objects to the list
-            output_paths.append(
-                output_path
-            )  # Add the output path of the .jpg file to the list
+        try:
+            # Process the frames in batches to detect objects
+            batches = self._iter_batches(input_data, batch_size)
+            for source_info, frame_detections, output_path in self._detect_batches(
+                object_detector, batches, camera_id, workers, max_in_flight
+            ):
+                source = source_info["source"]
+                report_writer.add_frame(source, source_info["frame_index"], output_path)
+                if frame_detections is None:  # The frame failed, continue with the rest
+                    failed_frames += 1
+                    continue
+                if tracking:  # Follow the objects across the frames of the source
+                    if source not in trackers:
+                        # Sources are scanned in order, so the previous source is complete
+                        self._write_tracked_objects(trackers, report_writer)
+                        trackers[source] = ObjectTracker()
+                    tracker = trackers[source]
+                    tracker.update(frame_detections, source_info["timestamp"] / 1000)
+                    # Write out the objects whose tracks have ended
+                    report_writer.add_detections(
+                        tracker.pop_finished_objects(), source=source
+                    )
+                else:  # Write the detected objects to the report
+                    report_writer.add_detections(
+                        frame_detections,
+                        source_info["frame_index"],
+                        source_info["timestamp"] / 1000,
+                        source,
+                    )
+        finally:
+            # Write the objects still tracked, also when the scan stops early
+            self._write_tracked_objects(trackers, report_writer)
+            object_detector.flush()  # Make sure every output image is on disk
+            report_writer.flush(sync=True)
 
-        return detections, output_paths
+        if failed_frames:
+            print(f"Scan completed with {failed_frames} failed frames")
+        return report_writer.detection_count
+
+    @staticmethod
+    def _write_tracked_objects(trackers, report_writer):
+        """
+        Writes the objects of the trackers to the report and forgets the trackers
+
+        @param trackers (dict): The object tracker of every source
+        @param report_writer (ReportWriter): The writer of the scan report
+        """
+        for source, tracker in trackers.items():
+            report_writer.add_detections(tracker.get_objects(), source=source)
+        trackers.clear()
+
+    @staticmethod
+    def _iter_batches(input_data, batch_size):
+        """
+        Groups the (frame, source_info) tuples of a frame generator into lists of batch_size items
+
+        @param input_data (generator): A generator of (frame, source_info) tuples
+        @param batch_size (int): The maximum number of items per batch
+        @return (generator): A generator of lists of (frame, source_info) tuples
+        """
+        batch_size = max(1, batch_size)
+        while True:
+            batch = list(islice(input_data, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _detect_batches(
+        self, object_detector, batches, camera_id, workers, max_in_flight
+    ):
+        """
+        Detects objects in the batches, serially or on a thread pool, and yields the results in order.
+        On the thread pool, the oldest batch is collected before a new batch is submitted
+        whenever the submitted frames would exceed max_in_flight.
+
+        @param object_detector (ObjectDetector): The object detector to use
+        @param batches (generator): A generator of lists of (frame, source_info) tuples
+        @param camera_id (str): The camera ID to use for saving the output images
+        @param workers (int): The number of detection threads (1 to detect serially)
+        @param max_in_flight (int): The maximum number of frames submitted but not yet collected
+        @return (generator): A generator of (source_info, detections, output_path) tuples, in frame order
+        """
+        if workers <= 1:
+            for batch in batches:
+                yield from self._detect_batch(object_detector, batch, camera_id)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()  # (future, frame count) in submission order
+            in_flight = 0
+            for batch in batches:
+                while pending and in_flight + len(batch) > max_in_flight:
+                    future, count = pending.popleft()
+                    in_flight -= count
+                    yield from future.result()
+                pending.append(
+                    (
+                        executor.submit(
+                            self._detect_batch, object_detector, batch, camera_id
+                        ),
+                        len(batch),
+                    )
+                )
+                in_flight += len(batch)
+            while pending:
+                future, _ = pending.popleft()
+                yield from future.result()
+
+    def _detect_batch(self, object_detector, batch, camera_id):
+        """
+        Detects objects in a batch of frames and saves the output image of every frame that succeeded.
+        The images are only saved once the predictions are done, so retrying a failed batch
+        never saves a frame twice.
+
+        @param object_detector (ObjectDetector): The object detector to use
+        @param batch (list): A list of (frame, source_info) tuples
+        @param camera_id (str): The camera ID to use for saving the output images
+        @return (list): A list of (source_info, detections, output_path) tuples, with None detections for failed frames
+        """
+        results = []
+        for (frame, source_info), frame_detections in zip(
+            batch, self._predict_batch(object_detector, batch, camera_id)
+        ):
+            output_path = None
+            if frame_detections is not None:
+                try:
+                    output_path = object_detector.save_frame(
+                        frame, frame_detections, camera_id, config.OUT_IMG_DIR
+                    )
+                except Exception as e:
+                    print(
+                        f"Error saving output image of {source_info['source']} "
+                        f"frame {source_info['frame_index']}: {str(e)}"
+                    )
+            results.append((source_info, frame_detections, output_path))
+        return results
+
+    def _predict_batch(self, object_detector, batch, camera_id):
+        """
+        Detects objects in a batch of frames without saving them.
+        If the batch fails, its frames are retried one at a time so a single bad frame
+        does not take the rest of the batch down with it.
+
+        @param object_detector (ObjectDetector): The object detector to use
+        @param batch (list): A list of (frame, source_info) tuples
+        @param camera_id (str): The camera ID, for the progress message
+        @return (list): A list of detection lists, with None for failed frames, in the same order as the batch
+        """
+        try:
+            return object_detector.predict_objects_batch(
+                [frame for frame, _ in batch], camera_id
+            )
+        except Exception as e:
+            if len(batch) > 1:
+                return [
+                    frame_detections
+                    for item in batch
+                    for frame_detections in self._predict_batch(
+                        object_detector, [item], camera_id
+                    )
+                ]
+            source_info = batch[0][1]
+            print(
+                f"Error detecting objects in {source_info['source']} "
+                f"frame {source_info['frame_index']}: {str(e)}"
+            )
+            return [None]
 
-    def run_auto_scan(self):
+    def run_auto_scan(self, report_writer):
         """
         Runs an automatic scan by capturing a frame from the connected camera
 
-        @return (tuple): A tuple containing the detections and output paths
+        @param report_writer (ReportWriter): The writer of the scan report
+        @return (int): The number of detections written to the report
         """
         camera_id = self.camera_manager.get_camera_id()
         if camera_id is None:
@@ -87,4 +316,7 @@ class ScanManager:
         cv2.imwrite(input_path, frame)
 
         # Run the scan on the captured frame
-        return self.run_scan("1", input_path)
+        # Every capture is a new file, so its scan can never be resumed or hit the cache
+        return self.run_scan(
+            "1", input_path, report_writer, resumable=False, use_cache=False
+        )
@@ -0,0 +1,160 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    SharedFrameRing class to share frames between processes without pickling or copying them.
+    The ring is a block of shared memory with a fixed number of fixed-shape uint8 frame slots,
+    preceded by one state byte per slot. Only slot indices and metadata travel through queues.
+
+    A slot goes through two states, and each transition is made by a single process:
+    - FREE -> READY: The capture process writes a frame into a free slot
+    - READY -> FREE: The inference process releases the slot after reading the frame
+
+    Attributes:
+    - name (str): The name of the shared memory block
+    - num_slots (int): The number of frame slots
+    - shape (tuple): The shape of every frame slot (height, width, channels)
+    - shm (SharedMemory): The shared memory block
+    - states (numpy.ndarray): The state byte of every slot, backed by the shared memory
+    - frames (numpy.ndarray): The frame slots, backed by the shared memory
+    - next_slot (int): The slot to try first when acquiring a free slot
+
+    Methods:
+    - create(num_slots, shape): Creates a new ring in shared memory
+    - attach(descriptor): Attaches to an existing ring in another process
+    - descriptor(self): Gets the picklable description of the ring, to attach from another process
+    - acquire_slot(self): Finds a free slot for the capture process to write into
+    - write(self, slot, frame): Copies a frame into a slot and marks it as ready
+    - read(self, slot): Gets a zero-copy view of the frame in a slot
+    - release(self, slot): Marks a slot as free after its frame has been processed
+    - close(self): Detaches from the shared memory
+    - unlink(self): Frees the shared memory (owner only)
+    """
+
+    FREE = 0
+    READY = 1
+    HEADER_SIZE = 64  # Keeps the frame data cache-line aligned
+
+    def __init__(self, shm, num_slots, shape):
+        """
+        Initializes the SharedFrameRing on the given shared memory block.
+        Use create or attach instead of calling this directly.
+
+        @param shm (SharedMemory): The shared memory block
+        @param num_slots (int): The number of frame slots
+        @param shape (tuple): The shape of every frame slot (height, width, channels)
+        """
+        self.shm = shm
+        self.name = shm.name
+        self.num_slots = num_slots
+        self.shape = tuple(shape)
+        self.states = np.ndarray((num_slots,), dtype=np.uint8, buffer=shm.buf)
+        self.frames = np.ndarray(
+            (num_slots,) + self.shape,
+            dtype=np.uint8,
+            buffer=shm.buf,
+            offset=self._header_size(num_slots),
+        )
+        self.next_slot = 0
+
+    @classmethod
+    def _header_size(cls, num_slots):
+        """
+        Gets the size of the slot state header, rounded up to a multiple of HEADER_SIZE
+
+        @param num_slots (int): The number of frame slots
+        @return (int): The header size in bytes
+        """
+        return -(-num_slots // cls.HEADER_SIZE) * cls.HEADER_SIZE
+
+    @classmethod
+    def create(cls, num_slots, shape):
+        """
+        Creates a new ring in shared memory with every slot free
+
+        @param num_slots (int): The number of frame slots
+        @param shape (tuple): The shape of every frame slot (height, width, channels)
+        @return (SharedFrameRing): The new ring
+        """
+        size = cls._header_size(num_slots) + num_slots * int(np.prod(shape))
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        ring = cls(shm, num_slots, shape)
+        ring.states[:] = cls.FREE
+        return ring
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        Attaches to an existing ring in another process
+
+        @param descriptor (tuple): The (name, num_slots, shape) description of the ring
+        @return (SharedFrameRing): The attached ring
+        """
+        name, num_slots, shape = descriptor
+        return cls(shared_memory.SharedMemory(name=name), num_slots, shape)
+
+    def descriptor(self):
+        """
+        Gets the picklable description of the ring, to attach from another process
+
+        @return (tuple): The (name, num_slots, shape) description of the ring
+        """
+        return self.name, self.num_slots, self.shape
+
+    def acquire_slot(self):
+        """
+        Finds a free slot for the capture process to write into
+
+        @return (int): The index of a free slot, or None if every slot is still being processed
+        """
+        for offset in range(self.num_slots):
+            slot = (self.next_slot + offset) % self.num_slots
+            if self.states[slot] == self.FREE:
+                self.next_slot = (slot + 1) % self.num_slots
+                return slot
+        return None
+
+    def write(self, slot, frame):
+        """
+        Copies a frame into a slot and marks it as ready
+
+        @param slot (int): The index of the slot
+        @param frame (numpy.ndarray): The frame, with the same shape as the slots
+        """
+        np.copyto(self.frames[slot], frame)
+        self.states[slot] = self.READY
+
+    def read(self, slot):
+        """
+        Gets a zero-copy view of the frame in a slot.
+        The view is only valid until the slot is released.
+
+        @param slot (int): The index of the slot
+        @return (numpy.ndarray): The frame in the slot
+        """
+        return self.frames[slot]
+
+    def release(self, slot):
+        """
+        Marks a slot as free after its frame has been processed
+
+        @param slot (int): The index of the slot
+        """
+        self.states[slot] = self.FREE
+
+    def close(self):
+        """
+        Detaches from the shared memory
+        """
+        # Drop the array views first, the memory cannot be closed while they exist
+        self.states = None
+        self.frames = None
+        self.shm.close()
+
+    def unlink(self):
+        """
+        Frees the shared memory (owner only)
+        """
+        self.shm.unlink()
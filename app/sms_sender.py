@@ -1,27 +1,48 @@
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
+import threading
 import config
 
 
 class SmsSender:
     """
-    SmsSender class to send SMS messages using Twilio API
+    SmsSender class to send SMS messages using Twilio API.
+    The Twilio client is created once and reused for every message, so its HTTP session keeps
+    its connections open between messages. The client is safe to share between the threads that
+    send messages concurrently.
 
     Attributes:
     - account_sid (str): The Twilio account SID
     - auth_token (str): The Twilio authentication token
     - twilio_number (str): The Twilio phone number
+    - api_base_url (str): The base URL of the Twilio API (a local stand-in when testing)
+    - timeout (float): The timeout of a request, in seconds
+    - client (Client): The Twilio client, created on first use
+    - lock (threading.Lock): The lock to create the client once across threads
 
     Methods:
     - send_sms(content, recipient): Sends an SMS message with the given content to the recipient
+    - _get_client(): Gets the Twilio client, creating it on first use
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        api_base_url=config.TWILIO_API_BASE_URL,
+        timeout=config.NOTIFICATION_TIMEOUT,
+    ):
         """
         Initializes the SmsSender with the required Twilio account SID, authentication token, and phone number
+
+        @param api_base_url (str): The base URL of the Twilio API
+        @param timeout (float): The timeout of a request, in seconds
         """
         self.account_sid = config.TWILIO_ACCOUNT_SID
         self.auth_token = config.TWILIO_AUTH_TOKEN
         self.twilio_number = config.TWILIO_PHONE_NUMBER
+        self.api_base_url = api_base_url
+        self.timeout = timeout
+        self.client = None
+        self.lock = threading.Lock()
 
     def send_sms(self, content, recipient):
         """
@@ -29,12 +50,34 @@ class SmsSender:
 
         @param content (str): The content of the SMS message
         @param recipient (str): The phone number of the recipient
+        @return (bool): True if the SMS message was sent, False otherwise
         """
         try:
-            client = Client(self.account_sid, self.auth_token)
-            message = client.messages.create(
+            message = self._get_client().messages.create(
                 body=content, from_=self.twilio_number, to=recipient
             )
             print(f"SMS sent. Message SID: {message.sid}")
+            return True
         except Exception as e:
             print(f"Error sending SMS: {str(e)}")
+            return False
+
+    def _get_client(self):
+        """
+        Gets the Twilio client, creating it on first use.
+        The client is not created up front, as Twilio rejects missing credentials.
+
+        @return (Client): The Twilio client
+        """
+        with self.lock:
+            if self.client is None:
+                client = Client(
+                    self.account_sid,
+                    self.auth_token,
+                    http_client=TwilioHttpClient(
+                        pool_connections=True, timeout=self.timeout
+                    ),
+                )
+                client.api.base_url = self.api_base_url
+                self.client = client
+            return self.client
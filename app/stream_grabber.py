@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+import cv2
+import config
+
+
+class StreamGrabber:
+    """
+    StreamGrabber class to always read the freshest frame from a camera or stream.
+    OpenCV buffers frames internally, so a slow reader of a network stream gets frames that are
+    seconds old. The grabber drains the stream on a dedicated thread with grab(), and only
+    retrieves (converts) a frame when the reader asks for one, so read() returns the newest frame.
+
+    Sources can be a local camera index, a network stream URL (RTSP/HTTP), or a video file.
+    A video file is paced at its own frame rate, so it can stand in for a live stream in tests.
+
+    Attributes:
+    - source (str): The camera index, stream URL, or file path
+    - capture (cv2.VideoCapture): The underlying capture, only used on the grabber thread
+    - frame_interval (float): The delay between grabs for file sources (0 for live sources)
+    - frame (numpy.ndarray): The latest retrieved frame
+    - frame_id (int): The sequence number of the latest retrieved frame
+    - frame_requested (bool): Whether the reader is waiting for a frame
+    - failed (bool): Whether the stream has failed or ended
+    - condition (threading.Condition): The condition to hand frames to the reader
+    - running (bool): Whether the grabber thread should keep running
+    - thread (threading.Thread): The grabber thread
+
+    Methods:
+    - open_capture(source): Opens a capture for the source with low latency settings
+    - isOpened(self): Checks if the stream is still open
+    - read(self, timeout): Reads the freshest frame from the stream
+    - release(self): Stops the grabber thread and releases the capture
+    - _grab_loop(self): Grabber thread loop that drains the stream and retrieves frames on request
+    """
+
+    def __init__(self, source, capture):
+        """
+        Initializes the StreamGrabber with an opened capture and starts the grabber thread
+
+        @param source (str): The camera index, stream URL, or file path
+        @param capture (cv2.VideoCapture): The opened capture
+        """
+        self.source = source
+        self.capture = capture
+        fps = capture.get(cv2.CAP_PROP_FPS) if os.path.isfile(str(source)) else 0
+        self.frame_interval = 1.0 / fps if fps and fps > 0 else 0
+        self.frame = None
+        self.frame_id = 0
+        self.frame_requested = False
+        self.failed = False
+        self.condition = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def open_capture(source):
+        """
+        Opens a capture for the source with low latency settings.
+        Numeric sources open a local camera. Other sources are opened with the FFmpeg backend,
+        using the transport options from the configuration and open/read timeouts.
+
+        @param source (str): The camera index, stream URL, or file path
+        @return (cv2.VideoCapture): The capture, which may not be opened
+        """
+        source = str(source)
+        if source.isdigit():
+            capture = cv2.VideoCapture(int(source))
+        else:
+            # FFmpeg reads its options from the environment when the capture is opened
+            os.environ.setdefault(
+                "OPENCV_FFMPEG_CAPTURE_OPTIONS", config.CAMERA_FFMPEG_OPTIONS
+            )
+            capture = cv2.VideoCapture(
+                source,
+                cv2.CAP_FFMPEG,
+                [
+                    cv2.CAP_PROP_OPEN_TIMEOUT_MSEC,
+                    config.CAMERA_OPEN_TIMEOUT_MS,
+                    cv2.CAP_PROP_READ_TIMEOUT_MSEC,
+                    config.CAMERA_READ_TIMEOUT_MS,
+                ],
+            )
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Ignored by backends without a buffer
+        return capture
+
+    def isOpened(self):
+        """
+        Checks if the stream is still open
+
+        @return (bool): True if the stream is open and has not failed, False otherwise
+        """
+        return self.running and not self.failed
+
+    def read(self, timeout=None):
+        """
+        Reads the freshest frame from the stream.
+        Waits for the next frame grabbed after the call, so the frame is never older than one frame interval.
+
+        @param timeout (float): The maximum number of seconds to wait (read timeout from the configuration if None)
+        @return (tuple): A (success, frame) tuple, with frame None on failure
+        """
+        if timeout is None:
+            timeout = config.CAMERA_READ_TIMEOUT_MS / 1000
+        with self.condition:
+            last_frame_id = self.frame_id
+            self.frame_requested = True
+            self.condition.wait_for(
+                lambda: self.frame_id != last_frame_id
+                or self.failed
+                or not self.running,
+                timeout,
+            )
+            self.frame_requested = False
+            if self.frame_id == last_frame_id:
+                return False, None
+            return True, self.frame
+
+    def release(self):
+        """
+        Stops the grabber thread and releases the capture
+        """
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread != threading.current_thread():
+            self.thread.join()
+        self.capture.release()
+
+    def _grab_loop(self):
+        """
+        Grabber thread loop that drains the stream and retrieves frames on request
+        """
+        while self.running:
+            started = time.monotonic()
+            if not self.capture.grab():
+                with self.condition:
+                    self.failed = True
+                    self.condition.notify_all()
+                return
+
+            with self.condition:
+                requested = self.frame_requested
+            if requested:  # Only convert the frames the reader asks for
+                ret, frame = self.capture.retrieve()
+                with self.condition:
+                    if ret:
+                        self.frame = frame
+                        self.frame_id += 1
+                    self.condition.notify_all()
+
+            if self.frame_interval:  # Play file sources back in real time
+                time.sleep(max(0, self.frame_interval - (time.monotonic() - started)))
@@ -8,10 +8,12 @@ class View:
     - get_input_type(): Gets the input type from the user
     - display_camera_connected(camera_id): Displays a message that the camera is connected
     - display_camera_connection_error(camera_id): Displays an error message for camera connection
+    - get_resume_choice(frame_count): Asks the user whether to resume an unfinished scan
     - display_scan_complete(): Displays a message that the scan is complete
     - display_report_saved(report_path): Displays a message that the report is saved
     - display_no_report_available(): Displays a message that no report is available
-    - display_report_sent(): Displays a message that the report is sent
+    - display_report_queued(): Displays a message that the report is queued for delivery
+    - display_no_cameras_configured(): Displays a message that no cameras are configured
     - display_error_message(message): Displays an error message
     - display_invalid_choice(): Displays a message for an invalid choice
     """
@@ -32,7 +34,8 @@ class View:
             "\n\t[ 3.] ·· Run Manual Scan"
             "\n\t[ 4.] ·· Send Report to Staff"
             "\n\t[ 5.] ·· View Live Stream"
-            "\n\t[ 6.] ·· Exit"
+            "\n\t[ 6.] ·· View All Cameras"
+            "\n\t[ 7.] ·· Exit"
             "\n\t====================================\n"
         )
         return input("Enter your choice: ")
@@ -83,6 +86,20 @@ class View:
         """
         print(f"Error connecting to camera {camera_id}.")
 
+    @staticmethod
+    def get_resume_choice(frame_count):
+        """
+        Asks the user whether to resume an unfinished scan of the selected input
+
+        @param frame_count (int): The number of frames saved by the unfinished scan
+        @return (bool): True to resume the scan, False to start over
+        """
+        choice = input(
+            f"An unfinished scan of this input was found ({frame_count} frames saved). "
+            "Resume it? (y/n): "
+        )
+        return choice.strip().lower() in ("y", "yes")
+
     @staticmethod
     def display_scan_complete():
         """
@@ -109,11 +126,18 @@ class View:
         print("No report available to send.")
 
     @staticmethod
-    def display_report_sent():
+    def display_report_queued():
+        """
+        Displays a message that the report is queued for delivery
+        """
+        print("Report queued for delivery to staff.")
+
+    @staticmethod
+    def display_no_cameras_configured():
         """
-        Displays a message that the report is sent
+        Displays a message that no cameras are configured
         """
-        print("Report sent to staff.")
+        print("No cameras configured. Set CAMERA_SOURCES in the .env file.")
 
     @staticmethod
     def display_error_message(message):